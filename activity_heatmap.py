@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Activity Heatmap
+Hour-of-day x weekday activity counts for SentrySkin chats and Creatio leads
+
+Timestamps are converted once to America/New_York and reduced to a local
+day and a bucket index (weekday * 24 + hour). A single np.bincount over
+(day, bucket) gives a per-day table of 168 counts, cached per data version,
+so the 7x24 matrix for any date range is just a sum over that range's rows.
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_cache import data_version, load_cached, save_cached
+
+HEATMAP_TIMEZONE = 'America/New_York'
+WEEKDAY_LABELS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+HOURS_PER_WEEK = 7 * 24
+
+EXTRACTED_FILE = "sentryskin_extracted_fields.csv"
+LEADS_FILE = "leads_export.csv"
+SENTRYSKIN_CACHE_FILE = "sentryskin_activity_buckets.pkl"
+LEADS_CACHE_FILE = "leads_activity_buckets.pkl"
+
+def bucket_indexes(timestamps, timezone=HEATMAP_TIMEZONE):
+    """Local day number (days since epoch) and weekday*24+hour bucket of each timestamp"""
+    local = pd.to_datetime(pd.Series(timestamps), utc=True, format='ISO8601', errors='coerce')
+    local = local[local.notna()].dt.tz_convert(timezone)
+    days = local.dt.tz_localize(None).to_numpy().astype('datetime64[D]').astype(np.int64)
+    buckets = (local.dt.dayofweek * 24 + local.dt.hour).to_numpy(dtype=np.int64)
+    return days, buckets
+
+def build_day_buckets(timestamps, timezone=HEATMAP_TIMEZONE):
+    """Per-day bucket counts: {'first_day': datetime64[D] or None, 'counts': (n_days, 168) array}"""
+    days, buckets = bucket_indexes(timestamps, timezone)
+    if len(days) == 0:
+        return {'first_day': None, 'counts': np.zeros((0, HOURS_PER_WEEK), dtype=np.int64)}
+    first_day = days.min()
+    n_days = int(days.max() - first_day) + 1
+    counts = np.bincount((days - first_day) * HOURS_PER_WEEK + buckets, minlength=n_days * HOURS_PER_WEEK)
+    return {
+        'first_day': np.datetime64(int(first_day), 'D'),
+        'counts': counts.reshape(n_days, HOURS_PER_WEEK),
+    }
+
+def day_range(day_buckets):
+    """First and last local date covered, or (None, None)"""
+    if day_buckets['first_day'] is None:
+        return None, None
+    first = pd.Timestamp(day_buckets['first_day']).date()
+    last = pd.Timestamp(day_buckets['first_day'] + len(day_buckets['counts']) - 1).date()
+    return first, last
+
+def _day_offset(day_buckets, date):
+    """Row of the per-day table for a local date"""
+    return int((np.datetime64(pd.Timestamp(date).date(), 'D') - day_buckets['first_day']).astype(np.int64))
+
+def heatmap_matrix(day_buckets, start=None, end=None):
+    """7x24 counts (rows: Monday..Sunday, columns: hour) for local dates in [start, end]"""
+    if day_buckets['first_day'] is None:
+        return np.zeros((7, 24), dtype=np.int64)
+    counts = day_buckets['counts']
+    first = 0 if start is None else max(_day_offset(day_buckets, start), 0)
+    last = len(counts) if end is None else max(_day_offset(day_buckets, end) + 1, first)
+    return counts[first:last].sum(axis=0).reshape(7, 24)
+
+def heatmap_frame(matrix):
+    """7x24 matrix as a DataFrame labelled by weekday and hour"""
+    return pd.DataFrame(matrix, index=WEEKDAY_LABELS, columns=range(24))
+
+def cached_day_buckets(path, column, cache_path):
+    """Per-day bucket counts for a CSV's timestamp column, recomputed only when the file changes"""
+    version = data_version(path)
+    day_buckets = load_cached(cache_path, version)
+    if day_buckets is None:
+        day_buckets = build_day_buckets(pd.read_csv(path, usecols=[column])[column])
+        save_cached(cache_path, version, day_buckets)
+    return day_buckets
+
+def sentryskin_day_buckets(path=EXTRACTED_FILE):
+    """Per-day bucket counts of SentrySkin execution timestamps"""
+    return cached_day_buckets(path, 'timestamp', SENTRYSKIN_CACHE_FILE)
+
+def leads_day_buckets(path=LEADS_FILE):
+    """Per-day bucket counts of Creatio lead Created_On timestamps"""
+    return cached_day_buckets(path, 'Created_On', LEADS_CACHE_FILE)
+
+def print_peak_hours(name, matrix, top=5):
+    """Print the busiest weekday/hour buckets"""
+    total = int(matrix.sum())
+    print(f"\n🕒 {name}: {total} events ({HEATMAP_TIMEZONE})")
+    if total == 0:
+        return
+    flat = matrix.ravel()
+    for bucket in np.argsort(flat, kind='stable')[::-1][:top]:
+        weekday, hour = divmod(int(bucket), 24)
+        print(f"  {WEEKDAY_LABELS[weekday]} {hour:02d}:00: {flat[bucket]} ({flat[bucket] / total * 100:.1f}%)")
+
+def main():
+    """Build (or refresh) the cached activity buckets and print peak hours"""
+    print("🎯 Activity Heatmap")
+    print("=" * 50)
+
+    for name, loader, path in [("SentrySkin chats", sentryskin_day_buckets, EXTRACTED_FILE),
+                               ("Creatio leads", leads_day_buckets, LEADS_FILE)]:
+        try:
+            print_peak_hours(name, heatmap_matrix(loader()))
+        except FileNotFoundError:
+            print(f"\n⚠️ File '{path}' not found, skipping {name}")
+
+    print("\n✅ Activity buckets cached")
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,47 @@
 #!/usr/bin/env python3
 """
 SentrySkin User Analysis - Post October 7th, 2025
-Analyzes users with interactions after October 7th, 2025
+Analyzes users with interactions after a cutoff (default October 7th, 2025)
 """
 
+import argparse
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 from datetime import datetime
 import json
+from user_agent_sets import DEVICE_LABELS, BROWSER_LABELS, OS_LABELS, ensure_mask_columns, mask_counts
+from sentryskin_daily_rollup import load_rollup, filter_rollup, rollup_counts
+from window_reports import window_reports, rolling_windows, rolling_report_file
+from render_post_oct7_chart import CHART_FILE, render_chart, start_background_render
+
+CUTOFF_DATE = '2025-10-07'
+DETAILED_REPORT_FILE = 'sentryskin_post_oct7_2025_detailed_report.csv'
+ROLLING_DAYS = [7, 30, 90]
 
 def load_and_analyze_data():
     """Load and analyze SentrySkin user data"""
     print("📊 Loading SentrySkin user device analysis data...")
     
     try:
-        df = pd.read_csv("sentryskin_user_device_analysis.csv")
+        df = ensure_mask_columns(pd.read_csv("sentryskin_user_device_analysis.csv"))
         print(f"✅ Loaded {len(df)} user records")
         return df
     except FileNotFoundError:
         print("❌ File 'sentryskin_user_device_analysis.csv' not found!")
         return None
 
-def filter_post_october_7_2025(df):
-    """Filter users with interactions after October 7th, 2025"""
-    print("\n📅 Filtering users with interactions after October 7th, 2025...")
-    
-    # Convert timestamp columns to datetime
-    df['first_interaction'] = pd.to_datetime(df['first_interaction'], errors='coerce')
-    df['last_interaction'] = pd.to_datetime(df['last_interaction'], errors='coerce')
-    
-    # Define cutoff date
-    cutoff_date = pd.to_datetime('2025-10-07', utc=True)
+def build_window_reports(df, cutoff=CUTOFF_DATE, rolling_days=()):
+    """Report rows for users with interactions after the cutoff, plus one per rolling window"""
+    print(f"\n📅 Filtering users with interactions after {cutoff}...")
     
-    # Filter users whose last interaction is after October 7th, 2025
-    post_oct_7_users = df[df['last_interaction'] > cutoff_date]
+    # One pass over the user table serves the cutoff window and every rolling window
+    windows = [(cutoff, None)] + rolling_windows(rolling_days)
+    post_cutoff_users, *rolling_reports = window_reports(df, windows)
     
-    print(f"📊 Users with interactions after Oct 7th, 2025: {len(post_oct_7_users)}")
+    print(f"📊 Users with interactions after {cutoff}: {len(post_cutoff_users)}")
     print(f"📊 Total users in dataset: {len(df)}")
-    print(f"📊 Percentage: {(len(post_oct_7_users)/len(df))*100:.1f}%")
+    print(f"📊 Percentage: {(len(post_cutoff_users)/len(df))*100:.1f}%")
     
-    return post_oct_7_users
+    return post_cutoff_users, rolling_reports
 
 def analyze_user_details(post_oct_7_users):
     """Analyze detailed user information"""
@@ -60,165 +61,71 @@ def analyze_user_details(post_oct_7_users):
     
     # Device analysis
     print(f"\n📱 Device Analysis:")
-    device_counts = {}
-    for devices in post_oct_7_users['devices']:
-        if pd.notna(devices):
-            for device in devices.split(', '):
-                device = device.strip()
-                device_counts[device] = device_counts.get(device, 0) + 1
+    device_counts = mask_counts(post_oct_7_users['device_mask'], DEVICE_LABELS).to_dict()
     
-    for device, count in sorted(device_counts.items(), key=lambda x: x[1], reverse=True):
+    for device, count in device_counts.items():
         percentage = (count / total_users) * 100
         print(f"  {device}: {count} users ({percentage:.1f}%)")
     
     # Browser analysis
     print(f"\n🌐 Browser Analysis:")
-    browser_counts = {}
-    for browsers in post_oct_7_users['browsers']:
-        if pd.notna(browsers):
-            for browser in browsers.split(', '):
-                browser = browser.strip()
-                browser_counts[browser] = browser_counts.get(browser, 0) + 1
+    browser_counts = mask_counts(post_oct_7_users['browser_mask'], BROWSER_LABELS).to_dict()
     
-    for browser, count in sorted(browser_counts.items(), key=lambda x: x[1], reverse=True):
+    for browser, count in browser_counts.items():
         percentage = (count / total_users) * 100
         print(f"  {browser}: {count} users ({percentage:.1f}%)")
     
     # OS analysis
     print(f"\n💻 Operating System Analysis:")
-    os_counts = {}
-    for os_list in post_oct_7_users['operating_systems']:
-        if pd.notna(os_list):
-            for os in os_list.split(', '):
-                os = os.strip()
-                os_counts[os] = os_counts.get(os, 0) + 1
+    os_counts = mask_counts(post_oct_7_users['os_mask'], OS_LABELS).to_dict()
     
-    for os, count in sorted(os_counts.items(), key=lambda x: x[1], reverse=True):
+    for os, count in os_counts.items():
         percentage = (count / total_users) * 100
         print(f"  {os}: {count} users ({percentage:.1f}%)")
     
     return device_counts, browser_counts, os_counts
 
-def create_visualizations(post_oct_7_users, device_counts, browser_counts, os_counts):
-    """Create visualizations for the analysis"""
-    print("\n📊 Creating visualizations...")
-    
-    # Set up the plotting style
-    plt.style.use('default')
-    sns.set_palette("husl")
-    
-    # Create figure with subplots
-    fig, axes = plt.subplots(2, 2, figsize=(16, 12))
-    fig.suptitle('SentrySkin Users Analysis - Post October 7th, 2025', fontsize=16, fontweight='bold')
-    
-    # 1. Device Distribution Pie Chart
-    ax1 = axes[0, 0]
-    if device_counts:
-        devices = list(device_counts.keys())
-        counts = list(device_counts.values())
-        colors = plt.cm.Set3(range(len(devices)))
-        
-        wedges, texts, autotexts = ax1.pie(counts, labels=devices, autopct='%1.1f%%', 
-                                          colors=colors, startangle=90)
-        ax1.set_title('Device Distribution', fontweight='bold')
-        
-        # Make percentage text bold
-        for autotext in autotexts:
-            autotext.set_fontweight('bold')
-    
-    # 2. Browser Distribution Bar Chart
-    ax2 = axes[0, 1]
-    if browser_counts:
-        browsers = list(browser_counts.keys())
-        counts = list(browser_counts.values())
-        
-        bars = ax2.bar(browsers, counts, color=plt.cm.viridis(range(len(browsers))))
-        ax2.set_title('Browser Distribution', fontweight='bold')
-        ax2.set_ylabel('Number of Users')
-        ax2.tick_params(axis='x', rotation=45)
-        
-        # Add value labels on bars
-        for bar, count in zip(bars, counts):
-            ax2.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.5,
-                    str(count), ha='center', va='bottom', fontweight='bold')
-    
-    # 3. OS Distribution Bar Chart
-    ax3 = axes[1, 0]
-    if os_counts:
-        os_list = list(os_counts.keys())
-        counts = list(os_counts.values())
-        
-        bars = ax3.bar(os_list, counts, color=plt.cm.plasma(range(len(os_list))))
-        ax3.set_title('Operating System Distribution', fontweight='bold')
-        ax3.set_ylabel('Number of Users')
-        ax3.tick_params(axis='x', rotation=45)
-        
-        # Add value labels on bars
-        for bar, count in zip(bars, counts):
-            ax3.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.5,
-                    str(count), ha='center', va='bottom', fontweight='bold')
-    
-    # 4. Conversation Count Distribution
-    ax4 = axes[1, 1]
-    conversation_counts = post_oct_7_users['conversation_count']
-    
-    # Create histogram
-    bins = range(1, int(conversation_counts.max()) + 2)
-    n, bins, patches = ax4.hist(conversation_counts, bins=bins, alpha=0.7, 
-                               color='skyblue', edgecolor='black')
+def analyze_activity(cutoff=CUTOFF_DATE):
+    """Summarize executions after the cutoff from the daily rollup"""
+    rollup = load_rollup()
+    if rollup is None:
+        print("\n⚠️ sentryskin_daily_rollup.csv not found, skipping activity summary")
+        return None
     
-    ax4.set_title('Conversation Count Distribution', fontweight='bold')
-    ax4.set_xlabel('Number of Conversations')
-    ax4.set_ylabel('Number of Users')
-    ax4.grid(True, alpha=0.3)
+    # The cutoff day itself is excluded, matching last_interaction > cutoff
+    activity = filter_rollup(rollup, start=pd.Timestamp(cutoff) + pd.Timedelta(days=1))
+    total_executions = int(activity['executions'].sum())
     
-    # Add statistics text
-    stats_text = f'Mean: {conversation_counts.mean():.1f}\nMedian: {conversation_counts.median():.1f}\nMax: {conversation_counts.max()}'
-    ax4.text(0.7, 0.7, stats_text, transform=ax4.transAxes, 
-             bbox=dict(boxstyle="round,pad=0.3", facecolor="white", alpha=0.8),
-             fontweight='bold')
+    print(f"\n📆 Activity After {cutoff} (daily rollup, {len(activity)} rows):")
+    print(f"  Total executions: {total_executions}")
+    print(f"  Active days: {activity['day'].nunique()}")
+    if total_executions == 0:
+        return activity
     
-    plt.tight_layout()
-    plt.savefig('sentryskin_post_oct7_2025_analysis.png', dpi=300, bbox_inches='tight')
-    print("✅ Visualization saved as: sentryskin_post_oct7_2025_analysis.png")
+    for dimension, title in [('device', 'Device'), ('browser', 'Browser'),
+                             ('operating_system', 'Operating System'), ('conversation_stage', 'Conversation Stage')]:
+        print(f"\n  Executions by {title}:")
+        for value, count in rollup_counts(activity, dimension).items():
+            print(f"    {value}: {count} ({count / total_executions * 100:.1f}%)")
     
-    return fig
+    return activity
 
-def create_detailed_report(post_oct_7_users):
-    """Create a detailed report of users"""
+def create_detailed_report(post_oct_7_users, cutoff=CUTOFF_DATE):
+    """Save the detailed report of users (already in report format, most active first)"""
     print("\n📋 Creating detailed user report...")
     
-    # Sort by conversation count (descending)
-    sorted_users = post_oct_7_users.sort_values('conversation_count', ascending=False)
-    
-    # Create detailed report
-    report_data = []
-    
-    for idx, user in sorted_users.iterrows():
-        report_data.append({
-            'user_id': user['user_id'],
-            'conversation_count': user['conversation_count'],
-            'first_interaction': user['first_interaction'].strftime('%Y-%m-%d %H:%M:%S') if pd.notna(user['first_interaction']) else 'N/A',
-            'last_interaction': user['last_interaction'].strftime('%Y-%m-%d %H:%M:%S') if pd.notna(user['last_interaction']) else 'N/A',
-            'devices': user['devices'],
-            'browsers': user['browsers'],
-            'operating_systems': user['operating_systems'],
-            'sample_user_agent': user['sample_user_agent'][:100] + '...' if len(str(user['sample_user_agent'])) > 100 else user['sample_user_agent']
-        })
-    
-    # Save detailed report
-    report_df = pd.DataFrame(report_data)
-    report_df.to_csv('sentryskin_post_oct7_2025_detailed_report.csv', index=False)
-    print("✅ Detailed report saved as: sentryskin_post_oct7_2025_detailed_report.csv")
+    report_df = post_oct_7_users
+    report_df.to_csv(DETAILED_REPORT_FILE, index=False)
+    print(f"✅ Detailed report saved as: {DETAILED_REPORT_FILE}")
     
     # Print top 10 most active users
-    print(f"\n🏆 Top 10 Most Active Users (Post Oct 7th, 2025):")
+    print(f"\n🏆 Top 10 Most Active Users (After {cutoff}):")
     print("-" * 80)
-    for i, user in enumerate(sorted_users.head(10).itertuples(), 1):
+    for i, user in enumerate(report_df.head(10).itertuples(), 1):
         print(f"{i:2d}. User ID: {user.user_id}")
         print(f"    Conversations: {user.conversation_count}")
-        print(f"    First Interaction: {user.first_interaction.strftime('%Y-%m-%d %H:%M:%S') if pd.notna(user.first_interaction) else 'N/A'}")
-        print(f"    Last Interaction: {user.last_interaction.strftime('%Y-%m-%d %H:%M:%S') if pd.notna(user.last_interaction) else 'N/A'}")
+        print(f"    First Interaction: {user.first_interaction}")
+        print(f"    Last Interaction: {user.last_interaction}")
         print(f"    Devices: {user.devices}")
         print(f"    Browsers: {user.browsers}")
         print(f"    OS: {user.operating_systems}")
@@ -226,39 +133,69 @@ def create_detailed_report(post_oct_7_users):
     
     return report_df
 
-def main():
-    """Main analysis function"""
-    print("🎯 SentrySkin Users Analysis - Post October 7th, 2025")
-    print("=" * 60)
-    
-    # Load data
-    df = load_and_analyze_data()
-    if df is None:
-        return
-    
-    # Filter users with interactions after October 7th, 2025
-    post_oct_7_users = filter_post_october_7_2025(df)
+def save_rolling_reports(rolling_days, rolling_reports):
+    """Save one detailed report per rolling window"""
+    for days, report_df in zip(rolling_days, rolling_reports):
+        report_df.to_csv(rolling_report_file(days), index=False)
+        print(f"✅ Last {days} days: {len(report_df)} users saved as: {rolling_report_file(days)}")
+
+def run_analysis(df, cutoff=CUTOFF_DATE, rolling_days=ROLLING_DAYS, chart='background'):
+    """Window reports, statistics and chart for a loaded user table; returns the cutoff report"""
+    # Users with interactions after the cutoff (and in each rolling window)
+    post_oct_7_users, rolling_reports = build_window_reports(df, cutoff, rolling_days)
+    save_rolling_reports(rolling_days, rolling_reports)
     
     if len(post_oct_7_users) == 0:
-        print("❌ No users found with interactions after October 7th, 2025!")
-        return
+        print(f"❌ No users found with interactions after {cutoff}!")
+        return None
     
     # Analyze user details
     device_counts, browser_counts, os_counts = analyze_user_details(post_oct_7_users)
     
-    # Create visualizations
-    fig = create_visualizations(post_oct_7_users, device_counts, browser_counts, os_counts)
+    # Execution-level breakdown from the daily rollup
+    analyze_activity(cutoff)
     
     # Create detailed report
-    report_df = create_detailed_report(post_oct_7_users)
+    report_df = create_detailed_report(post_oct_7_users, cutoff)
+    
+    # The chart is rendered from the saved report, after it, and skipped when unchanged
+    if chart == 'background':
+        start_background_render(DETAILED_REPORT_FILE, cutoff)
+    elif chart == 'now':
+        render_chart(DETAILED_REPORT_FILE, cutoff)
     
     print(f"\n🎉 Analysis completed!")
-    print(f"📊 Users with interactions after Oct 7th, 2025: {len(post_oct_7_users)}")
+    print(f"📊 Users with interactions after {cutoff}: {len(post_oct_7_users)}")
     print(f"📊 Total conversations: {post_oct_7_users['conversation_count'].sum()}")
     print(f"📊 Average conversations per user: {post_oct_7_users['conversation_count'].mean():.1f}")
     print(f"💾 Files generated:")
-    print(f"  - sentryskin_post_oct7_2025_analysis.png")
-    print(f"  - sentryskin_post_oct7_2025_detailed_report.csv")
+    print(f"  - {DETAILED_REPORT_FILE}")
+    if chart != 'skip':
+        print(f"  - {CHART_FILE}")
+    
+    return report_df
+
+def main():
+    """Main analysis function"""
+    parser = argparse.ArgumentParser(description='SentrySkin Users Analysis After a Cutoff')
+    parser.add_argument('--cutoff', default=CUTOFF_DATE,
+                       help=f'Report users with interactions after this date (default: {CUTOFF_DATE})')
+    parser.add_argument('--rolling-days', type=int, nargs='*', default=ROLLING_DAYS,
+                       help='Also write a last-N-days report for each N (default: 7 30 90)')
+    parser.add_argument('--chart', choices=['background', 'now', 'skip'], default='background',
+                       help=f'Render {CHART_FILE} in the background after the report (default), '
+                            'before exiting, or not at all')
+    args = parser.parse_args()
+    
+    print(f"🎯 SentrySkin Users Analysis - After {args.cutoff}")
+    print("=" * 60)
+    
+    # Load data
+    df = load_and_analyze_data()
+    if df is None:
+        return
+    
+    run_analysis(df, args.cutoff, args.rolling_days, args.chart)
 
 if __name__ == "__main__":
     main()
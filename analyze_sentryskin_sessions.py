@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+SentrySkin Conversation Sessions
+Groups webhook executions into conversation sessions per user
+
+A session ends when the same user is silent for more than SESSION_GAP_MINUTES
+or switches to a different thread_id. Everything is computed on arrays sorted
+once by (user, timestamp), with no per-user Python loops.
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Inactivity gap that starts a new session
+SESSION_GAP_MINUTES = 30
+
+EXTRACTED_FILE = "sentryskin_extracted_fields.csv"
+SESSIONS_FILE = "sentryskin_sessions.csv"
+
+def load_extracted_data():
+    """Load the columns of the extracted SentrySkin data needed for sessionization"""
+    print("📊 Loading extracted SentrySkin data...")
+
+    try:
+        df = pd.read_csv(
+            EXTRACTED_FILE,
+            usecols=['execution_id', 'timestamp', 'chat_id', 'thread_id'],
+            dtype={'chat_id': 'object', 'thread_id': 'object'}
+        )
+        print(f"✅ Loaded {len(df)} records")
+        return df
+    except FileNotFoundError:
+        print(f"❌ File '{EXTRACTED_FILE}' not found!")
+        print("Please run extract_sentryskin_fields.py first to generate the data.")
+        return None
+
+def build_sessions(df, gap_minutes=SESSION_GAP_MINUTES):
+    """Split executions into sessions and return one row per session"""
+    # Same user identifier as the user analysis (chat_id, falling back to thread_id)
+    user_identifier = df['chat_id'].fillna(df['thread_id'])
+    timestamps = pd.to_datetime(df['timestamp'], utc=True, format='ISO8601', errors='coerce')
+
+    # Work on integer codes; strings are only looked up again for the output rows
+    user_codes, user_ids = pd.factorize(user_identifier)
+    thread_codes, thread_ids = pd.factorize(df['thread_id'])
+    empty_user = np.flatnonzero(np.asarray(user_ids, dtype=object) == '')
+    keep = (user_codes >= 0) & ~np.isin(user_codes, empty_user) & timestamps.notna().to_numpy()
+
+    if not keep.any():
+        return pd.DataFrame(columns=[
+            'user_identifier', 'session_number', 'thread_id', 'session_start',
+            'session_end', 'message_count', 'duration_seconds'
+        ])
+
+    # Sort once by (user, timestamp)
+    epoch_ns = timestamps.dt.tz_convert(None).dt.as_unit('ns').to_numpy().view(np.int64)
+    order = np.flatnonzero(keep)
+    order = order[np.lexsort((epoch_ns[order], user_codes[order]))]
+    user_codes, thread_codes, epoch_ns = user_codes[order], thread_codes[order], epoch_ns[order]
+
+    # Session breaks: new user, new thread, or a gap longer than the threshold
+    user_start = np.ones(len(order), dtype=bool)
+    user_start[1:] = user_codes[1:] != user_codes[:-1]
+    session_start = user_start.copy()
+    session_start[1:] |= thread_codes[1:] != thread_codes[:-1]
+    session_start[1:] |= np.diff(epoch_ns) > gap_minutes * 60 * 1_000_000_000
+
+    # Per-session bounds from the break positions
+    starts = np.flatnonzero(session_start)
+    ends = np.append(starts[1:], len(order)) - 1
+    message_count = ends - starts + 1
+
+    # Number sessions within each user (1, 2, ...)
+    session_index = np.arange(len(starts))
+    first_of_user = np.maximum.accumulate(np.where(user_start[starts], session_index, 0))
+    session_number = session_index - first_of_user + 1
+
+    start_ns, end_ns = epoch_ns[starts], epoch_ns[ends]
+    session_threads = thread_codes[starts]
+    thread_labels = np.append(np.asarray(thread_ids, dtype=object), None)
+    return pd.DataFrame({
+        'user_identifier': np.asarray(user_ids, dtype=object)[user_codes[starts]],
+        'session_number': session_number,
+        'thread_id': thread_labels[session_threads],
+        'session_start': pd.to_datetime(start_ns, unit='ns', utc=True),
+        'session_end': pd.to_datetime(end_ns, unit='ns', utc=True),
+        'message_count': message_count,
+        'duration_seconds': (end_ns - start_ns) / 1e9,
+    })
+
+def summarize_sessions(sessions):
+    """Print session statistics"""
+    print("\n💬 Session Summary:")
+    print(f"  Total sessions: {len(sessions)}")
+    print(f"  Users with sessions: {sessions['user_identifier'].nunique()}")
+    if sessions.empty:
+        return
+
+    print(f"  Messages per session: mean {sessions['message_count'].mean():.1f}, "
+          f"median {sessions['message_count'].median():.0f}, max {sessions['message_count'].max()}")
+    print(f"  Session duration: median {sessions['duration_seconds'].median() / 60:.1f} min, "
+          f"p90 {sessions['duration_seconds'].quantile(0.9) / 60:.1f} min")
+
+    sessions_per_user = sessions.groupby('user_identifier').size()
+    print(f"\n📈 Sessions per User:")
+    print(f"  Users with 1 session: {(sessions_per_user == 1).sum()}")
+    print(f"  Users with 2-5 sessions: {sessions_per_user.between(2, 5).sum()}")
+    print(f"  Users with 6+ sessions: {(sessions_per_user >= 6).sum()}")
+
+def save_sessions(sessions):
+    """Save sessions to CSV"""
+    sessions.to_csv(SESSIONS_FILE, index=False)
+    print(f"\n✅ Sessions saved to: {SESSIONS_FILE}")
+
+def main():
+    """Main sessionization function"""
+    parser = argparse.ArgumentParser(description='SentrySkin Conversation Sessions')
+    parser.add_argument('--gap-minutes', type=float, default=SESSION_GAP_MINUTES,
+                       help=f'Inactivity gap that starts a new session (default: {SESSION_GAP_MINUTES})')
+    args = parser.parse_args()
+
+    print("🎯 SentrySkin Conversation Sessions")
+    print("=" * 50)
+
+    df = load_extracted_data()
+    if df is None:
+        return
+
+    sessions = build_sessions(df, args.gap_minutes)
+    summarize_sessions(sessions)
+    save_sessions(sessions)
+
+    print("\n🎉 Sessionization completed!")
+
+if __name__ == "__main__":
+    main()
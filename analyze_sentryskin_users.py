@@ -5,17 +5,35 @@ Analyzes unique users and their device patterns from October 7th onwards
 """
 
 import pandas as pd
+import numpy as np
 import json
+import os
+import pickle
+import argparse
 from datetime import datetime
 import re
-from collections import defaultdict
+from execution_watermark import unprocessed_mask, advance_watermark
+from user_agent_sets import (
+    DEVICE_LABELS, BROWSER_LABELS, OS_LABELS, classify_user_agent_bits,
+    group_bitwise_or, lowest_label, mask_counts, mask_to_labels, masks_to_strings, popcount
+)
+
+# Persisted per-user aggregates for incremental runs
+USER_STATE_FILE = "sentryskin_user_state.pkl"
+USER_STATE_VERSION = 4
+
+# Columnar side files with every user's interaction timestamps (epoch milliseconds),
+# one chunk per run; the state lists the committed chunks
+USER_TIMELINES_DIR = "sentryskin_user_timelines"
+# Committed chunks are merged into one once there are more than this many
+MAX_TIMELINE_CHUNKS = 32
 
 def load_extracted_data():
     """Load the extracted SentrySkin data"""
     print("📊 Loading extracted SentrySkin data...")
     
     try:
-        df = pd.read_csv("sentryskin_extracted_fields.csv")
+        df = pd.read_csv("sentryskin_extracted_fields.csv", dtype={'chat_id': str, 'thread_id': str})
         print(f"✅ Loaded {len(df)} records")
         return df
     except FileNotFoundError:
@@ -64,129 +82,277 @@ def analyze_unique_users(df):
     
     return df_with_users, unique_users, user_conversation_counts
 
+def _group_lists(codes, values, n_groups):
+    """Split values into one list per group code (0..n_groups-1), keeping row order"""
+    order = np.argsort(codes, kind='stable')
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=n_groups))))
+    ordered = values[order].tolist()
+    return [ordered[bounds[i]:bounds[i + 1]] for i in range(n_groups)]
+
+def _distinct_lists(codes, values, n_groups):
+    """Distinct values per group code, in order of first appearance"""
+    pairs = pd.DataFrame({'code': codes, 'value': values}).drop_duplicates()
+    return _group_lists(pairs['code'].to_numpy(), pairs['value'].to_numpy(), n_groups)
+
+def aggregate_user_records(df_with_users):
+    """Aggregate records into one row per user (index: user identifier)"""
+    # Encode users once (codes follow order of first appearance)
+    records = df_with_users[df_with_users['user_identifier'].notna()]
+    codes, user_ids = pd.factorize(records['user_identifier'])
+    n_users = len(user_ids)
+    
+    # Counts and first/last interaction in one grouped pass
+    timestamps = records['timestamp']
+    conversation_counts = np.bincount(codes, minlength=n_users)
+    bounds = timestamps.groupby(codes).agg(['min', 'max'])
+    
+    # Distinct user agents per user
+    user_agents = records['user_agent'].to_numpy()
+    has_agent = records['user_agent'].notna().to_numpy()
+    user_agent_lists = _distinct_lists(codes[has_agent], user_agents[has_agent], n_users)
+    
+    # Classify each distinct user agent string once, then OR the bits per user
+    has_agent = has_agent & records['user_agent'].ne('').to_numpy()
+    agent_codes, distinct_agents = pd.factorize(user_agents[has_agent])
+    agent_bits = np.array(
+        [classify_user_agent_bits(user_agent) for user_agent in distinct_agents],
+        dtype=np.int64
+    ).reshape(-1, 3)[agent_codes]
+    agent_user_codes = codes[has_agent]
+    
+    return pd.DataFrame({
+        'conversation_count': conversation_counts,
+        'first_interaction': bounds['min'].array,
+        'last_interaction': bounds['max'].array,
+        'device_mask': group_bitwise_or(agent_user_codes, agent_bits[:, 0], n_users, DEVICE_LABELS),
+        'browser_mask': group_bitwise_or(agent_user_codes, agent_bits[:, 1], n_users, BROWSER_LABELS),
+        'os_mask': group_bitwise_or(agent_user_codes, agent_bits[:, 2], n_users, OS_LABELS),
+        'user_agents': user_agent_lists
+    }, index=pd.Index(user_ids, name='user_id'))
+
+def _merge_lists(previous, new):
+    """Union of two lists, keeping the order of first appearance"""
+    seen = set(previous)
+    return previous + [value for value in new if value not in seen]
+
+def merge_user_aggregates(previous, new):
+    """Merge two per-user aggregate tables; existing users keep their position"""
+    if previous is None or previous.empty:
+        return new
+    if new.empty:
+        return previous
+    
+    overlap = previous.index.intersection(new.index)
+    merged = pd.concat([previous, new[~new.index.isin(overlap)]])
+    if len(overlap) == 0:
+        return merged
+    
+    # Only users present in both tables need combining
+    old = previous.loc[overlap]
+    add = new.loc[overlap]
+    merged.loc[overlap, 'conversation_count'] = old['conversation_count'] + add['conversation_count']
+    merged.loc[overlap, 'first_interaction'] = old['first_interaction'].where(
+        old['first_interaction'] <= add['first_interaction'], add['first_interaction'])
+    merged.loc[overlap, 'last_interaction'] = old['last_interaction'].where(
+        old['last_interaction'] >= add['last_interaction'], add['last_interaction'])
+    for column in ['device_mask', 'browser_mask', 'os_mask']:
+        merged.loc[overlap, column] = old[column] | add[column]
+    merged.loc[overlap, 'user_agents'] = pd.Series(
+        [_merge_lists(a, b) for a, b in zip(old['user_agents'], add['user_agents'])],
+        index=overlap, dtype=object)
+    
+    return merged
+
+def user_devices_from_aggregates(user_aggregates):
+    """Convert the aggregate table into the per-user profile dict"""
+    profiles = user_aggregates.drop(columns=['device_mask', 'browser_mask', 'os_mask'])
+    for column, mask_column, table in [
+        ('unique_devices', 'device_mask', DEVICE_LABELS),
+        ('unique_browsers', 'browser_mask', BROWSER_LABELS),
+        ('unique_operating_systems', 'os_mask', OS_LABELS),
+    ]:
+        masks = user_aggregates[mask_column]
+        labels = {mask: mask_to_labels(mask, table) for mask in masks.unique()}
+        profiles[column] = [list(labels[mask]) for mask in masks]
+    return profiles.to_dict('index')
+
 def analyze_user_devices(df_with_users):
     """Analyze device patterns for each unique user"""
     print("\n📱 Analyzing user device patterns...")
+    return user_devices_from_aggregates(aggregate_user_records(df_with_users))
+
+def load_user_state():
+    """Load the persisted per-user aggregate state, if it is usable"""
+    try:
+        state = pd.read_pickle(USER_STATE_FILE)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
     
-    # Group by user and get their device information
-    user_devices = {}
-    
-    for user_id in df_with_users['user_identifier'].unique():
-        user_records = df_with_users[df_with_users['user_identifier'] == user_id]
-        
-        # Get unique user agents for this user
-        user_agents = user_records['user_agent'].dropna().unique()
-        
-        # Get timestamp information
-        timestamps = user_records['timestamp'].tolist()
-        first_interaction = min(timestamps) if timestamps else None
-        last_interaction = max(timestamps) if timestamps else None
-        
-        # Analyze each user agent
-        devices = []
-        browsers = []
-        operating_systems = []
-        
-        for user_agent in user_agents:
-            if user_agent:
-                # Device detection
-                if 'Mobile' in user_agent or 'iPhone' in user_agent or 'Android' in user_agent:
-                    devices.append('Mobile')
-                elif 'iPad' in user_agent or 'Tablet' in user_agent:
-                    devices.append('Tablet')
-                else:
-                    devices.append('Desktop')
-                
-                # Browser detection
-                if 'Chrome' in user_agent:
-                    browsers.append('Chrome')
-                elif 'Safari' in user_agent and 'Chrome' not in user_agent:
-                    browsers.append('Safari')
-                elif 'Firefox' in user_agent:
-                    browsers.append('Firefox')
-                elif 'Edge' in user_agent:
-                    browsers.append('Edge')
-                else:
-                    browsers.append('Other')
-                
-                # OS detection
-                if 'Windows' in user_agent:
-                    operating_systems.append('Windows')
-                elif 'Mac OS X' in user_agent or 'macOS' in user_agent:
-                    operating_systems.append('macOS')
-                elif 'iPhone' in user_agent or 'iPad' in user_agent:
-                    operating_systems.append('iOS')
-                elif 'Android' in user_agent:
-                    operating_systems.append('Android')
-                elif 'Linux' in user_agent:
-                    operating_systems.append('Linux')
-                else:
-                    operating_systems.append('Other')
-        
-        user_devices[user_id] = {
-            'conversation_count': len(user_records),
-            'unique_devices': list(set(devices)),
-            'unique_browsers': list(set(browsers)),
-            'unique_operating_systems': list(set(operating_systems)),
-            'user_agents': list(user_agents),
-            'first_interaction': first_interaction,
-            'last_interaction': last_interaction,
-            'all_timestamps': timestamps
-        }
-    
-    return user_devices
-
-def generate_device_statistics(user_devices):
+    if not isinstance(state, dict) or state.get('version') != USER_STATE_VERSION:
+        print("⚠️ User state was written by a different version, rebuilding from full history")
+        return None
+    return state
+
+def save_user_state(user_aggregates, watermark, recent_ids, timeline_chunks):
+    """Persist the per-user aggregate state, the highest processed execution id and the ids just below it"""
+    state = {
+        'version': USER_STATE_VERSION,
+        'watermark': watermark,
+        'recent_ids': recent_ids,
+        'timeline_chunks': timeline_chunks,
+        'updated_at': datetime.now().isoformat(),
+        'users': user_aggregates
+    }
+    temp_path = f"{USER_STATE_FILE}.tmp"
+    pd.to_pickle(state, temp_path)
+    os.replace(temp_path, USER_STATE_FILE)
+    print(f"✅ User state saved to: {USER_STATE_FILE} (watermark: {watermark})")
+
+def select_new_records(df, state):
+    """Return (records to aggregate, previous aggregates, new watermark, recent ids)
+
+    Records above the saved watermark are new, and so are late arrivals
+    below it that were not processed yet (see execution_watermark).
+    """
+    execution_ids = pd.to_numeric(df['execution_id'], errors='coerce')
+    if execution_ids.isna().any():
+        print("⚠️ Non-numeric execution ids, incremental mode unavailable")
+        return df, None, None, None
+    
+    execution_ids = execution_ids.to_numpy(dtype=np.int64)
+    if state is not None and (not len(df) or execution_ids.max() < state['watermark']):
+        print("⚠️ Extracted data no longer covers the saved state, rebuilding from full history")
+        state = None
+    if state is None:
+        watermark, recent_ids = advance_watermark(None, [], execution_ids)
+        return df, None, watermark, recent_ids
+    
+    new = unprocessed_mask(execution_ids, state['watermark'], state['recent_ids'])
+    watermark, recent_ids = advance_watermark(state['watermark'], state['recent_ids'], execution_ids[new])
+    late = int((new & (execution_ids <= state['watermark'])).sum())
+    print(f"🆕 New records since last run: {int(new.sum())} ({late} late arrivals, watermark: {state['watermark']})")
+    return df[new].copy(), state['users'], watermark, recent_ids
+
+def _epoch_milliseconds(timestamps):
+    """Convert tz-aware timestamps to int64 epoch milliseconds"""
+    return timestamps.dt.tz_convert('UTC').dt.as_unit('ms').astype('int64').to_numpy()
+
+def _timeline_chunk_path(name):
+    return os.path.join(USER_TIMELINES_DIR, name)
+
+def _write_timeline_chunk(user_ids, epoch_ms, name):
+    """Write (user id, timestamp) rows as one chunk grouped by user"""
+    # Group by user (order of first appearance), keeping row order within each user
+    codes, unique_users = pd.factorize(np.asarray(user_ids, dtype=str))
+    order = np.argsort(codes, kind='stable')
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(unique_users)))))
+    
+    temp_path = _timeline_chunk_path(f"{name}.tmp")
+    with open(temp_path, 'wb') as f:
+        np.savez(f, user_ids=np.asarray(unique_users, dtype=str),
+                 offsets=offsets.astype(np.int64), timestamps=epoch_ms[order])
+    os.replace(temp_path, _timeline_chunk_path(name))
+
+def _read_timeline_chunks(chunks):
+    """(user id per timestamp, epoch ms) of the given chunks, in chunk order"""
+    user_ids, epoch_ms = [], []
+    for name in chunks:
+        with np.load(_timeline_chunk_path(name)) as chunk:
+            user_ids.append(np.repeat(chunk['user_ids'], np.diff(chunk['offsets'])))
+            epoch_ms.append(chunk['timestamps'])
+    if not user_ids:
+        return np.array([], dtype=str), np.array([], dtype=np.int64)
+    return np.concatenate(user_ids), np.concatenate(epoch_ms)
+
+def update_user_timelines(df_with_users, chunks):
+    """Write this run's per-user timestamps as a new chunk; returns the chunk list to commit
+
+    Earlier chunks are left untouched, so a run costs O(new records) until
+    more than MAX_TIMELINE_CHUNKS chunks pile up and are merged into one.
+    """
+    records = df_with_users[df_with_users['user_identifier'].notna()]
+    if len(records) == 0:
+        return chunks
+    os.makedirs(USER_TIMELINES_DIR, exist_ok=True)
+    
+    # Never reuse a file name, even one only an older (still saved) state refers to
+    existing = [name for name in os.listdir(USER_TIMELINES_DIR) if re.fullmatch(r'chunk_\d+\.npz', name)]
+    sequence = max([int(name[6:-4]) for name in existing], default=0) + 1
+    name = f"chunk_{sequence:06d}.npz"
+    user_ids = records['user_identifier'].astype(str).to_numpy()
+    _write_timeline_chunk(user_ids, _epoch_milliseconds(records['timestamp']), name)
+    chunks = chunks + [name]
+    
+    if len(chunks) > MAX_TIMELINE_CHUNKS:
+        name = f"chunk_{sequence + 1:06d}.npz"
+        _write_timeline_chunk(*_read_timeline_chunks(chunks), name)
+        chunks = [name]
+    print(f"✅ User timelines saved to: {USER_TIMELINES_DIR}/{name} ({len(records)} timestamps, {len(chunks)} chunks)")
+    return chunks
+
+def discard_timeline_chunks(keep):
+    """Delete chunk files that are not in the committed chunk list"""
+    if not os.path.isdir(USER_TIMELINES_DIR):
+        return
+    for name in os.listdir(USER_TIMELINES_DIR):
+        if name not in keep:
+            os.remove(_timeline_chunk_path(name))
+
+def committed_timeline_chunks():
+    """Chunks listed in the saved user state"""
+    state = load_user_state()
+    return state['timeline_chunks'] if state is not None else []
+
+def load_user_timeline(user_id, chunks=None):
+    """Load one user's interaction timestamps from the timeline chunks"""
+    user_id = str(user_id)
+    epoch_ms = []
+    for name in committed_timeline_chunks() if chunks is None else chunks:
+        with np.load(_timeline_chunk_path(name)) as chunk:
+            for match in np.flatnonzero(chunk['user_ids'] == user_id):
+                offsets = chunk['offsets']
+                epoch_ms.append(chunk['timestamps'][offsets[match]:offsets[match + 1]])
+    epoch_ms = np.concatenate(epoch_ms) if epoch_ms else np.array([], dtype=np.int64)
+    return pd.to_datetime(epoch_ms, unit='ms', utc=True)
+
+def load_user_timelines(chunks=None):
+    """Load every user's timeline as {user_id: [Timestamp, ...]}"""
+    user_ids, epoch_ms = _read_timeline_chunks(committed_timeline_chunks() if chunks is None else chunks)
+    codes, unique_users = pd.factorize(user_ids)
+    timestamps = _group_lists(codes, pd.to_datetime(epoch_ms, unit='ms', utc=True).to_numpy(dtype=object),
+                              len(unique_users))
+    return dict(zip(unique_users.tolist(), timestamps))
+
+def generate_device_statistics(user_aggregates):
     """Generate comprehensive device statistics"""
     print("\n📊 Device Statistics Summary:")
     
-    # Overall device distribution
-    device_counts = defaultdict(int)
-    browser_counts = defaultdict(int)
-    os_counts = defaultdict(int)
+    # Overall distributions (by unique users) straight from the masks
+    device_counts = mask_counts(user_aggregates['device_mask'], DEVICE_LABELS)
+    browser_counts = mask_counts(user_aggregates['browser_mask'], BROWSER_LABELS)
+    os_counts = mask_counts(user_aggregates['os_mask'], OS_LABELS)
     
     # Multi-device users
-    multi_device_users = 0
-    multi_browser_users = 0
-    multi_os_users = 0
-    
-    for user_id, data in user_devices.items():
-        # Count devices
-        for device in data['unique_devices']:
-            device_counts[device] += 1
-        
-        # Count browsers
-        for browser in data['unique_browsers']:
-            browser_counts[browser] += 1
-        
-        # Count operating systems
-        for os in data['unique_operating_systems']:
-            os_counts[os] += 1
-        
-        # Count multi-device users
-        if len(data['unique_devices']) > 1:
-            multi_device_users += 1
-        if len(data['unique_browsers']) > 1:
-            multi_browser_users += 1
-        if len(data['unique_operating_systems']) > 1:
-            multi_os_users += 1
-    
-    total_users = len(user_devices)
+    multi_device_users = int((popcount(user_aggregates['device_mask']) > 1).sum())
+    multi_browser_users = int((popcount(user_aggregates['browser_mask']) > 1).sum())
+    multi_os_users = int((popcount(user_aggregates['os_mask']) > 1).sum())
+    
+    total_users = len(user_aggregates)
     
     print(f"\n📱 Device Distribution (by unique users):")
-    for device, count in sorted(device_counts.items(), key=lambda x: x[1], reverse=True):
+    for device, count in device_counts.items():
         percentage = (count / total_users) * 100
         print(f"  {device}: {count} users ({percentage:.1f}%)")
     
     print(f"\n🌐 Browser Distribution (by unique users):")
-    for browser, count in sorted(browser_counts.items(), key=lambda x: x[1], reverse=True):
+    for browser, count in browser_counts.items():
         percentage = (count / total_users) * 100
         print(f"  {browser}: {count} users ({percentage:.1f}%)")
     
     print(f"\n💻 Operating System Distribution (by unique users):")
-    for os, count in sorted(os_counts.items(), key=lambda x: x[1], reverse=True):
+    for os_name, count in os_counts.items():
         percentage = (count / total_users) * 100
-        print(f"  {os}: {count} users ({percentage:.1f}%)")
+        print(f"  {os_name}: {count} users ({percentage:.1f}%)")
     
     print(f"\n🔄 Multi-Device Usage:")
     print(f"  Users with multiple devices: {multi_device_users} ({(multi_device_users/total_users)*100:.1f}%)")
@@ -195,70 +361,77 @@ def generate_device_statistics(user_devices):
     
     return device_counts, browser_counts, os_counts
 
-def analyze_conversation_patterns(user_devices):
+def analyze_conversation_patterns(user_aggregates):
     """Analyze conversation patterns by device type"""
     print("\n💬 Conversation Patterns by Device:")
     
-    # Group users by their primary device
-    device_groups = defaultdict(list)
+    # Group users by their primary device (first set label in DEVICE_LABELS order)
+    primary_device = lowest_label(user_aggregates['device_mask'], DEVICE_LABELS)
+    has_device = pd.notna(primary_device)
+    counts = user_aggregates['conversation_count'][has_device]
+    device_groups = counts.groupby(primary_device[has_device], sort=False).agg(
+        ['size', 'mean', 'max', 'min'])
     
-    for user_id, data in user_devices.items():
-        if data['unique_devices']:
-            # Use the first device as primary (most common)
-            primary_device = data['unique_devices'][0]
-            device_groups[primary_device].append(data['conversation_count'])
-    
-    for device, conversation_counts in device_groups.items():
-        avg_conversations = sum(conversation_counts) / len(conversation_counts)
-        max_conversations = max(conversation_counts)
-        min_conversations = min(conversation_counts)
-        
+    for device, total_users, avg_conversations, max_conversations, min_conversations in device_groups.itertuples(name=None):
         print(f"\n  {device} Users:")
-        print(f"    Total users: {len(conversation_counts)}")
+        print(f"    Total users: {total_users}")
         print(f"    Average conversations per user: {avg_conversations:.1f}")
         print(f"    Max conversations: {max_conversations}")
         print(f"    Min conversations: {min_conversations}")
 
-def save_detailed_analysis(user_devices):
+def _format_interaction(timestamps):
+    """Format interaction timestamps for the CSV ('' when missing)"""
+    return pd.to_datetime(timestamps, utc=True).dt.strftime('%Y-%m-%d %H:%M:%S UTC').fillna('')
+
+def save_detailed_analysis(user_aggregates, timeline_chunks, json_mode='compact'):
     """Save detailed analysis to files"""
     print("\n💾 Saving detailed analysis...")
     
-    # Create detailed user analysis
-    detailed_analysis = []
-    
-    for user_id, data in user_devices.items():
-        # Convert timestamps to strings for CSV
-        first_interaction_str = data['first_interaction'].strftime('%Y-%m-%d %H:%M:%S UTC') if data['first_interaction'] else ''
-        last_interaction_str = data['last_interaction'].strftime('%Y-%m-%d %H:%M:%S UTC') if data['last_interaction'] else ''
-        
-        detailed_analysis.append({
-            'user_id': user_id,
-            'conversation_count': data['conversation_count'],
-            'first_interaction': first_interaction_str,
-            'last_interaction': last_interaction_str,
-            'devices': ', '.join(data['unique_devices']),
-            'browsers': ', '.join(data['unique_browsers']),
-            'operating_systems': ', '.join(data['unique_operating_systems']),
-            'device_count': len(data['unique_devices']),
-            'browser_count': len(data['unique_browsers']),
-            'os_count': len(data['unique_operating_systems']),
-            'sample_user_agent': data['user_agents'][0] if data['user_agents'] else ''
-        })
+    # Create detailed user analysis (set columns keep both text and bitmask forms)
+    df_analysis = pd.DataFrame({
+        'user_id': user_aggregates.index,
+        'conversation_count': user_aggregates['conversation_count'].to_numpy(),
+        'first_interaction': _format_interaction(user_aggregates['first_interaction']).to_numpy(),
+        'last_interaction': _format_interaction(user_aggregates['last_interaction']).to_numpy(),
+        'devices': masks_to_strings(user_aggregates['device_mask'], DEVICE_LABELS).to_numpy(),
+        'browsers': masks_to_strings(user_aggregates['browser_mask'], BROWSER_LABELS).to_numpy(),
+        'operating_systems': masks_to_strings(user_aggregates['os_mask'], OS_LABELS).to_numpy(),
+        'device_count': popcount(user_aggregates['device_mask']),
+        'browser_count': popcount(user_aggregates['browser_mask']),
+        'os_count': popcount(user_aggregates['os_mask']),
+        'sample_user_agent': [agents[0] if agents else '' for agents in user_aggregates['user_agents']],
+        'device_mask': user_aggregates['device_mask'].to_numpy(),
+        'browser_mask': user_aggregates['browser_mask'].to_numpy(),
+        'os_mask': user_aggregates['os_mask'].to_numpy()
+    })
     
     # Save as CSV
-    df_analysis = pd.DataFrame(detailed_analysis)
     df_analysis.to_csv("sentryskin_user_device_analysis.csv", index=False)
     print("✅ Detailed analysis saved to: sentryskin_user_device_analysis.csv")
     
-    # Save as JSON
+    # Save as JSON (compact: summary fields only, timelines stay in the side file)
+    user_devices = user_devices_from_aggregates(user_aggregates)
     with open("sentryskin_user_device_analysis.json", 'w') as f:
-        json.dump(user_devices, f, indent=2, default=str)
-    print("✅ Detailed analysis saved to: sentryskin_user_device_analysis.json")
+        if json_mode == 'full':
+            timelines = load_user_timelines(timeline_chunks)
+            for user_id, profile in user_devices.items():
+                profile['all_timestamps'] = timelines.get(str(user_id), [])
+            json.dump(user_devices, f, indent=2, default=str)
+        else:
+            json.dump(user_devices, f, separators=(',', ':'), default=str)
+    print(f"✅ Detailed analysis saved to: sentryskin_user_device_analysis.json ({json_mode})")
     
     return df_analysis
 
 def main():
     """Main analysis function"""
+    parser = argparse.ArgumentParser(description='SentrySkin User Device Analysis')
+    parser.add_argument('--full-rebuild', action='store_true',
+                       help='Ignore the saved user state and reprocess the full history')
+    parser.add_argument('--json-mode', choices=['compact', 'full'], default='compact',
+                       help='compact: per-user summaries only; full: also embed all_timestamps (default: compact)')
+    args = parser.parse_args()
+    
     print("🎯 SentrySkin User Device Analysis")
     print("=" * 50)
     
@@ -267,30 +440,48 @@ def main():
     if df is None:
         return
     
+    # Only records newer than the saved state need aggregating
+    state = None if args.full_rebuild else load_user_state()
+    if state is not None and not all(os.path.exists(_timeline_chunk_path(name)) for name in state['timeline_chunks']):
+        print(f"⚠️ Timeline chunks missing from {USER_TIMELINES_DIR}, rebuilding from full history")
+        state = None
+    # Chunks from a run that never committed its state are stale
+    discard_timeline_chunks(state['timeline_chunks'] if state is not None else [])
+    df_new, previous_users, watermark, recent_ids = select_new_records(df, state)
+    
     # Filter by date (October 7th onwards)
-    df_filtered = filter_by_date(df)
+    df_filtered = filter_by_date(df_new)
     
-    if len(df_filtered) == 0:
+    if len(df_filtered) == 0 and previous_users is None:
         print("❌ No data found from October 7th onwards!")
         return
     
-    # Analyze unique users
+    # Analyze unique users among the records being processed
     df_with_users, unique_users, conversation_counts = analyze_unique_users(df_filtered)
     
-    # Analyze user devices
-    user_devices = analyze_user_devices(df_with_users)
+    # Aggregate new records and merge them into the saved per-user state
+    print("\n📱 Analyzing user device patterns...")
+    user_aggregates = merge_user_aggregates(previous_users, aggregate_user_records(df_with_users))
+    timeline_chunks = update_user_timelines(df_with_users, state['timeline_chunks'] if previous_users is not None else [])
+    
+    # The state is written last: it commits the watermark and the new timeline chunk together
+    if watermark is not None:
+        save_user_state(user_aggregates, watermark, recent_ids, timeline_chunks)
+    elif os.path.exists(USER_STATE_FILE):
+        os.remove(USER_STATE_FILE)
+    discard_timeline_chunks(timeline_chunks)
     
     # Generate statistics
-    device_counts, browser_counts, os_counts = generate_device_statistics(user_devices)
+    device_counts, browser_counts, os_counts = generate_device_statistics(user_aggregates)
     
     # Analyze conversation patterns
-    analyze_conversation_patterns(user_devices)
+    analyze_conversation_patterns(user_aggregates)
     
     # Save detailed analysis
-    df_analysis = save_detailed_analysis(user_devices)
+    df_analysis = save_detailed_analysis(user_aggregates, timeline_chunks, args.json_mode)
     
     print(f"\n🎉 Analysis completed!")
-    print(f"📊 Total unique users analyzed: {len(unique_users)}")
+    print(f"📊 Total unique users analyzed: {len(user_aggregates)}")
     print(f"📅 Data period: October 7th onwards")
     print(f"💾 Results saved to CSV and JSON files")
 
@@ -11,17 +11,28 @@ This script automates the entire data pipeline:
 5. Generate post-October 7th analysis
 6. Launch the dashboard
 
+The processing stages are declared in pipeline_dag.py and run in this process.
+Stages whose inputs and code are unchanged since their last run are skipped,
+and with --jobs N independent stages run at the same time.
+
+With --schedule SECONDS the script stays resident instead of launching the
+dashboard: it refreshes every SECONDS (plus random jitter) with modules
+and HTTP sessions kept warm, skips a tick while another run holds the
+pipeline lock, and publishes each successful run for the dashboard.
+
 Usage:
-    python automate_pipeline.py [--skip-fetch] [--skip-analysis] [--dashboard-only]
+    python automate_pipeline.py [--skip-fetch] [--skip-analysis] [--dashboard-only] [--force] [--jobs N]
+    python automate_pipeline.py --schedule SECONDS [--jitter SECONDS] [--jobs N]
 """
 
 import os
 import sys
 import subprocess
 import argparse
+import random
 import time
 from datetime import datetime
-import pandas as pd
+from pipeline_dag import STAGES, select_stages, run_single_flight
 
 def print_header(title):
     """Print a formatted header"""
@@ -34,24 +45,6 @@ def print_step(step_num, total_steps, description):
     print(f"\n📋 Step {step_num}/{total_steps}: {description}")
     print("-" * 50)
 
-def run_script(script_name, description):
-    """Run a Python script and handle errors"""
-    print(f"🔄 Running {description}...")
-    try:
-        result = subprocess.run([sys.executable, script_name], 
-                              capture_output=True, text=True, check=True)
-        print(f"✅ {description} completed successfully")
-        if result.stdout:
-            print("📊 Output:", result.stdout[-200:])  # Show last 200 chars
-        return True
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Error in {description}:")
-        print(f"Error: {e.stderr}")
-        return False
-    except FileNotFoundError:
-        print(f"❌ Script {script_name} not found")
-        return False
-
 def check_file_exists(filename, description):
     """Check if a file exists"""
     if os.path.exists(filename):
@@ -70,6 +63,28 @@ def get_file_size(filename):
     except:
         return "Unknown"
 
+def run_scheduler(stages, interval, jitter, jobs=1):
+    """Refresh every `interval` seconds (+ up to `jitter`) until interrupted; never overlaps another run"""
+    print_header("CREATIO LEAD ANALYSIS - PIPELINE SCHEDULER")
+    print(f"🕒 Refreshing every {interval}s (+ up to {jitter}s jitter), Ctrl+C to stop")
+
+    try:
+        while True:
+            started = time.monotonic()
+            print(f"\n⏰ Scheduled refresh at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            # The stage modules and their HTTP sessions stay imported between runs
+            result = run_single_flight(stages, if_running='skip', jobs=jobs)
+            if result is None:
+                print("⏭️  Another pipeline run is in progress, skipping this refresh")
+            elif result[0]:
+                print(f"❌ Refresh failed at: {', '.join(stage.name for stage, _ in result[0])}")
+
+            delay = max(0.0, interval - (time.monotonic() - started)) + random.uniform(0, jitter)
+            print(f"💤 Next refresh in {delay:.0f}s")
+            time.sleep(delay)
+    except KeyboardInterrupt:
+        print("\n🛑 Scheduler stopped by user")
+
 def main():
     parser = argparse.ArgumentParser(description='Automated Creatio Analysis Pipeline')
     parser.add_argument('--skip-fetch', action='store_true', 
@@ -78,24 +93,33 @@ def main():
                        help='Skip analysis steps')
     parser.add_argument('--dashboard-only', action='store_true', 
                        help='Only launch dashboard (skip all processing)')
+    parser.add_argument('--force', action='store_true',
+                       help='Rerun every stage even if its inputs are unchanged')
+    parser.add_argument('--jobs', type=int, default=1,
+                       help='Stages to run at the same time when they do not depend on each other (default: 1)')
+    parser.add_argument('--schedule', type=float, metavar='SECONDS',
+                       help='Stay resident and refresh every SECONDS instead of launching the dashboard')
+    parser.add_argument('--jitter', type=float, default=30, metavar='SECONDS',
+                       help='Random delay of up to SECONDS added to each scheduled refresh (default: 30)')
     parser.add_argument('--port', type=int, default=8501, 
                        help='Dashboard port (default: 8501)')
     
     args = parser.parse_args()
     
+    skip_groups = []
+    if args.skip_fetch:
+        skip_groups.append('fetch')
+    if args.skip_analysis:
+        skip_groups.append('analysis')
+    
+    if args.schedule:
+        run_scheduler(select_stages(skip_groups=skip_groups), args.schedule, args.jitter, args.jobs)
+        return True
+    
     print_header("CREATIO LEAD ANALYSIS - AUTOMATED PIPELINE")
     print(f"🕒 Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
-    # Define pipeline steps
-    pipeline_steps = [
-        ("fetch_leads.py", "Fetch Creatio Leads Data"),
-        ("fetch_sentryskin_data.py", "Fetch SentrySkin n8n Data"),
-        ("extract_sentryskin_fields.py", "Extract SentrySkin Fields"),
-        ("analyze_sentryskin_users.py", "Analyze User Device Patterns"),
-        ("analyze_post_oct7_2025.py", "Generate Post-Oct 7th Analysis")
-    ]
-    
-    total_steps = len(pipeline_steps) + 1  # +1 for dashboard launch
+    total_steps = len(STAGES) + 1  # +1 for dashboard launch
     
     # Check if we should skip processing
     if args.dashboard_only:
@@ -111,20 +135,20 @@ def main():
     if not skip_to_dashboard:
         print("\n📊 DATA PROCESSING PIPELINE")
         
-        for i, (script, description) in enumerate(pipeline_steps, 1):
-            if args.skip_fetch and i <= 2:  # Skip first 2 steps (fetching)
-                print(f"\n⏭️  Skipping {description} (--skip-fetch)")
-                continue
-            if args.skip_analysis and i > 2:  # Skip last 3 steps (analysis)
-                print(f"\n⏭️  Skipping {description} (--skip-analysis)")
-                continue
-                
-            print_step(i, total_steps, description)
-            success = run_script(script, description)
-            if not success:
-                print(f"\n❌ Pipeline failed at step {i}: {description}")
-                print("🛑 Stopping pipeline. Check the error above.")
-                return False
+        for stage in STAGES:
+            if stage.group in skip_groups:
+                flag = '--skip-fetch' if stage.group == 'fetch' else '--skip-analysis'
+                print(f"\n⏭️  Skipping {stage.description} ({flag})")
+        
+        # All stages run in this process, sharing parsed DataFrames; independent branches run in parallel with --jobs
+        # A run already in progress (scheduler or dashboard) finishes first
+        failed, _, _ = run_single_flight(select_stages(skip_groups=skip_groups), if_running='wait',
+                                         total_steps=total_steps, force=args.force, jobs=args.jobs)
+        if failed:
+            for stage, _ in failed:
+                print(f"\n❌ Pipeline failed at stage {stage.name}: {stage.description}")
+            print("🛑 Stopping pipeline. Check the errors above.")
+            return False
     
     # Verify essential files exist
     print("\n🔍 VERIFYING ESSENTIAL FILES")
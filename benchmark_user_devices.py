@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+SentrySkin User Device Analysis Benchmark
+Times analyze_user_devices on synthetic data and checks it against the per-user reference
+
+Usage:
+    python benchmark_user_devices.py [--users 100000] [--records-per-user 5] [--validate-users 2000]
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from analyze_sentryskin_users import analyze_user_devices
+from user_agent_sets import classify_user_agent
+
+SAMPLE_USER_AGENTS = [
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_0 like Mac OS X) AppleWebKit/605.1.15 Version/17.0 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 Version/17.0 Safari/605.1.15",
+    "Mozilla/5.0 (Linux; Android 14) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Mobile Safari/537.36",
+    "Mozilla/5.0 (iPad; CPU OS 17_0 like Mac OS X) AppleWebKit/605.1.15 Version/17.0 Safari/604.1",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:120.0) Gecko/20100101 Firefox/120.0",
+]
+
+def make_synthetic_records(n_users, records_per_user, seed=7):
+    """Build a df_with_users-shaped frame with about n_users * records_per_user rows"""
+    rng = np.random.default_rng(seed)
+    n_records = n_users * records_per_user
+
+    user_codes = rng.integers(0, n_users, n_records)
+    # Most users stick to one user agent, some switch devices
+    agent_codes = (user_codes + (rng.random(n_records) < 0.1)) % len(SAMPLE_USER_AGENTS)
+    offsets = rng.integers(0, 90 * 24 * 3600, n_records)
+
+    return pd.DataFrame({
+        'user_identifier': np.char.add('user-', user_codes.astype(str)),
+        'user_agent': np.array(SAMPLE_USER_AGENTS, dtype=object)[agent_codes],
+        'timestamp': pd.Timestamp('2025-08-01', tz='UTC') + pd.to_timedelta(offsets, unit='s'),
+    })
+
+def reference_user_devices(df_with_users):
+    """Per-user boolean-mask implementation the groupby version replaced"""
+    user_devices = {}
+    for user_id in df_with_users['user_identifier'].unique():
+        user_records = df_with_users[df_with_users['user_identifier'] == user_id]
+        user_agents = user_records['user_agent'].dropna().unique()
+        timestamps = user_records['timestamp'].tolist()
+
+        classified = [classify_user_agent(user_agent) for user_agent in user_agents if user_agent]
+        user_devices[user_id] = {
+            'conversation_count': len(user_records),
+            'unique_devices': {c[0] for c in classified},
+            'unique_browsers': {c[1] for c in classified},
+            'unique_operating_systems': {c[2] for c in classified},
+            'user_agents': list(user_agents),
+            'first_interaction': min(timestamps) if timestamps else None,
+            'last_interaction': max(timestamps) if timestamps else None
+        }
+    return user_devices
+
+def validate(n_users, records_per_user):
+    """Compare the groupby implementation with the reference on a small dataset"""
+    df = make_synthetic_records(n_users, records_per_user, seed=11)
+
+    start = time.perf_counter()
+    expected = reference_user_devices(df)
+    reference_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = analyze_user_devices(df)
+    groupby_elapsed = time.perf_counter() - start
+
+    assert list(actual) == list(expected), "user order differs"
+    for user_id, exp in expected.items():
+        act = actual[user_id]
+        assert act['conversation_count'] == exp['conversation_count'], user_id
+        assert set(act['unique_devices']) == exp['unique_devices'], user_id
+        assert set(act['unique_browsers']) == exp['unique_browsers'], user_id
+        assert set(act['unique_operating_systems']) == exp['unique_operating_systems'], user_id
+        assert act['user_agents'] == exp['user_agents'], user_id
+        assert act['first_interaction'] == exp['first_interaction'], user_id
+        assert act['last_interaction'] == exp['last_interaction'], user_id
+    print(f"✅ Groupby output matches the per-user reference for {len(expected)} users")
+    print(f"⏱️  Reference: {reference_elapsed:.2f}s, groupby: {groupby_elapsed:.2f}s")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark analyze_user_devices')
+    parser.add_argument('--users', type=int, default=100_000,
+                       help='Number of synthetic users (default: 100000)')
+    parser.add_argument('--records-per-user', type=int, default=5,
+                       help='Average executions per user (default: 5)')
+    parser.add_argument('--validate-users', type=int, default=2_000,
+                       help='Users in the reference comparison, 0 to skip (default: 2000)')
+    args = parser.parse_args()
+
+    print("🎯 SentrySkin User Device Analysis Benchmark")
+    print("=" * 50)
+
+    if args.validate_users:
+        validate(args.validate_users, args.records_per_user)
+
+    df = make_synthetic_records(args.users, args.records_per_user)
+    print(f"📊 Synthetic records: {len(df)} ({df['user_identifier'].nunique()} users)")
+
+    start = time.perf_counter()
+    user_devices = analyze_user_devices(df)
+    elapsed = time.perf_counter() - start
+
+    print(f"⏱️  analyze_user_devices: {elapsed:.2f}s for {len(user_devices)} users")
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,23 @@ from google.oauth2 import service_account
 import threading
 import queue
 import streamlit.components.v1 as components
+from user_agent_sets import DEVICE_LABELS, BROWSER_LABELS, OS_LABELS, ensure_mask_columns, has_any, mask_counts
+from sentryskin_user_sketches import SKETCHES_FILE as USER_SKETCHES_FILE, load_daily_sketches, distinct_users, relative_error
+from sentryskin_daily_rollup import ROLLUP_FILE, load_rollup, rollup_counts
+from sentryskin_cohort_retention import cohort_retention, retention_rates
+from volume_anomalies import load_recent_alerts, format_alert
+from sentryskin_latency_sketches import SKETCHES_FILE as LATENCY_SKETCHES_FILE, ACCURACY, load_latency_sketches, latency_quantiles, daily_latency_quantiles
+from sentryskin_node_profile import NODE_PROFILE_FILE
+from sentryskin_stage_flow import TRANSITIONS_FILE, FUNNEL_FILE
+from lead_identity import resolve_identities, method_overlap
+from pipeline_dag import (
+    STAGES, DETAILED_REPORT_FILE, EXTRACTED_FILE, run_single_flight, load_job_state, load_publication,
+    publication_age, snapshot_path
+)
+from multi_value_columns import parse_multi_values, label_counts, co_occurrence, rows_with_any, select_rows
+from activity_heatmap import (
+    HEATMAP_TIMEZONE, WEEKDAY_LABELS, build_day_buckets, day_range, heatmap_matrix, sentryskin_day_buckets
+)
 
 # ==============================
 # 🔐 CONFIGURATION
@@ -185,6 +202,11 @@ def process_leads_data(leads_data):
     
     return pd.DataFrame(parsed_leads)
 
+@st.cache_data
+def get_leads_day_buckets(created_on):
+    """Per-day hour/weekday buckets of lead Created_On (cached per data content)"""
+    return build_day_buckets(created_on)
+
 # ==============================
 # 📊 VISUALIZATION FUNCTIONS
 # ==============================
@@ -521,62 +543,59 @@ def create_landing_vs_sentryskin_comparison(df):
     return fig
 
 def fetch_sentryskin_data_from_api():
-    """Fetch SentrySkin data directly from n8n API"""
+    """Fetch SentrySkin data from the n8n API and rebuild the analyses in-process"""
     try:
-        # Import the fetch function from the existing script
-        import subprocess
-        import sys
-        
-        # Run the fetch script to get fresh data
-        result = subprocess.run([sys.executable, "fetch_sentryskin_data.py"], 
-                              capture_output=True, text=True, timeout=300)
+        # Every stage except the leads fetch (leads are read live above); the report comes back in memory
+        stages = [stage for stage in STAGES if stage.name != 'fetch_leads']
+        # Sessions refreshing at the same time (or during a scheduled run) share one pipeline job
+        job = load_job_state()
+        if job is not None and job['state'] == 'running':
+            st.info(f"⏳ Joining the refresh already running since {job['started_at']}")
+        failed, frames, _ = run_single_flight(stages)
         
-        if result.returncode != 0:
-            st.error(f"Error fetching SentrySkin data: {result.stderr}")
+        if failed:
+            for stage, error in failed:
+                st.error(f"Error in {stage.description}: {error.strip().splitlines()[-1]}")
             return None
-            
-        # Run the extraction script
-        result = subprocess.run([sys.executable, "extract_sentryskin_fields.py"], 
-                              capture_output=True, text=True, timeout=300)
         
-        if result.returncode != 0:
-            st.error(f"Error extracting SentrySkin fields: {result.stderr}")
-            return None
-            
-        # Run the user analysis script
-        result = subprocess.run([sys.executable, "analyze_sentryskin_users.py"], 
-                              capture_output=True, text=True, timeout=300)
-        
-        if result.returncode != 0:
-            st.error(f"Error analyzing SentrySkin users: {result.stderr}")
-            return None
-            
-        # Run the post-Oct 7th analysis script
-        result = subprocess.run([sys.executable, "analyze_post_oct7_2025.py"], 
-                              capture_output=True, text=True, timeout=300)
-        
-        if result.returncode != 0:
-            st.error(f"Error generating post-Oct 7th analysis: {result.stderr}")
-            return None
-            
-        # Now load the generated data
-        try:
-            df = pd.read_csv("sentryskin_post_oct7_2025_detailed_report.csv")
-            return df
-        except FileNotFoundError:
+        df = frames.get(DETAILED_REPORT_FILE)
+        report_path = snapshot_path(DETAILED_REPORT_FILE, load_publication())
+        if df is None and os.path.exists(report_path):
+            # The analysis was up to date, or ran in the job we attached to, so its report is only on disk
+            df = pd.read_csv(report_path)
+        if df is None:
             st.error("Analysis completed but report file not found")
-            return None
+        return df
             
-    except subprocess.TimeoutExpired:
-        st.error("Data fetching timed out. Please try again.")
-        return None
     except Exception as e:
         st.error(f"Error in data pipeline: {str(e)}")
         return None
 
+# Published runs younger than this are shown as-is instead of refreshing while the page loads
+PUBLISHED_MAX_AGE_SECONDS = 3600
+
+@st.cache_data
+def read_snapshot_csv(version, path, **kwargs):
+    """CSV from a published snapshot; snapshots never change, so the version id is the cache key"""
+    return pd.read_csv(path, **kwargs)
+
+def read_output_csv(publication, name, **kwargs):
+    """A pipeline CSV output from the published snapshot, or the working file if it is not published"""
+    path = snapshot_path(name, publication)
+    if path == name:
+        return pd.read_csv(path, **kwargs)
+    return read_snapshot_csv(publication['version'], path, **kwargs)
+
 def load_sentryskin_user_analysis():
-    """Load SentrySkin user analysis data - try API first, fallback to static file"""
-    # First try to fetch fresh data from API
+    """Load SentrySkin user analysis data - published run first, then API, then static file"""
+    # A recent run by the scheduler (automate_pipeline.py --schedule) or a refresh is picked up from disk
+    publication = load_publication()
+    report_path = snapshot_path(DETAILED_REPORT_FILE, publication)
+    if publication is not None and publication_age(publication) < PUBLISHED_MAX_AGE_SECONDS \
+            and os.path.exists(report_path):
+        return read_snapshot_csv(publication['version'], report_path)
+    
+    # Otherwise fetch fresh data from API
     df = fetch_sentryskin_data_from_api()
     
     if df is not None and not df.empty:
@@ -595,12 +614,7 @@ def create_device_distribution_chart(df):
         return None
     
     # Count devices
-    device_counts = {}
-    for devices in df['devices']:
-        if pd.notna(devices):
-            for device in devices.split(', '):
-                device = device.strip()
-                device_counts[device] = device_counts.get(device, 0) + 1
+    device_counts = mask_counts(ensure_mask_columns(df)['device_mask'], DEVICE_LABELS).to_dict()
     
     if not device_counts:
         return None
@@ -629,12 +643,7 @@ def create_browser_distribution_chart(df):
         return None
     
     # Count browsers
-    browser_counts = {}
-    for browsers in df['browsers']:
-        if pd.notna(browsers):
-            for browser in browsers.split(', '):
-                browser = browser.strip()
-                browser_counts[browser] = browser_counts.get(browser, 0) + 1
+    browser_counts = mask_counts(ensure_mask_columns(df)['browser_mask'], BROWSER_LABELS).to_dict()
     
     if not browser_counts:
         return None
@@ -667,12 +676,7 @@ def create_os_distribution_chart(df):
         return None
     
     # Count operating systems
-    os_counts = {}
-    for os_list in df['operating_systems']:
-        if pd.notna(os_list):
-            for os in os_list.split(', '):
-                os = os.strip()
-                os_counts[os] = os_counts.get(os, 0) + 1
+    os_counts = mask_counts(ensure_mask_columns(df)['os_mask'], OS_LABELS).to_dict()
     
     if not os_counts:
         return None
@@ -720,6 +724,260 @@ def create_conversation_distribution_chart(df):
     
     return fig
 
+def create_daily_activity_chart(rollup):
+    """Create daily SentrySkin executions chart by device from the daily rollup"""
+    if rollup is None or rollup.empty:
+        return None
+    
+    daily = rollup.groupby(['day', 'device'])['executions'].sum().reset_index()
+    
+    fig = px.bar(
+        daily,
+        x='day',
+        y='executions',
+        color='device',
+        title="SentrySkin Activity - Daily Executions by Device"
+    )
+    
+    fig.update_layout(
+        xaxis_title="Day (UTC)",
+        yaxis_title="Executions",
+        font=dict(size=14, color='black', family="Arial"),
+        height=400,
+        barmode='stack'
+    )
+    
+    return fig
+
+def create_stage_distribution_chart(rollup):
+    """Create conversation stage distribution chart from the daily rollup"""
+    if rollup is None or rollup.empty:
+        return None
+    
+    stage_counts = rollup_counts(rollup, 'conversation_stage')
+    
+    fig = go.Figure(data=[go.Bar(
+        x=stage_counts.index.tolist(),
+        y=stage_counts.values.tolist(),
+        marker_color='#45B7D1',
+        text=stage_counts.values.tolist(),
+        textposition='outside'
+    )])
+    
+    fig.update_layout(
+        title="SentrySkin Activity - Conversation Stages",
+        xaxis_title="Conversation Stage",
+        yaxis_title="Executions",
+        font=dict(size=14, color='black', family="Arial"),
+        height=400,
+        yaxis=dict(range=[0, stage_counts.max() * 1.2])
+    )
+    
+    return fig
+
+def create_retention_heatmap(matrix):
+    """Create weekly cohort retention heatmap"""
+    if matrix is None or matrix.empty:
+        return None
+    
+    rates = retention_rates(matrix) * 100
+    cohort_labels = [
+        f"{week.strftime('%Y-%m-%d')} ({size} users)"
+        for week, size in zip(matrix.index, matrix['cohort_size'])
+    ]
+    offsets = [column.replace('week_', 'Week ') for column in rates.columns]
+    
+    fig = go.Figure(data=go.Heatmap(
+        z=rates.to_numpy(),
+        x=offsets,
+        y=cohort_labels,
+        colorscale='Blues',
+        zmin=0,
+        zmax=100,
+        text=rates.round(0).to_numpy(),
+        texttemplate='%{text}%',
+        hovertemplate='Cohort %{y}<br>%{x}: %{z:.1f}%<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title="User Analysis - Weekly Cohort Retention",
+        xaxis_title="Weeks Since First Interaction",
+        yaxis_title="Cohort (week of first interaction)",
+        font=dict(size=14, color='black', family="Arial"),
+        height=max(400, 40 * len(cohort_labels)),
+        yaxis=dict(autorange='reversed')
+    )
+    
+    return fig
+
+def create_activity_heatmap(matrix, title):
+    """Create hour-of-day x weekday heatmap from a 7x24 count matrix"""
+    if matrix is None or matrix.sum() == 0:
+        return None
+    
+    fig = go.Figure(data=go.Heatmap(
+        z=matrix,
+        x=[f"{hour:02d}:00" for hour in range(24)],
+        y=WEEKDAY_LABELS,
+        colorscale='YlOrRd',
+        hovertemplate='%{y} %{x}: %{z}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title=title,
+        xaxis_title=f"Hour of Day ({HEATMAP_TIMEZONE})",
+        yaxis_title="Weekday",
+        font=dict(size=14, color='black', family="Arial"),
+        height=400,
+        yaxis=dict(autorange='reversed')
+    )
+    
+    return fig
+
+def create_latency_chart(daily_latency):
+    """Create daily p50/p95/p99 execution time chart"""
+    if daily_latency is None or daily_latency.empty:
+        return None
+    
+    fig = go.Figure()
+    for column, color in [('p50', '#4ECDC4'), ('p95', '#FECA57'), ('p99', '#FF6B6B')]:
+        fig.add_trace(go.Scatter(
+            x=daily_latency.index,
+            y=daily_latency[column] / 1000,
+            mode='lines+markers',
+            name=column,
+            line=dict(color=color)
+        ))
+    
+    fig.update_layout(
+        title="SentrySkin Workflow Execution Time",
+        xaxis_title="Day (UTC)",
+        yaxis_title="Seconds",
+        font=dict(size=14, color='black', family="Arial"),
+        height=400
+    )
+    
+    return fig
+
+def create_node_profile_chart(profile):
+    """Create per-node p50/p95 execution time chart"""
+    if profile is None or profile.empty:
+        return None
+    
+    fig = go.Figure(data=[
+        go.Bar(name='p50', x=profile['node'], y=profile['p50_ms'], marker_color='#4ECDC4'),
+        go.Bar(name='p95', x=profile['node'], y=profile['p95_ms'], marker_color='#FF6B6B')
+    ])
+    
+    fig.update_layout(
+        title="SentrySkin Workflow - Execution Time by Node",
+        xaxis_title="Node",
+        yaxis_title="Milliseconds",
+        font=dict(size=14, color='black', family="Arial"),
+        height=400,
+        barmode='group'
+    )
+    
+    return fig
+
+def create_stage_flow_sankey(transitions):
+    """Create Sankey diagram of conversation stage transitions (repeats of a stage omitted)"""
+    if transitions is None or transitions.empty:
+        return None
+    
+    flows = transitions[transitions['from_stage'] != transitions['to_stage']]
+    labels = list(pd.unique(pd.concat([flows['from_stage'], flows['to_stage']])))
+    index = {label: i for i, label in enumerate(labels)}
+    colors = ['#4ECDC4' if label == 'Start' else '#FF6B6B' if label == 'End' else '#45B7D1' for label in labels]
+    
+    fig = go.Figure(data=[go.Sankey(
+        node=dict(
+            pad=15,
+            thickness=20,
+            line=dict(color="black", width=0.5),
+            label=labels,
+            color=colors
+        ),
+        link=dict(
+            source=flows['from_stage'].map(index).tolist(),
+            target=flows['to_stage'].map(index).tolist(),
+            value=flows['transitions'].tolist()
+        )
+    )])
+    
+    fig.update_layout(
+        title="Conversation Stage Flow (End = conversation dropped off)",
+        font=dict(size=14, color='black', family="Arial"),
+        height=500
+    )
+    
+    return fig
+
+def create_stage_funnel_chart(funnel):
+    """Create funnel of threads reaching each conversation stage"""
+    if funnel is None or funnel.empty:
+        return None
+    
+    fig = go.Figure(go.Funnel(
+        y=funnel['stage'],
+        x=funnel['threads_reached'],
+        textinfo="value+percent initial",
+        marker=dict(color='#45B7D1')
+    ))
+    
+    fig.update_layout(
+        title="Threads Reaching Each Stage",
+        font=dict(size=14, color='black', family="Arial"),
+        height=400
+    )
+    
+    return fig
+
+def create_multi_value_chart(encoded, title, color):
+    """Create bar chart of how many leads list each value of a multi-valued field"""
+    counts = label_counts(encoded)
+    if counts.empty:
+        return None
+    
+    fig = go.Figure(data=[go.Bar(
+        x=counts.index,
+        y=counts.values,
+        marker_color=color,
+        text=counts.values,
+        textposition='outside'
+    )])
+    
+    fig.update_layout(
+        title=title,
+        yaxis_title="Number of Leads",
+        font=dict(size=14, color='black', family="Arial"),
+        height=400,
+        yaxis=dict(range=[0, counts.max() * 1.2])
+    )
+    
+    return fig
+
+def create_co_occurrence_heatmap(encoded, title):
+    """Create heatmap of how often two values are listed on the same lead"""
+    counts = label_counts(encoded)
+    if len(counts) < 2:
+        return None
+    
+    matrix = co_occurrence(encoded).loc[counts.index, counts.index]
+    fig = px.imshow(
+        matrix,
+        text_auto=True,
+        color_continuous_scale="Blues",
+        labels=dict(x="", y="", color="Leads"),
+        title=title
+    )
+    fig.update_layout(
+        font=dict(size=14, color='black', family="Arial"),
+        height=400
+    )
+    
+    return fig
+
 # ==============================
 # 🎨 DASHBOARD LAYOUT
 # ==============================
@@ -747,6 +1005,13 @@ def main():
     st.title("📊 Creatio Lead Analysis Dashboard")
     st.markdown("---")
     
+    # Volume anomalies flagged by the last pipeline run
+    volume_alerts = load_recent_alerts()
+    if volume_alerts:
+        with st.expander(f"🚨 {len(volume_alerts)} volume alerts in the last 7 days", expanded=True):
+            for alert in volume_alerts:
+                st.warning(format_alert(alert))
+    
     # Chat Export (BigQuery): run once (if missing) and store CSV, then offer simple download
     st.subheader("💬 Chat Export (BigQuery)")
     export_path = "chat_bigquery_export.csv"
@@ -816,6 +1081,11 @@ def main():
     
     st.sidebar.markdown("---")
     st.sidebar.markdown("**Last Updated (EST):** " + datetime.now(ZoneInfo("America/New_York")).strftime("%Y-%m-%d %H:%M:%S"))
+    # Every output below is read from this one published snapshot
+    publication = load_publication()
+    if publication is not None:
+        published_at = datetime.fromisoformat(publication['published_at']).astimezone(ZoneInfo("America/New_York"))
+        st.sidebar.markdown("**SentrySkin Data Published (EST):** " + published_at.strftime("%Y-%m-%d %H:%M:%S"))
     
     # Data loading
     with st.spinner("🔄 Fetching latest data from Creatio..."):
@@ -831,13 +1101,30 @@ def main():
         st.warning("⚠️ No leads found in the data.")
         return
     
+    # Repeat submissions of the same person share a Lead_Cluster (matched on email/phone)
+    df['Lead_Cluster'] = resolve_identities(df)
+    unique_people = df['Lead_Cluster'].nunique()
+    
+    # Multi-valued lead fields, parsed once and reused by charts, filters and statistics
+    courses = parse_multi_values(df['Course_Of_Interest'])
+    reach_methods = parse_multi_values(df['Best_Way_To_Reach'])
+    
     # Key metrics
     st.subheader("📈 Key Metrics")
-    col1, col2, col3, col4 = st.columns(4)
+    col1, col2, col3, col4, col5 = st.columns(5)
     
     with col1:
         st.metric("Total Leads", len(df))
     
+    with col5:
+        st.metric(
+            "Unique People",
+            unique_people,
+            delta=f"-{len(df) - unique_people} duplicates",
+            delta_color="off",
+            help="Leads grouped by normalized email or mobile phone"
+        )
+    
     with col2:
         sentryskin_count = len(df[df['Register_Method'] == 'sentryskin'])
         st.metric("SentrySkin Leads", sentryskin_count)
@@ -850,6 +1137,13 @@ def main():
         enrolled_count = len(df[df['Status'] == 'Enrolled/Confirm'])
         st.metric("Enrolled Leads", enrolled_count)
     
+    with st.expander("👤 Raw vs Deduplicated Leads by Register Method"):
+        overlap = method_overlap(df, df['Lead_Cluster']).rename(columns={
+            'raw_leads': 'Raw Leads',
+            'unique_people': 'Unique People'
+        })
+        st.dataframe(overlap, use_container_width=True)
+    
     st.markdown("---")
     
     # Charts section
@@ -894,6 +1188,28 @@ def main():
     else:
         st.warning("⚠️ No Landing Page or SentrySkin leads found for comparison")
     
+    # Row 3b: Multi-valued lead fields
+    st.subheader("🎓 Course Interest and Contact Preferences")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        course_chart = create_multi_value_chart(courses, "Courses of Interest", '#45B7D1')
+        if course_chart:
+            st.plotly_chart(course_chart, use_container_width=True)
+        else:
+            st.info("No course interest recorded")
+    
+    with col2:
+        reach_chart = create_multi_value_chart(reach_methods, "Best Way to Reach", '#96CEB4')
+        if reach_chart:
+            st.plotly_chart(reach_chart, use_container_width=True)
+        else:
+            st.info("No contact preferences recorded")
+    
+    reach_heatmap = create_co_occurrence_heatmap(reach_methods, "Contact Methods Listed Together")
+    if reach_heatmap:
+        st.plotly_chart(reach_heatmap, use_container_width=True)
+    
     # Row 4: User Analysis
     st.subheader("👥 User Analysis")
     
@@ -917,6 +1233,20 @@ def main():
         sentryskin_users_df = load_sentryskin_user_analysis()
     
     if sentryskin_users_df is not None and not sentryskin_users_df.empty:
+        # Device filter works on the bitmask column
+        sentryskin_users_df = ensure_mask_columns(sentryskin_users_df)
+        selected_devices = st.multiselect(
+            "Filter Users by Device",
+            DEVICE_LABELS,
+            default=DEVICE_LABELS,
+            key="user_devices",
+            help="Show users who used at least one of the selected devices"
+        )
+        if len(selected_devices) < len(DEVICE_LABELS):
+            sentryskin_users_df = sentryskin_users_df[
+                has_any(sentryskin_users_df['device_mask'], selected_devices, DEVICE_LABELS)
+            ]
+        
         # Display key metrics
         col1, col2, col3, col4 = st.columns(4)
         
@@ -951,6 +1281,29 @@ def main():
                 help="Highest number of conversations by a single user"
             )
         
+        # Distinct users over any date range, merged from the daily HyperLogLog sketches
+        user_sketches = load_daily_sketches(snapshot_path(USER_SKETCHES_FILE, publication))
+        if user_sketches is not None and len(user_sketches['days']) > 0:
+            first_day = pd.Timestamp(user_sketches['days'][0]).date()
+            last_day = pd.Timestamp(user_sketches['days'][-1]).date()
+            col1, col2 = st.columns([2, 1])
+            with col1:
+                sketch_range = st.date_input(
+                    "Distinct Users Date Range (UTC)",
+                    value=(first_day, last_day),
+                    min_value=first_day,
+                    max_value=last_day,
+                    key="sketch_date_range"
+                )
+            if isinstance(sketch_range, (tuple, list)) and len(sketch_range) == 2:
+                with col2:
+                    st.metric(
+                        label="Distinct Users in Range",
+                        value=distinct_users(user_sketches, sketch_range[0], sketch_range[1]),
+                        help=f"HyperLogLog estimate over all SentrySkin executions "
+                             f"(±{relative_error() * 100:.1f}% standard error)"
+                    )
+        
         # Create charts in two rows
         # Row 1: Device and Browser Distribution
         col1, col2 = st.columns(2)
@@ -986,6 +1339,36 @@ def main():
             else:
                 st.info("No conversation data available")
         
+        # Row 3: Execution activity from the precomputed daily rollup
+        activity_rollup = load_rollup(snapshot_path(ROLLUP_FILE, publication))
+        if activity_rollup is not None and len(selected_devices) < len(DEVICE_LABELS):
+            activity_rollup = activity_rollup[activity_rollup['device'].isin(selected_devices)]
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            activity_chart = create_daily_activity_chart(activity_rollup)
+            if activity_chart:
+                st.plotly_chart(activity_chart, use_container_width=True)
+            else:
+                st.info("No daily activity data available")
+        
+        with col2:
+            stage_chart = create_stage_distribution_chart(activity_rollup)
+            if stage_chart:
+                st.plotly_chart(stage_chart, use_container_width=True)
+            else:
+                st.info("No conversation stage data available")
+        
+        # Row 4: Weekly cohort retention (cached per version of the extracted data)
+        try:
+            retention_chart = create_retention_heatmap(cohort_retention(snapshot_path(EXTRACTED_FILE, publication)))
+        except FileNotFoundError:
+            retention_chart = None
+        if retention_chart:
+            st.plotly_chart(retention_chart, use_container_width=True)
+        else:
+            st.info("No cohort retention data available")
+        
         # Top Active Users Table
         st.subheader("🏆 Top 10 Most Active Users")
         
@@ -1026,6 +1409,125 @@ def main():
         4. 📋 Generate post-October 7th report
         """)
     
+    # Row 5: Activity by hour of day and weekday
+    st.subheader("🕒 Activity by Hour and Weekday")
+    
+    try:
+        chat_buckets = sentryskin_day_buckets(snapshot_path(EXTRACTED_FILE, publication))
+    except FileNotFoundError:
+        chat_buckets = None
+    lead_buckets = get_leads_day_buckets(df['Created_On']) if 'Created_On' in df.columns else None
+    
+    covered = [day_range(buckets) for buckets in (chat_buckets, lead_buckets)
+               if buckets is not None and buckets['first_day'] is not None]
+    if covered:
+        first_day = min(first for first, _ in covered)
+        last_day = max(last for _, last in covered)
+        heatmap_range = st.date_input(
+            f"Activity Date Range ({HEATMAP_TIMEZONE})",
+            value=(first_day, last_day),
+            min_value=first_day,
+            max_value=last_day,
+            key="heatmap_date_range"
+        )
+        if isinstance(heatmap_range, (tuple, list)) and len(heatmap_range) == 2:
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                chat_heatmap = create_activity_heatmap(
+                    heatmap_matrix(chat_buckets, *heatmap_range) if chat_buckets else None,
+                    "SentrySkin Chats by Hour and Weekday"
+                )
+                if chat_heatmap:
+                    st.plotly_chart(chat_heatmap, use_container_width=True)
+                else:
+                    st.info("No SentrySkin chats in this range")
+            
+            with col2:
+                lead_heatmap = create_activity_heatmap(
+                    heatmap_matrix(lead_buckets, *heatmap_range) if lead_buckets else None,
+                    "Creatio Leads by Hour and Weekday"
+                )
+                if lead_heatmap:
+                    st.plotly_chart(lead_heatmap, use_container_width=True)
+                else:
+                    st.info("No leads in this range")
+    else:
+        st.info("No activity data available")
+    
+    # Row 6: Workflow latency from the per-day quantile sketches
+    st.subheader("⏱️ SentrySkin Response Latency")
+    
+    latency_sketches = load_latency_sketches(snapshot_path(LATENCY_SKETCHES_FILE, publication))
+    if latency_sketches is not None and len(latency_sketches['days']) > 0:
+        first_day = pd.Timestamp(latency_sketches['days'][0]).date()
+        last_day = pd.Timestamp(latency_sketches['days'][-1]).date()
+        latency_range = st.date_input(
+            "Latency Date Range (UTC)",
+            value=(first_day, last_day),
+            min_value=first_day,
+            max_value=last_day,
+            key="latency_date_range"
+        )
+        if isinstance(latency_range, (tuple, list)) and len(latency_range) == 2:
+            window_quantiles = latency_quantiles(latency_sketches, *latency_range)
+            col1, col2, col3 = st.columns(3)
+            for col, (quantile, value) in zip((col1, col2, col3), window_quantiles.items()):
+                with col:
+                    st.metric(
+                        label=f"p{quantile * 100:g} Execution Time",
+                        value=f"{value / 1000:.2f}s" if pd.notna(value) else "N/A",
+                        help=f"From per-day quantile sketches (±{ACCURACY * 100:g}% relative error)"
+                    )
+            
+            daily_latency = daily_latency_quantiles(latency_sketches)
+            daily_latency = daily_latency[
+                (daily_latency.index.date >= latency_range[0]) & (daily_latency.index.date <= latency_range[1])
+                & (daily_latency['executions'] > 0)
+            ]
+            latency_chart = create_latency_chart(daily_latency)
+            if latency_chart:
+                st.plotly_chart(latency_chart, use_container_width=True)
+        
+        # Which workflow node the time goes to (all history)
+        try:
+            node_chart = create_node_profile_chart(read_output_csv(publication, NODE_PROFILE_FILE))
+        except FileNotFoundError:
+            node_chart = None
+        if node_chart:
+            st.plotly_chart(node_chart, use_container_width=True)
+    else:
+        st.info("No latency data available")
+    
+    # Row 7: Conversation stage progression and drop-off
+    st.subheader("🔀 Conversation Stage Flow")
+    
+    try:
+        transitions = read_output_csv(publication, TRANSITIONS_FILE, keep_default_na=False)
+        funnel = read_output_csv(publication, FUNNEL_FILE, keep_default_na=False)
+    except FileNotFoundError:
+        transitions = funnel = None
+    
+    stage_sankey = create_stage_flow_sankey(transitions)
+    if stage_sankey:
+        st.plotly_chart(stage_sankey, use_container_width=True)
+        col1, col2 = st.columns(2)
+        with col1:
+            funnel_chart = create_stage_funnel_chart(funnel)
+            if funnel_chart:
+                st.plotly_chart(funnel_chart, use_container_width=True)
+        with col2:
+            drop_off = funnel.rename(columns={
+                'stage': 'Stage',
+                'threads_reached': 'Threads Reached',
+                'threads_ended': 'Ended Here',
+                'drop_off_rate': 'Drop-off Rate'
+            })
+            drop_off['Drop-off Rate'] = (drop_off['Drop-off Rate'] * 100).round(1).astype(str) + '%'
+            st.dataframe(drop_off, use_container_width=True, hide_index=True)
+    else:
+        st.info("No stage flow data available")
+    
     # Add filters for all charts
     with st.expander("🔧 Chart Filters", expanded=True):
         col1, col2, col3 = st.columns(3)
@@ -1056,6 +1558,26 @@ def main():
                 key="chart_statuses",
                 help="Select which statuses to show"
             )
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            selected_courses = st.multiselect(
+                "Filter Courses of Interest",
+                courses['labels'],
+                default=courses['labels'],
+                key="chart_courses",
+                help="Show leads interested in any of the selected courses"
+            )
+        
+        with col2:
+            selected_reach = st.multiselect(
+                "Filter Best Way to Reach",
+                reach_methods['labels'],
+                default=reach_methods['labels'],
+                key="chart_reach",
+                help="Show leads reachable by any of the selected methods"
+            )
     
     # Apply filters to all charts after getting filter values
     if selected_methods:
@@ -1064,6 +1586,10 @@ def main():
         filtered_df = filtered_df[filtered_df['Form_Source'].isin(selected_sources)]
     if selected_statuses:
         filtered_df = filtered_df[filtered_df['Status'].isin(selected_statuses)]
+    # Multi-valued filters only apply once some values are deselected (so blank fields are kept by default)
+    for encoded, selected in ((courses, selected_courses), (reach_methods, selected_reach)):
+        if selected and len(selected) < len(encoded['labels']):
+            filtered_df = filtered_df[rows_with_any(encoded, selected)[filtered_df.index]]
     
     st.info(f"📊 Showing {len(filtered_df)} leads with current filters")
     
@@ -1079,6 +1605,13 @@ def main():
             for method, count in reg_counts.items():
                 percentage = (count / len(filtered_df)) * 100
                 st.write(f"• {method}: {count} leads ({percentage:.1f}%)")
+            
+            st.write("**Best Way to Reach:**")
+            in_filter = np.zeros(len(df), dtype=bool)
+            in_filter[filtered_df.index] = True
+            for method, count in label_counts(select_rows(reach_methods, in_filter)).items():
+                percentage = (count / len(filtered_df)) * 100
+                st.write(f"• {method}: {count} leads ({percentage:.1f}%)")
         
         with col2:
             # SentrySkin breakdown
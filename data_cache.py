@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Data Version Cache
+Derived results cached on disk under the version of the data they came from
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+
+def data_version(*paths):
+    """Version id of the given input files (name, size and modification time)"""
+    parts = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            parts.append(f"{os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}")
+        except FileNotFoundError:
+            parts.append(f"{os.path.basename(path)}:missing")
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()[:16]
+
+def load_cached(cache_path, version):
+    """Return the cached value if it was saved for this version, else None"""
+    try:
+        with open(cache_path, 'rb') as f:
+            cached = pickle.load(f)
+    except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+        return None
+    if not isinstance(cached, dict) or cached.get('version') != version:
+        return None
+    return cached['value']
+
+def save_cached(cache_path, version, value):
+    """Save a value for this version (written to a unique temp file, then renamed into place)"""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(cache_path)),
+                                     prefix=f"{os.path.basename(cache_path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump({'version': version, 'value': value}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, cache_path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Execution Watermark
+Incremental selection of executions by id, tolerant of late arrivals
+
+Execution ids mostly grow, but an execution that finishes after a higher id
+was fetched (or is only returned by the API later) shows up with an id below
+the highest one already processed. A plain "id > watermark" filter would
+skip it forever, so the ids processed within a trailing window below the
+watermark are remembered and anything in that window not seen yet is
+picked up on the next run.
+"""
+
+import numpy as np
+
+# How far below the watermark (in execution ids) late arrivals are still picked up
+WATERMARK_WINDOW = 1000
+
+def unprocessed_mask(execution_ids, watermark, recent_ids):
+    """Boolean mask of executions not processed yet"""
+    ids = np.asarray(execution_ids, dtype=np.int64)
+    if watermark is None:
+        return np.ones(len(ids), dtype=bool)
+    in_window = (ids > watermark - WATERMARK_WINDOW) & ~np.isin(ids, recent_ids)
+    return (ids > watermark) | in_window
+
+def advance_watermark(watermark, recent_ids, processed_ids):
+    """(new watermark, ids to remember) after processing processed_ids"""
+    ids = np.union1d(np.asarray(recent_ids, dtype=np.int64), np.asarray(processed_ids, dtype=np.int64))
+    if len(ids) == 0:
+        return watermark, ids
+    watermark = int(ids[-1]) if watermark is None else max(watermark, int(ids[-1]))
+    return watermark, ids[ids > watermark - WATERMARK_WINDOW]
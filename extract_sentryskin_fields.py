@@ -8,26 +8,46 @@ import pandas as pd
 import json
 import re
 from datetime import datetime
+from sentryskin_records import RecordColumns, CSV_TIMESTAMP_FORMAT
+from user_agent_sets import classify_user_agent
 
-def extract_fields_from_raw_data(csv_file):
-    """Extract specific fields from the raw data in CSV"""
+# Output columns of the extracted table (dtype None = inferred by pandas)
+EXTRACTED_COLUMNS = [
+    ('execution_id', 'Int64'),
+    ('workflow_id', None),
+    ('timestamp', 'datetime64[ns, UTC]'),
+    ('user_agent', None),
+    ('chat_id', None),
+    ('thread_id', None),
+    ('conversation_stage', None),
+    ('workflow_status', None),
+]
+
+# Per-node run timings from runData (startTime in epoch ms, executionTime in ms)
+NODE_TIMING_COLUMNS = [
+    ('execution_id', 'Int64'),
+    ('node', None),
+    ('run_index', None),
+    ('start_time', 'Int64'),
+    ('duration_ms', None),
+]
+NODE_TIMINGS_FILE = "sentryskin_node_timings.csv"
+
+def extract_fields_from_raw_data(csv_file, node_timings=None):
+    """Extract specific fields from the raw data in CSV (and node run timings, if given a RecordColumns)"""
     print("🔍 Extracting fields from SentrySkin raw data...")
     
     # Read the CSV file
     df = pd.read_csv(csv_file)
     print(f"📊 Loaded {len(df)} records from CSV")
     
-    extracted_data = []
+    extracted_data = RecordColumns(EXTRACTED_COLUMNS)
     
-    for index, row in df.iterrows():
+    rows = zip(df['execution_id'], df['timestamp'], df['status'], df['raw_data'])
+    for index, (execution_id, timestamp, workflow_status, raw_json) in enumerate(rows):
         try:
-            # Basic fields from CSV
-            execution_id = row['execution_id']
-            timestamp = row['timestamp']
-            workflow_status = row['status']
-            
             # Parse the raw_data JSON
-            raw_data = json.loads(row['raw_data'])
+            raw_data = json.loads(raw_json)
             
             # Initialize extracted fields
             chat_id = ""
@@ -39,6 +59,20 @@ def extract_fields_from_raw_data(csv_file):
             # Extract from runData
             run_data = raw_data.get('resultData', {}).get('runData', {})
             
+            # Collect every node run's start and duration (kept only if the whole record parses)
+            record_timings = []
+            if node_timings is not None:
+                for node_name, node_runs in run_data.items():
+                    if not isinstance(node_runs, list):
+                        continue
+                    for run_index, node_run in enumerate(node_runs):
+                        if not isinstance(node_run, dict):
+                            continue
+                        duration = node_run.get('executionTime')
+                        if duration is not None:
+                            record_timings.append((execution_id, node_name, run_index,
+                                                   node_run.get('startTime'), duration))
+            
             # Look for Webhook data (first node usually contains the main data)
             webhook_data = None
             for node_name, node_data in run_data.items():
@@ -67,19 +101,13 @@ def extract_fields_from_raw_data(csv_file):
                         conversation_stage = response_json.get('conversation_stage', '')
                         break
             
-            # Create extracted record
-            extracted_record = {
-                'execution_id': execution_id,
-                'workflow_id': workflow_id,
-                'timestamp': timestamp,
-                'user_agent': user_agent,
-                'chat_id': chat_id,
-                'thread_id': thread_id,
-                'conversation_stage': conversation_stage,
-                'workflow_status': workflow_status
-            }
-            
-            extracted_data.append(extracted_record)
+            # Append extracted record
+            extracted_data.append(
+                execution_id, workflow_id, timestamp, user_agent,
+                chat_id, thread_id, conversation_stage, workflow_status
+            )
+            for timing in record_timings:
+                node_timings.append(*timing)
             
             # Progress indicator
             if (index + 1) % 100 == 0:
@@ -97,30 +125,29 @@ def save_extracted_data(extracted_data):
     print("💾 Saving extracted data...")
     
     # Create DataFrame
-    df_extracted = pd.DataFrame(extracted_data)
+    df_extracted = extracted_data.to_dataframe()
     
     # Save as CSV
     csv_filename = "sentryskin_extracted_fields.csv"
-    df_extracted.to_csv(csv_filename, index=False)
+    df_extracted.to_csv(csv_filename, index=False, date_format=CSV_TIMESTAMP_FORMAT)
     print(f"✅ Extracted data saved to: {csv_filename}")
     
     # Save as JSON
     json_filename = "sentryskin_extracted_fields.json"
-    with open(json_filename, 'w') as f:
-        json.dump(extracted_data, f, indent=2)
+    extracted_data.write_json(json_filename)
     print(f"✅ Extracted data saved to: {json_filename}")
     
     # Print summary statistics
     print("\n📊 Data Summary:")
     print(f"Total records: {len(extracted_data)}")
-    print(f"Records with user_agent: {len([r for r in extracted_data if r['user_agent']])}")
-    print(f"Records with chat_id: {len([r for r in extracted_data if r['chat_id']])}")
-    print(f"Records with thread_id: {len([r for r in extracted_data if r['thread_id']])}")
-    print(f"Records with conversation_stage: {len([r for r in extracted_data if r['conversation_stage']])}")
+    print(f"Records with user_agent: {extracted_data.count_nonempty('user_agent')}")
+    print(f"Records with chat_id: {extracted_data.count_nonempty('chat_id')}")
+    print(f"Records with thread_id: {extracted_data.count_nonempty('thread_id')}")
+    print(f"Records with conversation_stage: {extracted_data.count_nonempty('conversation_stage')}")
     
     # Show sample data
     print("\n🔍 Sample Extracted Data:")
-    for i, record in enumerate(extracted_data[:3]):
+    for i, record in enumerate(extracted_data.records(limit=3)):
         print(f"\nRecord {i+1}:")
         print(f"  Execution ID: {record['execution_id']}")
         print(f"  Workflow ID: {record['workflow_id']}")
@@ -133,6 +160,11 @@ def save_extracted_data(extracted_data):
     
     return df_extracted
 
+def save_node_timings(node_timings):
+    """Save per-node run timings to CSV"""
+    node_timings.to_dataframe().to_csv(NODE_TIMINGS_FILE, index=False)
+    print(f"✅ Node timings saved to: {NODE_TIMINGS_FILE} ({len(node_timings)} node runs)")
+
 def analyze_user_agents(df):
     """Analyze user agent data"""
     print("\n📱 User Agent Analysis:")
@@ -146,45 +178,17 @@ def analyze_user_agents(df):
     
     print(f"📊 Total records with user agents: {len(user_agent_records)}")
     
-    # Extract browser/device info
-    browsers = {}
-    devices = {}
-    operating_systems = {}
-    
-    for user_agent in user_agent_records['user_agent']:
-        # Browser detection
-        if 'Chrome' in user_agent:
-            browsers['Chrome'] = browsers.get('Chrome', 0) + 1
-        elif 'Safari' in user_agent and 'Chrome' not in user_agent:
-            browsers['Safari'] = browsers.get('Safari', 0) + 1
-        elif 'Firefox' in user_agent:
-            browsers['Firefox'] = browsers.get('Firefox', 0) + 1
-        elif 'Edge' in user_agent:
-            browsers['Edge'] = browsers.get('Edge', 0) + 1
-        else:
-            browsers['Other'] = browsers.get('Other', 0) + 1
-        
-        # Device detection
-        if 'Mobile' in user_agent or 'iPhone' in user_agent or 'Android' in user_agent:
-            devices['Mobile'] = devices.get('Mobile', 0) + 1
-        elif 'iPad' in user_agent or 'Tablet' in user_agent:
-            devices['Tablet'] = devices.get('Tablet', 0) + 1
-        else:
-            devices['Desktop'] = devices.get('Desktop', 0) + 1
-        
-        # OS detection
-        if 'Windows' in user_agent:
-            operating_systems['Windows'] = operating_systems.get('Windows', 0) + 1
-        elif 'Mac OS X' in user_agent or 'macOS' in user_agent:
-            operating_systems['macOS'] = operating_systems.get('macOS', 0) + 1
-        elif 'iPhone' in user_agent or 'iPad' in user_agent:
-            operating_systems['iOS'] = operating_systems.get('iOS', 0) + 1
-        elif 'Android' in user_agent:
-            operating_systems['Android'] = operating_systems.get('Android', 0) + 1
-        elif 'Linux' in user_agent:
-            operating_systems['Linux'] = operating_systems.get('Linux', 0) + 1
-        else:
-            operating_systems['Other'] = operating_systems.get('Other', 0) + 1
+    # Classify each distinct user agent once, weighted by how many records use it
+    agent_counts = user_agent_records['user_agent'].value_counts()
+    classified = pd.DataFrame(
+        [classify_user_agent(user_agent) for user_agent in agent_counts.index],
+        columns=['device', 'browser', 'operating_system']
+    )
+    classified['records'] = agent_counts.to_numpy()
+    
+    browsers = classified.groupby('browser')['records'].sum().to_dict()
+    devices = classified.groupby('device')['records'].sum().to_dict()
+    operating_systems = classified.groupby('operating_system')['records'].sum().to_dict()
     
     print("\n🌐 Browser Distribution:")
     for browser, count in sorted(browsers.items(), key=lambda x: x[1], reverse=True):
@@ -210,7 +214,8 @@ def main():
     
     try:
         # Extract fields from raw data
-        extracted_data = extract_fields_from_raw_data(csv_file)
+        node_timings = RecordColumns(NODE_TIMING_COLUMNS)
+        extracted_data = extract_fields_from_raw_data(csv_file, node_timings)
         
         if not extracted_data:
             print("❌ No data extracted!")
@@ -218,6 +223,7 @@ def main():
         
         # Save extracted data
         df_extracted = save_extracted_data(extracted_data)
+        save_node_timings(node_timings)
         
         # Analyze user agents
         analyze_user_agents(df_extracted)
@@ -2,6 +2,7 @@ import requests
 import json
 import pandas as pd
 from datetime import datetime
+from multi_value_columns import parse_multi_values, label_counts
 
 # ==============================
 # 🔐 CONFIGURATION
@@ -14,6 +15,9 @@ CLIENT_SECRET = "86F4E90DA7949169E5E81E3D743E49F08B088BBD5E76709EAAB17FBE4281420
 # Replace with your actual RegisterMethod GUID
 REGISTER_METHOD_GUID = "7928af33-a08e-443f-b949-4ba4ab251617"
 
+# Reused across runs, so the scheduler (automate_pipeline.py --schedule) keeps the connections warm
+SESSION = requests.Session()
+
 # ==============================
 # 🗺️ GUID MAPPINGS
 # ==============================
@@ -82,7 +86,7 @@ def get_access_token():
         "Content-Type": "application/x-www-form-urlencoded"
     }
 
-    response = requests.post(TOKEN_URL, data=data, headers=headers)
+    response = SESSION.post(TOKEN_URL, data=data, headers=headers)
     if response.status_code != 200:
         raise Exception(f"❌ Failed to get token: {response.status_code} - {response.text}")
 
@@ -102,7 +106,7 @@ def fetch_leads_by_register_method(token):
         "BPMCSRF": ""
     }
 
-    response = requests.get(url, headers=headers)
+    response = SESSION.get(url, headers=headers)
     if response.status_code != 200:
         raise Exception(f"❌ Failed to fetch leads: {response.status_code} - {response.text}")
 
@@ -126,7 +130,7 @@ def fetch_leads_by_date(token, start_date="2025-10-07T00:00:00Z"):
         "BPMCSRF": ""
     }
 
-    response = requests.get(url, headers=headers)
+    response = SESSION.get(url, headers=headers)
     if response.status_code != 200:
         raise Exception(f"❌ Failed to fetch leads: {response.status_code} - {response.text}")
 
@@ -194,7 +198,8 @@ def create_dataframe(leads_data):
 # ==============================
 # 🧾 MAIN
 # ==============================
-if __name__ == "__main__":
+def main():
+    """Fetch leads created since the start date and save them to leads_export.csv"""
     try:
         print("🔐 Getting access token...")
         token = get_access_token()
@@ -215,13 +220,11 @@ if __name__ == "__main__":
             print("LEADS SUMMARY")
             print("=" * 100)
             
-            # Set pandas display options for better viewing
-            pd.set_option('display.max_columns', None)
-            pd.set_option('display.max_rows', None)
-            pd.set_option('display.width', None)
-            pd.set_option('display.max_colwidth', 50)
-            
-            print(df.to_string(index=False))
+            # Set pandas display options for better viewing (only for this print, so an
+            # in-process pipeline keeps its defaults)
+            with pd.option_context('display.max_columns', None, 'display.max_rows', None,
+                                   'display.width', None, 'display.max_colwidth', 50):
+                print(df.to_string(index=False))
             
             # Save to CSV
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -249,6 +252,14 @@ if __name__ == "__main__":
                 for loc, count in loc_counts.items():
                     print(f"      {loc}: {count}")
             
+            # Multi-valued fields ("Email, Text") count each listed value
+            for column, title in [('Course_Of_Interest', 'Courses of Interest'),
+                                  ('Best_Way_To_Reach', 'Best Way to Reach')]:
+                if column in df.columns:
+                    print(f"\n   {title}:")
+                    for value, count in label_counts(parse_multi_values(df[column])).items():
+                        print(f"      {value}: {count}")
+            
             # Registration method breakdown
             if 'Register_Method' in df.columns:
                 print(f"\n   Registration Methods:")
@@ -266,3 +277,5 @@ if __name__ == "__main__":
     except Exception as e:
         print(f"⚠️ Error: {e}")
 
+if __name__ == "__main__":
+    main()
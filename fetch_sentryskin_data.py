@@ -6,10 +6,10 @@ Fetches execution data from SentrySkin n8n API and extracts user agent details
 
 import requests
 import json
-import pandas as pd
 from datetime import datetime, timezone
 import os
 import streamlit as st
+from sentryskin_records import RecordColumns, CSV_TIMESTAMP_FORMAT
 
 # Configuration
 try:
@@ -20,6 +20,22 @@ BASE_URL = "https://sentryskin.app.n8n.cloud/api/v1/executions"
 WORKFLOW_ID = "V7n2R2x0bj99pQhK"
 START_DATE = "2024-10-07T00:00:00Z"  # October 7th start date
 
+# Reused across runs, so the scheduler (automate_pipeline.py --schedule) keeps the connection warm
+SESSION = requests.Session()
+
+# Columns of the per-execution table (dtype None = inferred by pandas)
+EXECUTION_COLUMNS = [
+    ('execution_id', 'Int64'),
+    ('timestamp', 'datetime64[ns, UTC]'),
+    ('finished_at', 'datetime64[ns, UTC]'),
+    ('user_agent', None),
+    ('chat_id', None),
+    ('thread_id', None),
+    ('status', None),
+    ('mode', None),
+    ('raw_data', None),
+]
+
 def fetch_sentryskin_executions():
     """Fetch all SentrySkin executions from n8n API"""
     print("🚀 Fetching SentrySkin execution data...")
@@ -39,7 +55,7 @@ def fetch_sentryskin_executions():
             params["cursor"] = cursor
 
         try:
-            res = requests.get(BASE_URL, headers={"X-N8N-API-KEY": API_KEY}, params=params)
+            res = SESSION.get(BASE_URL, headers={"X-N8N-API-KEY": API_KEY}, params=params)
             res.raise_for_status()
             data = res.json()
 
@@ -85,7 +101,7 @@ def extract_user_agent_data(executions):
     """Extract user agent and related data from executions"""
     print("🔍 Extracting user agent and metadata...")
     
-    extracted_data = []
+    extracted_data = RecordColumns(EXECUTION_COLUMNS)
     
     for execution in executions:
         try:
@@ -122,20 +138,18 @@ def extract_user_agent_data(executions):
                         chat_id = chat_id or inner_data.get('chatId', inner_data.get('chat_id', ''))
                         thread_id = thread_id or inner_data.get('threadId', inner_data.get('thread_id', ''))
             
-            # Extract additional metadata
-            metadata = {
-                'execution_id': execution_id,
-                'timestamp': timestamp,
-                'finished_at': finished_at,
-                'user_agent': user_agent,
-                'chat_id': chat_id,
-                'thread_id': thread_id,
-                'status': execution.get('status', ''),
-                'mode': execution.get('mode', ''),
-                'raw_data': json.dumps(execution_data) if execution_data else ''
-            }
-            
-            extracted_data.append(metadata)
+            # Append record with additional metadata
+            extracted_data.append(
+                execution_id,
+                timestamp,
+                finished_at,
+                user_agent,
+                chat_id,
+                thread_id,
+                execution.get('status', ''),
+                execution.get('mode', ''),
+                json.dumps(execution_data) if execution_data else ''
+            )
             
         except Exception as e:
             print(f"⚠️ Error processing execution {execution.get('id', 'unknown')}: {e}")
@@ -154,26 +168,25 @@ def save_data(executions, extracted_data):
     print("✅ Raw executions saved to: sentryskin_executions_raw.json")
     
     # Save extracted data as JSON
-    with open("sentryskin_user_agents.json", "w") as f:
-        json.dump(extracted_data, f, indent=2)
+    extracted_data.write_json("sentryskin_user_agents.json")
     print("✅ User agent data saved to: sentryskin_user_agents.json")
     
     # Save extracted data as CSV
     if extracted_data:
-        df = pd.DataFrame(extracted_data)
-        df.to_csv("sentryskin_user_agents.csv", index=False)
+        df = extracted_data.to_dataframe()
+        df.to_csv("sentryskin_user_agents.csv", index=False, date_format=CSV_TIMESTAMP_FORMAT)
         print("✅ User agent data saved to: sentryskin_user_agents.csv")
         
         # Print summary
         print("\n📊 Data Summary:")
         print(f"Total executions: {len(extracted_data)}")
-        print(f"With user agent: {len([d for d in extracted_data if d['user_agent']])}")
-        print(f"With chat ID: {len([d for d in extracted_data if d['chat_id']])}")
-        print(f"With thread ID: {len([d for d in extracted_data if d['thread_id']])}")
+        print(f"With user agent: {extracted_data.count_nonempty('user_agent')}")
+        print(f"With chat ID: {extracted_data.count_nonempty('chat_id')}")
+        print(f"With thread ID: {extracted_data.count_nonempty('thread_id')}")
         
         # Show sample data
         print("\n🔍 Sample Data:")
-        for i, data in enumerate(extracted_data[:3]):
+        for i, data in enumerate(extracted_data.records(limit=3)):
             print(f"\nExecution {i+1}:")
             print(f"  ID: {data['execution_id']}")
             print(f"  Timestamp: {data['timestamp']}")
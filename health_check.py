@@ -8,6 +8,7 @@ This script checks the health of the dashboard and data pipeline:
 2. Checks data freshness
 3. Validates API connectivity
 4. Tests dashboard accessibility
+5. Reports recent lead/chat volume anomalies
 
 Usage:
     python health_check.py [--verbose] [--fix-issues]
@@ -19,6 +20,7 @@ import requests
 import pandas as pd
 from datetime import datetime, timedelta
 import argparse
+from volume_anomalies import load_recent_alerts, format_alert
 
 def print_status(message, status="INFO"):
     """Print formatted status message"""
@@ -87,6 +89,17 @@ def check_data_quality(filename, description):
         print_status(f"Error reading {description}: {e}", "ERROR")
         return False
 
+def check_volume_alerts(days=3):
+    """Report recent lead/chat volume anomalies from the alert log"""
+    alerts = load_recent_alerts(days)
+    if not alerts:
+        print_status(f"No volume anomalies in the last {days} days", "SUCCESS")
+        return True
+    
+    for alert in alerts:
+        print_status(format_alert(alert), "WARNING")
+    return False
+
 def check_dashboard_accessibility(port=8501):
     """Check if dashboard is accessible"""
     try:
@@ -169,6 +182,10 @@ def main():
             if filename.endswith('.csv'):
                 check_data_quality(filename, description)
     
+    print("\n🚨 CHECKING VOLUME ALERTS")
+    print("-" * 30)
+    volume_ok = check_volume_alerts()
+    
     print("\n🌐 CHECKING DASHBOARD ACCESSIBILITY")
     print("-" * 30)
     dashboard_ok = check_dashboard_accessibility(args.port)
@@ -181,7 +198,7 @@ def main():
     print("📋 HEALTH CHECK SUMMARY")
     print("=" * 60)
     
-    if essential_ok and data_ok and dashboard_ok:
+    if essential_ok and data_ok and dashboard_ok and volume_ok:
         print_status("All systems healthy! 🎉", "SUCCESS")
         print("\n💡 Recommendations:")
         print("  • Dashboard is ready for use")
@@ -199,6 +216,10 @@ def main():
             print("  • Run 'python automate_pipeline.py' to refresh data")
             print("  • Check API credentials if data fetching fails")
         
+        if not volume_ok:
+            print("  • Check the webhooks/forms behind the flagged volume alerts")
+            print("  • See volume_alerts.jsonl for details")
+        
         if not dashboard_ok:
             print("  • Run './deploy.sh --dashboard-only' to start dashboard")
             print("  • Check if port is available")
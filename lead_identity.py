@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Lead Identity Resolution
+Cluster repeat submissions of the same person across Register_Methods
+
+Email and Mobile_Phone are normalized and hashed into blocking indexes
+(pd.factorize), so leads are only ever compared with leads sharing a key.
+Clusters are the connected components of "shares an email or a phone":
+each pass takes the smallest cluster id within every block (one
+np.minimum.at per key), so the work is linear in the number of leads per
+pass and no pairwise comparison is made.
+
+Placeholder contacts ("your@gmail.com", "0000000000") would chain
+unrelated people into one cluster, so they are dropped as keys, as is any
+key whose leads carry more than MAX_LINKED_KEYS distinct values of the
+other key.
+"""
+
+import numpy as np
+import pandas as pd
+
+LEADS_FILE = "leads_export.csv"
+IDENTITIES_FILE = "leads_identities.csv"
+
+# Gmail ignores dots and +tags in the local part
+DOTLESS_EMAIL_DOMAINS = {'gmail.com', 'googlemail.com'}
+MIN_PHONE_DIGITS = 7
+
+# Form filler values that are not anybody's contact details
+PLACEHOLDER_EMAIL_LOCALS = {
+    'your', 'youremail', 'yourname', 'email', 'name', 'test', 'example', 'user',
+    'none', 'no', 'noemail', 'na', 'null', 'abc', 'asdf', 'xxx', 'me',
+}
+PLACEHOLDER_EMAIL_DOMAINS = {'example.com', 'example.org', 'example.net', 'test.com', 'domain.com'}
+PLACEHOLDER_PHONES = {'1234567', '12345678', '123456789', '1234567890', '0123456789', '9876543210'}
+
+# A key shared by leads with more distinct values of another key than this is not a person
+MAX_LINKED_KEYS = 3
+
+def normalize_emails(emails):
+    """Lowercased, trimmed emails (Gmail dots/+tags removed); NaN when not an email"""
+    emails = emails.astype('object').where(emails.notna(), '').astype(str).str.strip().str.lower()
+    parts = emails.str.extract(r'^([^@\s]+)@([^@\s]+\.[^@\s]+)$')
+    local, domain = parts[0], parts[1]
+    dotless = domain.isin(DOTLESS_EMAIL_DOMAINS)
+    local = local.where(~dotless, local.str.split('+').str[0].str.replace('.', '', regex=False))
+    placeholder = local.isin(PLACEHOLDER_EMAIL_LOCALS) | domain.isin(PLACEHOLDER_EMAIL_DOMAINS)
+    return (local + '@' + domain).where(~placeholder)
+
+def normalize_phones(phones):
+    """Digits-only phone numbers without the US country code; NaN when too short"""
+    digits = phones.astype('object').where(phones.notna(), '').astype(str).str.replace(r'\D', '', regex=True)
+    digits = digits.where(~((digits.str.len() == 11) & digits.str.startswith('1')), digits.str[1:])
+    # One repeated digit (0000000, 5555555555) or a counting sequence is a placeholder
+    placeholder = digits.str.fullmatch(r'(\d)\1*') | digits.isin(PLACEHOLDER_PHONES)
+    return digits.where((digits.str.len() >= MIN_PHONE_DIGITS) & ~placeholder)
+
+def blocking_codes(leads):
+    """Block id of every lead per normalized key (-1 = no usable key)"""
+    blocks = []
+    for column, normalize in (('Email', normalize_emails), ('Mobile_Phone', normalize_phones)):
+        if column in leads.columns:
+            codes, _ = pd.factorize(normalize(leads[column]))
+            blocks.append(codes)
+    return drop_overshared_keys(blocks)
+
+def drop_overshared_keys(blocks):
+    """Unkey (-1) every key whose leads carry more than MAX_LINKED_KEYS distinct keys of another block"""
+    result = []
+    for codes in blocks:
+        overshared = np.zeros(codes.max(initial=-1) + 1, dtype=bool)
+        for other in blocks:
+            if other is codes:
+                continue
+            both = (codes >= 0) & (other >= 0)
+            span = other.max(initial=0) + 1
+            pairs = np.unique(codes[both].astype(np.int64) * span + other[both])
+            linked = np.bincount(pairs // span, minlength=len(overshared))
+            overshared |= linked > MAX_LINKED_KEYS
+        result.append(np.where((codes >= 0) & overshared[codes], -1, codes))
+    return result
+
+def resolve_identities(leads):
+    """Cluster id (0..k-1, in order of first appearance) of every lead, aligned to leads.index"""
+    n = len(leads)
+    labels = np.arange(n)
+    blocks = [(codes, codes >= 0) for codes in blocking_codes(leads)]
+
+    changed = n > 0
+    while changed:
+        previous = labels
+        for codes, keyed in blocks:
+            block_min = np.full(codes.max() + 1 if keyed.any() else 0, n)
+            np.minimum.at(block_min, codes[keyed], labels[keyed])
+            labels = labels.copy()
+            labels[keyed] = np.minimum(labels[keyed], block_min[codes[keyed]])
+        # Pointer jumping: follow each label to its own label
+        labels = labels[labels]
+        changed = not np.array_equal(labels, previous)
+
+    cluster_ids, _ = pd.factorize(labels)
+    return pd.Series(cluster_ids, index=leads.index, name='Lead_Cluster')
+
+def dedup_counts(leads, clusters=None):
+    """(raw lead count, distinct people) overall"""
+    if clusters is None:
+        clusters = resolve_identities(leads)
+    return len(leads), int(clusters.nunique())
+
+def method_overlap(leads, clusters):
+    """Raw leads and distinct people per Register_Method"""
+    grouped = pd.DataFrame({
+        'Register_Method': leads['Register_Method'].fillna('Unknown'),
+        'Lead_Cluster': clusters,
+    }).groupby('Register_Method')['Lead_Cluster']
+    return pd.DataFrame({'raw_leads': grouped.size(), 'unique_people': grouped.nunique()}) \
+        .sort_values('raw_leads', ascending=False)
+
+def load_leads(path=LEADS_FILE):
+    """Load the leads export with the contact columns as text"""
+    return pd.read_csv(path, dtype={'Email': 'object', 'Mobile_Phone': 'object'})
+
+def save_identities(leads, clusters):
+    """Save the leads with their cluster id and cluster size"""
+    sizes = clusters.map(clusters.value_counts())
+    leads.assign(Lead_Cluster=clusters, Cluster_Size=sizes).to_csv(IDENTITIES_FILE, index=False)
+
+def main():
+    """Resolve lead identities in the leads export"""
+    print("🎯 Lead Identity Resolution")
+    print("=" * 50)
+
+    try:
+        leads = load_leads()
+    except FileNotFoundError:
+        print(f"❌ File '{LEADS_FILE}' not found!")
+        print("Please run fetch_leads.py first to generate the data.")
+        return
+
+    if not {'Email', 'Mobile_Phone'} & set(leads.columns):
+        print("⚠️ Leads export has no Email or Mobile_Phone column, every lead is its own identity")
+
+    clusters = resolve_identities(leads)
+    raw, unique = dedup_counts(leads, clusters)
+    save_identities(leads, clusters)
+
+    print(f"📊 Raw leads: {raw}")
+    print(f"👤 Distinct people: {unique} ({raw - unique} duplicate submissions)")
+
+    if 'Register_Method' in leads.columns:
+        print("\n📋 By Register Method:")
+        for method, row in method_overlap(leads, clusters).iterrows():
+            print(f"  {method}: {row['raw_leads']} leads, {row['unique_people']} people")
+
+    print(f"\n✅ Identities saved to: {IDENTITIES_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Multi-Valued Columns
+Parse comma-separated multi-valued columns once into a sparse multi-hot encoding
+
+An encoded column is a dict of parallel arrays: entry i says row rows[i]
+has label labels[codes[i]]. Each distinct string is split once, so
+"Email, Text" on 5,000 leads is parsed a single time. Counts, co-occurrence
+and filters are then np.bincount / boolean indexing over the entries. The
+user-agent bitmasks (user_agent_sets) convert into the same encoding with
+from_masks, so leads and SentrySkin users share one set of helpers.
+"""
+
+import numpy as np
+import pandas as pd
+
+def _encoded(labels, rows, codes, n_rows):
+    """Encoded column with duplicate (row, label) entries removed, sorted by row"""
+    keys = np.unique(np.asarray(rows, dtype=np.int64) * max(len(labels), 1) + np.asarray(codes, dtype=np.int64))
+    n_labels = max(len(labels), 1)
+    return {
+        'labels': list(labels),
+        'rows': keys // n_labels,
+        'codes': keys % n_labels,
+        'n_rows': int(n_rows),
+    }
+
+def parse_multi_values(values, sep=',', table=None):
+    """Encode a column of separated strings; `table` fixes the labels (others are dropped)"""
+    values = pd.Series(values).astype('object')
+    n_rows = len(values)
+    value_codes, distinct = pd.factorize(values)
+
+    # Split each distinct string once
+    parts = pd.Series(distinct.astype(str), dtype='object').str.split(sep, regex=False).explode().str.strip()
+    parts = parts[parts.notna() & (parts != '')]
+    part_owner = parts.index.to_numpy()
+    if table is None:
+        part_codes, labels = pd.factorize(parts)
+        labels = list(labels)
+    else:
+        labels = list(table)
+        part_codes = pd.Index(labels).get_indexer(parts)
+        part_owner, part_codes = part_owner[part_codes >= 0], part_codes[part_codes >= 0]
+
+    # Expand each row to the parts of its distinct string
+    parts_per_value = np.bincount(part_owner, minlength=len(distinct))
+    first_part = np.concatenate([[0], np.cumsum(parts_per_value)[:-1]]).astype(np.int64)
+    keyed = value_codes >= 0
+    row_ids = np.flatnonzero(keyed)
+    lengths = parts_per_value[value_codes[keyed]]
+    rows = np.repeat(row_ids, lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    entries = np.repeat(first_part[value_codes[keyed]], lengths) + offsets
+    return _encoded(labels, rows, np.asarray(part_codes)[entries], n_rows)
+
+def from_masks(masks, table):
+    """Encode bitmasks (bit i = table[i]) such as the user-agent device/browser/OS masks"""
+    masks = np.asarray(masks, dtype=np.int64)
+    bits = (masks[:, None] >> np.arange(len(table))) & 1
+    rows, codes = np.nonzero(bits)
+    return _encoded(table, rows, codes, len(masks))
+
+def multi_hot(encoded):
+    """Dense boolean (n_rows, n_labels) matrix"""
+    matrix = np.zeros((encoded['n_rows'], len(encoded['labels'])), dtype=bool)
+    matrix[encoded['rows'], encoded['codes']] = True
+    return matrix
+
+def label_counts(encoded):
+    """Number of rows containing each label, most common first (labels with no rows dropped)"""
+    counts = pd.Series(np.bincount(encoded['codes'], minlength=len(encoded['labels'])),
+                       index=encoded['labels'], dtype='int64')
+    return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+def labels_per_row(encoded):
+    """Number of labels on each row"""
+    return np.bincount(encoded['rows'], minlength=encoded['n_rows'])
+
+def co_occurrence(encoded):
+    """Label x label matrix of rows containing both labels (diagonal = label counts)"""
+    matrix = multi_hot(encoded).astype(np.int64)
+    return pd.DataFrame(matrix.T @ matrix, index=encoded['labels'], columns=encoded['labels'])
+
+def rows_with_any(encoded, labels):
+    """Boolean array: which rows contain at least one of the labels"""
+    wanted = np.isin(np.array(encoded['labels'], dtype=object), list(labels))
+    selected = np.zeros(encoded['n_rows'], dtype=bool)
+    selected[encoded['rows'][wanted[encoded['codes']]]] = True
+    return selected
+
+def select_rows(encoded, row_mask):
+    """Encoding restricted to the rows where row_mask is True (rows renumbered)"""
+    row_mask = np.asarray(row_mask, dtype=bool)
+    new_rows = np.cumsum(row_mask) - 1
+    kept = row_mask[encoded['rows']]
+    return dict(encoded, rows=new_rows[encoded['rows'][kept]], codes=encoded['codes'][kept],
+                n_rows=int(row_mask.sum()))
@@ -0,0 +1,771 @@
+#!/usr/bin/env python3
+"""
+In-Process Pipeline Runner
+The data pipeline as a DAG of stages with declared input and output files, run in one process
+
+Stages run in dependency order (declaration order among independent
+stages) inside the calling process, so pandas and the stage modules are
+imported once instead of once per script. DataFrames that several stages
+read (extracted fields, executions, user table, leads) are parsed at most
+once per run and handed to the stages in memory; a stage that rewrites one
+of those files drops the stale copy. Stage modules are imported lazily, so
+callers such as the dashboard only load what their stages need.
+
+A stage is skipped when the content hashes of its inputs, its outputs and
+its code (the stage module plus the local modules it imports) match what
+pipeline_manifest.json recorded after its last successful run. Files whose
+size and mtime are unchanged reuse their recorded hash, so a no-op refresh
+only stats the files and reads no data.
+
+With jobs > 1, stages whose dependencies are done run at the same time on
+a thread pool, so for example the Creatio fetch overlaps the whole
+SentrySkin chain. Ordering is only enforced where a stage reads a file
+another stage writes. Each stage's output is captured separately, and a
+failure only stops the stages downstream of it.
+
+Every run appends one line per stage to pipeline_run_report.jsonl: wall
+and CPU time, peak RSS, rows of the CSV inputs and outputs, and bytes
+read and written by the stage's thread, so slow or growing stages show up
+across runs.
+
+Runs hold pipeline.lock so a scheduled refresh, a dashboard refresh and a
+manual run never overlap. A run without failures is published as an
+immutable snapshot: its outputs are copied into snapshots/<version>/
+(files unchanged since the previous snapshot are hard-linked from it) and
+pipeline_published.json, the current pointer, is swapped atomically to
+name that version. The version id is derived from the content hashes of
+the outputs, so readers use it as their cache key and never see a file
+that a running stage is still writing.
+
+run_single_flight coordinates refreshes across dashboard sessions and
+processes: the lock holder records the job in pipeline_job.json, and a
+refresh requested while a job is in flight waits for that job and returns
+its result instead of starting a second run.
+"""
+
+import ast
+import contextlib
+import csv
+import hashlib
+import importlib
+import io
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+import traceback
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Not available on Windows, where runs are not locked
+    fcntl = None
+
+EXECUTIONS_FILE = "sentryskin_user_agents.csv"
+EXTRACTED_FILE = "sentryskin_extracted_fields.csv"
+NODE_TIMINGS_FILE = "sentryskin_node_timings.csv"
+USER_ANALYSIS_FILE = "sentryskin_user_device_analysis.csv"
+ROLLUP_FILE = "sentryskin_daily_rollup.csv"
+LEADS_FILE = "leads_export.csv"
+DETAILED_REPORT_FILE = "sentryskin_post_oct7_2025_detailed_report.csv"
+MANIFEST_FILE = "pipeline_manifest.json"
+RUN_REPORT_FILE = "pipeline_run_report.jsonl"
+LOCK_FILE = "pipeline.lock"
+PUBLISHED_FILE = "pipeline_published.json"
+SNAPSHOT_DIR = "snapshots"
+JOB_STATE_FILE = "pipeline_job.json"
+
+# Older snapshots are deleted; a few are kept for readers still holding a previous version
+SNAPSHOTS_KEPT = 3
+
+# Characters of each stage's captured output shown when not verbose
+OUTPUT_TAIL = 200
+
+# name is also the module implementing the stage; version (optional) returns extra cache-key text
+Stage = namedtuple('Stage', ['name', 'description', 'group', 'inputs', 'outputs', 'run', 'version'],
+                   defaults=(None,))
+
+def _load_extracted():
+    import pandas as pd
+    return pd.read_csv(EXTRACTED_FILE, dtype={'user_agent': 'object', 'chat_id': 'object',
+                                              'thread_id': 'object', 'conversation_stage': 'object'})
+
+def _load_executions():
+    import pandas as pd
+    return pd.read_csv(EXECUTIONS_FILE, usecols=['execution_id', 'timestamp', 'finished_at'])
+
+def _load_user_analysis():
+    import pandas as pd
+    from user_agent_sets import ensure_mask_columns
+    return ensure_mask_columns(pd.read_csv(USER_ANALYSIS_FILE))
+
+def _load_leads():
+    from lead_identity import load_leads
+    return load_leads(LEADS_FILE)
+
+# Files that are shared between stages as DataFrames, and how to parse each once
+FRAME_LOADERS = {
+    EXTRACTED_FILE: _load_extracted,
+    EXECUTIONS_FILE: _load_executions,
+    USER_ANALYSIS_FILE: _load_user_analysis,
+    LEADS_FILE: _load_leads,
+}
+
+_frame_locks = {path: threading.Lock() for path in FRAME_LOADERS}
+
+def get_frame(frames, path):
+    """DataFrame of a shared file, parsed at most once per run (also across parallel stages)"""
+    with _frame_locks[path]:
+        if path not in frames:
+            frames[path] = FRAME_LOADERS[path]()
+        return frames[path]
+
+def run_main(module_name):
+    """Run a script's main() in this process (run_pipeline clears the command-line arguments)"""
+    importlib.import_module(module_name).main()
+
+class _ThreadOutput:
+    """sys.stdout stand-in that sends each thread's writes to its own buffer, if it has one"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.local = threading.local()
+
+    def _target(self):
+        return getattr(self.local, 'buffer', None) or self.stream
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def flush(self):
+        self._target().flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+@contextlib.contextmanager
+def _pipeline_process():
+    """Per-thread stdout and empty script arguments for the duration of a run"""
+    stdout, argv = sys.stdout, sys.argv
+    sys.stdout, sys.argv = _ThreadOutput(stdout), argv[:1]
+    try:
+        yield
+    finally:
+        sys.stdout, sys.argv = stdout, argv
+
+def _script(module_name):
+    """Stage body for scripts that read their own input files"""
+    return lambda frames: run_main(module_name)
+
+def _sessions(frames):
+    from analyze_sentryskin_sessions import build_sessions, summarize_sessions, save_sessions
+    df = get_frame(frames, EXTRACTED_FILE)[['execution_id', 'timestamp', 'chat_id', 'thread_id']]
+    sessions = build_sessions(df)
+    summarize_sessions(sessions)
+    save_sessions(sessions)
+
+def _user_sketches(frames):
+    from sentryskin_user_sketches import update_daily_sketches
+    update_daily_sketches(get_frame(frames, EXTRACTED_FILE)[['execution_id', 'timestamp', 'chat_id', 'thread_id']])
+
+def _daily_rollup(frames):
+    from sentryskin_daily_rollup import load_rollup, update_rollup, save_rollup
+    df = get_frame(frames, EXTRACTED_FILE)[['execution_id', 'timestamp', 'user_agent', 'chat_id',
+                                            'thread_id', 'conversation_stage']]
+    rollup = update_rollup(df, load_rollup())
+    save_rollup(rollup)
+    print(f"✅ Rollup saved ({len(rollup)} rows, {int(rollup['executions'].sum())} executions)")
+
+def _latency_sketches(frames):
+    from sentryskin_latency_sketches import update_latency_sketches
+    update_latency_sketches(get_frame(frames, EXECUTIONS_FILE))
+
+def _stage_flow(frames):
+    from sentryskin_stage_flow import build_stage_flow, save_stage_flow
+    df = get_frame(frames, EXTRACTED_FILE)[['execution_id', 'timestamp', 'thread_id', 'conversation_stage']]
+    transitions, funnel = build_stage_flow(df)
+    save_stage_flow(transitions, funnel)
+    print(f"✅ Stage flow saved ({len(transitions)} transitions, {len(funnel)} stages)")
+
+def _lead_identity(frames):
+    from lead_identity import resolve_identities, save_identities
+    leads = get_frame(frames, LEADS_FILE)
+    clusters = resolve_identities(leads)
+    save_identities(leads, clusters)
+    print(f"✅ {len(leads)} leads resolved to {clusters.nunique()} people")
+
+def _utc_date():
+    """Version for stages that must rerun each day even when the inputs do not change
+    (the rolling last-N-days reports, and the volume baselines, which score
+    every day up to yesterday whether or not new data arrived)"""
+    return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+def _post_cutoff_analysis(frames):
+    from analyze_post_oct7_2025 import run_analysis
+    report = run_analysis(get_frame(frames, USER_ANALYSIS_FILE))
+    if report is not None:
+        frames[DETAILED_REPORT_FILE] = report
+
+STAGES = [
+    Stage('fetch_leads', "Fetch Creatio Leads", 'fetch',
+          [], [LEADS_FILE], _script('fetch_leads')),
+    Stage('fetch_sentryskin_data', "Fetch SentrySkin Data", 'fetch',
+          [], [EXECUTIONS_FILE], _script('fetch_sentryskin_data')),
+    Stage('extract_sentryskin_fields', "Extract SentrySkin Fields", 'analysis',
+          [EXECUTIONS_FILE], [EXTRACTED_FILE, NODE_TIMINGS_FILE], _script('extract_sentryskin_fields')),
+    Stage('analyze_sentryskin_users', "Analyze SentrySkin Users", 'analysis',
+          [EXTRACTED_FILE], [USER_ANALYSIS_FILE], _script('analyze_sentryskin_users')),
+    Stage('analyze_sentryskin_sessions', "Sessionize SentrySkin Conversations", 'analysis',
+          [EXTRACTED_FILE], ['sentryskin_sessions.csv'], _sessions),
+    Stage('sentryskin_user_sketches', "Update Daily User Sketches", 'analysis',
+          [EXTRACTED_FILE], ['sentryskin_daily_user_sketches.npz'], _user_sketches),
+    Stage('sentryskin_daily_rollup', "Update Daily Activity Rollup", 'analysis',
+          [EXTRACTED_FILE], [ROLLUP_FILE], _daily_rollup),
+    Stage('sentryskin_cohort_retention', "Build Cohort Retention Matrix", 'analysis',
+          [EXTRACTED_FILE], ['sentryskin_cohort_retention.csv'], _script('sentryskin_cohort_retention')),
+    Stage('activity_heatmap', "Build Activity Heatmap Buckets", 'analysis',
+          [EXTRACTED_FILE, LEADS_FILE], ['sentryskin_activity_buckets.pkl', 'leads_activity_buckets.pkl'],
+          _script('activity_heatmap')),
+    Stage('volume_anomalies', "Detect Volume Anomalies", 'analysis',
+          [LEADS_FILE, ROLLUP_FILE], ['volume_anomaly_state.json'], _script('volume_anomalies'), _utc_date),
+    Stage('sentryskin_latency_sketches', "Update Latency Sketches", 'analysis',
+          [EXECUTIONS_FILE], ['sentryskin_latency_sketches.npz'], _latency_sketches),
+    Stage('sentryskin_node_profile', "Profile Workflow Nodes", 'analysis',
+          [NODE_TIMINGS_FILE], ['sentryskin_node_profile.csv', 'sentryskin_node_histograms.csv'],
+          _script('sentryskin_node_profile')),
+    Stage('sentryskin_stage_flow', "Build Conversation Stage Flow", 'analysis',
+          [EXTRACTED_FILE], ['sentryskin_stage_transitions.csv', 'sentryskin_stage_funnel.csv'], _stage_flow),
+    Stage('lead_identity', "Resolve Duplicate Leads", 'analysis',
+          [LEADS_FILE], ['leads_identities.csv'], _lead_identity),
+    Stage('analyze_post_oct7_2025', "Generate Post-Oct 7th Analysis", 'analysis',
+          [USER_ANALYSIS_FILE, ROLLUP_FILE], [DETAILED_REPORT_FILE], _post_cutoff_analysis,
+          _utc_date),
+]
+
+def select_stages(names=None, skip_groups=(), stages=STAGES):
+    """Stages with the given names (all if None), minus those in skip_groups"""
+    if names is not None:
+        unknown = set(names) - {stage.name for stage in stages}
+        if unknown:
+            raise ValueError(f"Unknown pipeline stages: {', '.join(sorted(unknown))}")
+    return [stage for stage in stages
+            if (names is None or stage.name in names) and stage.group not in skip_groups]
+
+def stage_dependencies(stages):
+    """{stage name: names of the selected stages producing its inputs}"""
+    producers = {}
+    for stage in stages:
+        for output in stage.outputs:
+            producers.setdefault(output, []).append(stage.name)
+    return {
+        stage.name: {producer for path in stage.inputs for producer in producers.get(path, [])
+                     if producer != stage.name}
+        for stage in stages
+    }
+
+def stage_order(stages):
+    """Stages in dependency order, keeping declaration order among independent stages"""
+    dependencies = stage_dependencies(stages)
+    done, ordered = set(), []
+    while len(ordered) < len(stages):
+        ready = [stage for stage in stages if stage.name not in done and dependencies[stage.name] <= done]
+        if not ready:
+            cycle = [stage.name for stage in stages if stage.name not in done]
+            raise ValueError(f"Pipeline stages have a dependency cycle: {', '.join(cycle)}")
+        ordered.append(ready[0])
+        done.add(ready[0].name)
+    return ordered
+
+def load_manifest(path=MANIFEST_FILE):
+    """Recorded file hashes and stage keys ({'files': {}, 'stages': {}} when there is none)"""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, ValueError):
+        manifest = {}
+    manifest.setdefault('files', {})
+    manifest.setdefault('stages', {})
+    return manifest
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    """Write the manifest atomically"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+def file_digest(path, manifest):
+    """sha1 of a file's content (None if missing), rehashed only when its size or mtime changed"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        manifest['files'].pop(path, None)
+        return None
+    recorded = manifest['files'].get(path)
+    if recorded and recorded['size'] == stat.st_size and recorded['mtime_ns'] == stat.st_mtime_ns:
+        return recorded['sha1']
+
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    manifest['files'][path] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha1': digest.hexdigest()}
+    return digest.hexdigest()
+
+def _count_rows(path):
+    """Data rows of a CSV (quoted newlines included) or lines of a JSONL file; None for other files"""
+    if path.endswith('.jsonl'):
+        with open(path, 'rb') as f:
+            return sum(block.count(b'\n') for block in iter(lambda: f.read(1 << 20), b''))
+    if not path.endswith('.csv'):
+        return None
+    csv.field_size_limit(max(csv.field_size_limit(), 1 << 30))
+    with open(path, newline='', encoding='utf-8', errors='replace') as f:
+        return max(sum(1 for _ in csv.reader(f)) - 1, 0)
+
+def file_rows(path, manifest):
+    """Row count of a file, counted once per content hash (None if missing or not tabular)"""
+    if file_digest(path, manifest) is None:
+        return None
+    recorded = manifest['files'][path]
+    if 'rows' not in recorded:
+        recorded['rows'] = _count_rows(path)
+    return recorded['rows']
+
+def total_rows(paths, manifest):
+    """Summed rows of the files that have a row count, or None if none does"""
+    counts = [rows for rows in (file_rows(path, manifest) for path in paths) if rows is not None]
+    return sum(counts) if counts else None
+
+def _local_source(module_name):
+    """Path of a module that lives next to this file, or None"""
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), f"{module_name}.py")
+    return path if os.path.exists(path) else None
+
+def local_imports(module_name):
+    """The module and every local module it imports, directly or indirectly"""
+    seen, pending = set(), [module_name]
+    while pending:
+        name = pending.pop()
+        path = _local_source(name)
+        if name in seen or path is None:
+            continue
+        seen.add(name)
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), filename=path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                pending.extend(alias.name.split('.')[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                pending.append(node.module.split('.')[0])
+    return sorted(seen)
+
+def code_version(stage, manifest):
+    """Hash of the stage's source files and this runner (whose adapters call the stage)"""
+    digest = hashlib.sha1()
+    for name in sorted(set(local_imports(stage.name)) | {'pipeline_dag'}):
+        digest.update(f"{name}:{file_digest(_local_source(name), manifest)}\n".encode())
+    if stage.version is not None:
+        digest.update(stage.version().encode())
+    return digest.hexdigest()
+
+def stage_key(stage, manifest):
+    """What a stage's outputs depend on: its code version and input hashes"""
+    return {
+        'code': code_version(stage, manifest),
+        'inputs': {path: file_digest(path, manifest) for path in stage.inputs},
+    }
+
+def stage_is_current(stage, key, manifest):
+    """True when the stage last ran with this key and its outputs are unchanged since"""
+    recorded = manifest['stages'].get(stage.name)
+    if recorded is None or recorded['code'] != key['code'] or recorded['inputs'] != key['inputs']:
+        return False
+    return all(digest is not None and file_digest(path, manifest) == digest
+               for path, digest in recorded['outputs'].items())
+
+def record_stage(stage, key, manifest):
+    """Record a successful run (only when every output was written)"""
+    outputs = {path: file_digest(path, manifest) for path in stage.outputs}
+    if any(digest is None for digest in outputs.values()):
+        manifest['stages'].pop(stage.name, None)
+    else:
+        manifest['stages'][stage.name] = dict(key, outputs=outputs)
+
+def _reset_peak_rss():
+    """Restart the process's peak RSS counter where the kernel allows it (Linux)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def _peak_rss_mb():
+    """Peak resident memory of the process in MB, or None"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def _thread_io():
+    """(bytes read, bytes written) through system calls by the calling thread, or (None, None)"""
+    try:
+        with open('/proc/thread-self/io') as f:
+            counters = dict(line.split(': ') for line in f.read().splitlines())
+        return int(counters['rchar']), int(counters['wchar'])
+    except (OSError, KeyError, ValueError):
+        return None, None
+
+def run_stage(stage, frames, verbose=False, reset_peak_rss=False):
+    """Run one stage in this thread; returns (error message or None, captured output, metrics)
+
+    Must run inside run_pipeline, which routes each thread's output.
+    """
+    output = io.StringIO()
+    if not verbose:
+        sys.stdout.local.buffer = output
+    if reset_peak_rss:
+        _reset_peak_rss()
+    read_before, written_before = _thread_io()
+    wall_start, cpu_start = time.perf_counter(), time.thread_time()
+    error = None
+    try:
+        stage.run(frames)
+    except SystemExit as e:
+        # A script calling sys.exit (or argparse rejecting arguments) must not end the whole process
+        if e.code not in (None, 0):
+            error = f"{stage.name} exited with status {e.code}"
+    except Exception:
+        error = traceback.format_exc()
+    finally:
+        sys.stdout.local.buffer = None
+        # Outputs were rewritten on disk, so any parsed copy is stale (unless the stage stored a fresh one)
+        for path in stage.outputs:
+            if path in FRAME_LOADERS:
+                frames.pop(path, None)
+
+    read_after, written_after = _thread_io()
+    metrics = {
+        'wall_seconds': round(time.perf_counter() - wall_start, 3),
+        'cpu_seconds': round(time.thread_time() - cpu_start, 3),
+        'peak_rss_mb': _peak_rss_mb(),
+        'bytes_read': None if read_before is None else read_after - read_before,
+        'bytes_written': None if written_before is None else written_after - written_before,
+    }
+    return error, output.getvalue(), metrics
+
+def append_run_report(records, path=RUN_REPORT_FILE):
+    """Append the per-stage records of one run to the JSONL run history"""
+    with open(path, 'a') as f:
+        for record in records:
+            f.write(json.dumps(record) + '\n')
+
+@contextlib.contextmanager
+def pipeline_lock(blocking=True, path=LOCK_FILE):
+    """Hold the pipeline lock while a run is in progress; yields False if blocking=False and it is taken"""
+    with open(path, 'a') as lock_file:
+        if fcntl is None:
+            yield True
+            return
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+# Stage outputs published in each snapshot (the raw API export and node timings stay working files)
+SNAPSHOT_FILES = [path for stage in STAGES for path in stage.outputs
+                  if path not in (EXECUTIONS_FILE, NODE_TIMINGS_FILE)]
+
+def snapshot_version(digests):
+    """Version id of a set of files, from their names and content hashes"""
+    text = '|'.join(f"{path}:{digest}" for path, digest in sorted(digests.items()))
+    return hashlib.sha1(text.encode()).hexdigest()[:16]
+
+def write_snapshot(version, digests, previous=None, snapshot_dir=SNAPSHOT_DIR):
+    """Create snapshots/<version>/ from the working files unless it exists; returns its path"""
+    target = os.path.join(snapshot_dir, version)
+    if os.path.isdir(target):
+        return target
+
+    # Build under a temporary name and rename, so a snapshot directory is always complete
+    building = f"{target}.tmp-{os.getpid()}"
+    shutil.rmtree(building, ignore_errors=True)
+    os.makedirs(building)
+    for path, digest in digests.items():
+        destination = os.path.join(building, path)
+        if previous and previous['digests'].get(path) == digest:
+            try:
+                os.link(os.path.join(previous['snapshot'], path), destination)
+                continue
+            except OSError:
+                pass
+        shutil.copy2(path, destination)
+    os.rename(building, target)
+    return target
+
+def prune_snapshots(keep, snapshot_dir=SNAPSHOT_DIR, kept=SNAPSHOTS_KEPT):
+    """Delete all but the newest `kept` snapshots (never the ones in `keep`)"""
+    snapshots = [os.path.join(snapshot_dir, name) for name in os.listdir(snapshot_dir)
+                 if '.tmp-' not in name]
+    snapshots.sort(key=os.path.getmtime, reverse=True)
+    for path in snapshots[kept:]:
+        if path not in keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+def publish_run(records, manifest, path=PUBLISHED_FILE):
+    """Snapshot the outputs of a successful run and swap the current pointer to it"""
+    digests = {name: file_digest(name, manifest) for name in SNAPSHOT_FILES}
+    digests = {name: digest for name, digest in digests.items() if digest is not None}
+    version = snapshot_version(digests)
+    previous = load_publication(path)
+    snapshot = write_snapshot(version, digests, previous if previous and 'digests' in previous else None)
+
+    publication = {
+        'version': version,
+        'snapshot': snapshot,
+        'published_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'run_started_at': records[0]['run_started_at'] if records else None,
+        'stages': {record['stage']: record['status'] for record in records},
+        'digests': digests,
+    }
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(publication, f, indent=2)
+    os.replace(temp_path, path)
+    prune_snapshots(keep={snapshot, previous and previous.get('snapshot')})
+    return publication
+
+def load_publication(path=PUBLISHED_FILE):
+    """The current published snapshot, or None"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def snapshot_path(name, publication):
+    """Where to read an output: its file in the published snapshot, else the working file"""
+    if publication is not None and name in publication.get('digests', {}):
+        return os.path.join(publication['snapshot'], name)
+    return name
+
+def publication_age(publication):
+    """Seconds since the run was published"""
+    published_at = datetime.fromisoformat(publication['published_at'])
+    return (datetime.now(timezone.utc) - published_at).total_seconds()
+
+def print_run_summary(records):
+    """One line per stage: ran (with time and memory), up to date, failed or not run"""
+    symbols = {'ran': '✅', 'up to date': '⏭️ ', 'failed': '❌', 'not run': '🚫'}
+    print("\n📋 Pipeline summary")
+    print("-" * 50)
+    for record in records:
+        line = f"  {symbols[record['status']]} {record['description']}: {record['status']}"
+        if record.get('wall_seconds') is not None:
+            line += f" ({record['wall_seconds']:.2f}s wall, {record['cpu_seconds']:.2f}s CPU"
+            if record['peak_rss_mb'] is not None:
+                line += f", {record['peak_rss_mb']:.0f} MB peak"
+            line += ")"
+        print(line)
+
+def run_pipeline(stages=STAGES, frames=None, verbose=False, total_steps=None, first_step=1, force=False,
+                 jobs=1):
+    """Run stages in dependency order on up to `jobs` threads
+
+    Stages whose inputs, outputs and code are unchanged since their last
+    successful run are skipped unless force is set. Stages without inputs
+    (the API fetches) always run. A failed stage stops only the stages that
+    depend on it, directly or indirectly; independent branches finish.
+
+    Callers hold pipeline_lock for the duration of the run (run_single_flight
+    takes it and records the run as the in-flight job). A run without
+    failures is published as a snapshot for the dashboard. Each stage's status and
+    measurements are appended to the run report.
+    With jobs > 1, peak RSS is that of the whole process while the stage
+    ran, since parallel stages share it.
+
+    Returns (failed, frames): failed lists (stage, error message) for each
+    failed stage (empty on success); frames holds the DataFrames still in
+    memory, such as the detailed report.
+    """
+    frames = {} if frames is None else frames
+    ordered = stage_order(stages)
+    dependencies = stage_dependencies(stages)
+    total_steps = total_steps or len(ordered)
+    steps = {stage.name: step for step, stage in enumerate(ordered, first_step)}
+    manifest = load_manifest()
+    status, failed, running = {}, [], {}
+    pending = list(ordered)
+    run_started_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    records = {stage.name: {'run_started_at': run_started_at, 'stage': stage.name,
+                            'description': stage.description, 'jobs': jobs}
+               for stage in ordered}
+
+    def start(stage, pool):
+        print(f"\n📋 Step {steps[stage.name]}/{total_steps}: {stage.description}")
+        print("-" * 50)
+        key = stage_key(stage, manifest)
+        records[stage.name]['rows_in'] = total_rows(stage.inputs, manifest)
+        if stage.inputs and not force and stage_is_current(stage, key, manifest):
+            print(f"⏭️  {stage.description} is up to date, skipping")
+            status[stage.name] = 'up to date'
+            records[stage.name]['rows_out'] = total_rows(stage.outputs, manifest)
+            return
+        print(f"🔄 Running {stage.description}...")
+        running[pool.submit(run_stage, stage, frames, verbose, jobs <= 1)] = (stage, key)
+
+    def finish(future):
+        stage, key = running.pop(future)
+        error, output, metrics = future.result()
+        records[stage.name].update(metrics)
+        if jobs > 1:
+            print(f"\n📋 Step {steps[stage.name]}/{total_steps} finished: {stage.description}")
+        if output:
+            print("📊 Output:", output[-OUTPUT_TAIL:])
+        if error is not None:
+            manifest['stages'].pop(stage.name, None)
+            save_manifest(manifest)
+            status[stage.name] = 'failed'
+            failed.append((stage, error))
+            print(f"❌ Error in {stage.description}:")
+            print(f"Error: {error}")
+            return
+        missing = [path for path in stage.outputs if not os.path.exists(path)]
+        if missing:
+            print(f"⚠️ {stage.description} did not write: {', '.join(missing)}")
+        record_stage(stage, key, manifest)
+        records[stage.name]['rows_out'] = total_rows(stage.outputs, manifest)
+        save_manifest(manifest)
+        status[stage.name] = 'ran'
+        print(f"✅ {stage.description} completed successfully")
+
+    with _pipeline_process(), ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while pending or running:
+            # Start every stage whose dependencies are done, up to the pool size
+            for stage in list(pending):
+                if len(running) >= max(1, jobs):
+                    break
+                upstream = [status.get(name) for name in dependencies[stage.name]]
+                if any(state in ('failed', 'not run') for state in upstream):
+                    pending.remove(stage)
+                    status[stage.name] = 'not run'
+                elif all(state is not None for state in upstream):
+                    pending.remove(stage)
+                    start(stage, pool)
+            if running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(future)
+
+    for name, record in records.items():
+        record['status'] = status[name]
+    append_run_report(records.values())
+    print_run_summary(records.values())
+    if not failed:
+        publication = publish_run(list(records.values()), manifest)
+        save_manifest(manifest)
+        print(f"📢 Published snapshot {publication['version']}")
+    return failed, frames
+
+# Stands in for the stage of a refresh job that ended without recording which stage failed
+REFRESH_JOB = Stage('refresh', "Pipeline refresh", None, [], [], None)
+
+def load_job_state(path=JOB_STATE_FILE):
+    """The running or last finished pipeline job, or None"""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+def save_job_state(job, path=JOB_STATE_FILE):
+    """Write the job state atomically"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(job, f, indent=2)
+    os.replace(temp_path, path)
+
+def _run_job(stages, **kwargs):
+    """Run the pipeline as the in-flight job, recording its state and result (caller holds the lock)"""
+    job = {
+        'job_id': f"{os.getpid()}-{time.time_ns()}",
+        'pid': os.getpid(),
+        'state': 'running',
+        'started_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'stages': [stage.name for stage in stages],
+        'force': kwargs.get('force', False),
+    }
+    save_job_state(job)
+    failed = [(REFRESH_JOB, "Refresh job did not finish")]
+    try:
+        failed, frames = run_pipeline(stages, **kwargs)
+        return failed, frames
+    finally:
+        publication = load_publication()
+        save_job_state(dict(job, state='done',
+                            finished_at=datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                            failed=[(stage.name, error) for stage, error in failed],
+                            version=publication['version'] if publication is not None else None))
+
+def _job_result(job):
+    """(failed, frames) of a finished job, read back from its state"""
+    if job is None or job['state'] != 'done':
+        # The job's process died before recording a result
+        return [(REFRESH_JOB, "Refresh job ended without a result")], {}
+    by_name = {stage.name: stage for stage in STAGES}
+    return [(by_name.get(name, REFRESH_JOB), error) for name, error in job['failed']], {}
+
+def _job_covers(job, stages, force=False):
+    """True when the job runs (or ran) every one of these stages, forced if force is asked for"""
+    return (job is not None and {stage.name for stage in stages} <= set(job['stages'])
+            and (job.get('force', False) or not force))
+
+def run_single_flight(stages=STAGES, if_running='attach', **kwargs):
+    """Run the pipeline as the one in-flight job, or deal with the job already running
+
+    if_running: 'attach' waits for the running job and returns its result,
+    'wait' runs a new job once it has finished, 'skip' returns None at once.
+    A running job that does not cover the requested stages (or was not
+    forced when force is asked for) is waited for rather than attached to.
+    Returns (failed, frames, attached): run_pipeline's result plus whether
+    it came from another caller's job (frames is then empty and the
+    outputs are in the published snapshot).
+    """
+    with pipeline_lock(blocking=False) as acquired:
+        if acquired:
+            return _run_job(stages, **kwargs) + (False,)
+    if if_running == 'skip':
+        return None
+
+    force = kwargs.get('force', False)
+    job = load_job_state()
+    running = job is not None and job['state'] == 'running'
+    if if_running == 'attach' and not (running and _job_covers(job, stages, force)):
+        print("🔁 The running pipeline job does not cover this refresh, running it afterwards")
+        if_running = 'wait'
+    if running:
+        print(f"⏳ Waiting for the pipeline job started at {job['started_at']} (pid {job['pid']})")
+    with pipeline_lock():
+        # The job we waited for recorded its result before releasing the lock
+        finished = load_job_state()
+        if if_running == 'wait' or not _job_covers(finished, stages, force):
+            return _run_job(stages, **kwargs) + (False,)
+        return _job_result(finished) + (True,)
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Post-Cutoff Chart Rendering
+Renders sentryskin_post_oct7_2025_analysis.png from the detailed report, off the pipeline's critical path
+
+analyze_post_oct7_2025.py writes the report CSV first and then starts this
+script as a detached background process. The chart only depends on the
+report and the cutoff, so their content hash is stored next to the PNG and
+an unchanged report skips the 300 dpi render entirely. matplotlib is only
+imported here, on the Agg backend.
+"""
+
+import argparse
+import hashlib
+import io
+import os
+import subprocess
+import sys
+import tempfile
+
+import pandas as pd
+
+from user_agent_sets import DEVICE_LABELS, BROWSER_LABELS, OS_LABELS, mask_counts
+
+CHART_FILE = 'sentryskin_post_oct7_2025_analysis.png'
+CHART_STAMP_FILE = f'{CHART_FILE}.inputs'
+RENDER_LOG_FILE = 'render_post_oct7_chart.log'
+
+def read_report(report_path):
+    """Raw bytes of the report; the version and the chart both come from this one read"""
+    with open(report_path, 'rb') as f:
+        return f.read()
+
+def chart_inputs_version(report_bytes, cutoff):
+    """Content hash of everything the chart is drawn from"""
+    return hashlib.sha1(f"{cutoff}\n".encode() + report_bytes).hexdigest()
+
+def _unique_temp_path(path, suffix=''):
+    """New empty temp file next to path, unique per writer"""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                     prefix=f"{os.path.basename(path)}.", suffix=f".tmp{suffix}")
+    os.close(fd)
+    # mkstemp creates the file private; the chart is shared like any other output
+    os.chmod(temp_path, 0o644)
+    return temp_path
+
+def chart_is_current(version, chart_path=CHART_FILE, stamp_path=CHART_STAMP_FILE):
+    """True when the saved chart was rendered from these inputs"""
+    if not os.path.exists(chart_path):
+        return False
+    try:
+        with open(stamp_path) as f:
+            return f.read().strip() == version
+    except FileNotFoundError:
+        return False
+
+def create_visualizations(report_df, cutoff, chart_path=CHART_FILE):
+    """Render the 2x2 device/browser/OS/conversation chart of the report users"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    total_users = len(report_df)
+    device_counts = mask_counts(report_df['device_mask'], DEVICE_LABELS).to_dict()
+    browser_counts = mask_counts(report_df['browser_mask'], BROWSER_LABELS).to_dict()
+    os_counts = mask_counts(report_df['os_mask'], OS_LABELS).to_dict()
+
+    # Set up the plotting style
+    plt.style.use('default')
+    sns.set_palette("husl")
+
+    # Create figure with subplots
+    fig, axes = plt.subplots(2, 2, figsize=(16, 12))
+    fig.suptitle(f'SentrySkin Users Analysis - After {cutoff}', fontsize=16, fontweight='bold')
+
+    # 1. Device Distribution Pie Chart
+    ax1 = axes[0, 0]
+    if device_counts:
+        devices = list(device_counts.keys())
+        counts = list(device_counts.values())
+        colors = plt.cm.Set3(range(len(devices)))
+
+        wedges, texts, autotexts = ax1.pie(counts, labels=devices, autopct='%1.1f%%',
+                                          colors=colors, startangle=90)
+        ax1.set_title('Device Distribution', fontweight='bold')
+
+        # Make percentage text bold
+        for autotext in autotexts:
+            autotext.set_fontweight('bold')
+
+    # 2. Browser Distribution Bar Chart
+    ax2 = axes[0, 1]
+    if browser_counts:
+        browsers = list(browser_counts.keys())
+        counts = list(browser_counts.values())
+
+        bars = ax2.bar(browsers, counts, color=plt.cm.viridis(range(len(browsers))))
+        ax2.set_title('Browser Distribution', fontweight='bold')
+        ax2.set_ylabel('Number of Users')
+        ax2.tick_params(axis='x', rotation=45)
+
+        # Add value labels on bars
+        for bar, count in zip(bars, counts):
+            ax2.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.5,
+                    str(count), ha='center', va='bottom', fontweight='bold')
+
+    # 3. OS Distribution Bar Chart
+    ax3 = axes[1, 0]
+    if os_counts:
+        os_list = list(os_counts.keys())
+        counts = list(os_counts.values())
+
+        bars = ax3.bar(os_list, counts, color=plt.cm.plasma(range(len(os_list))))
+        ax3.set_title('Operating System Distribution', fontweight='bold')
+        ax3.set_ylabel('Number of Users')
+        ax3.tick_params(axis='x', rotation=45)
+
+        # Add value labels on bars
+        for bar, count in zip(bars, counts):
+            ax3.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.5,
+                    str(count), ha='center', va='bottom', fontweight='bold')
+
+    # 4. Conversation Count Distribution
+    ax4 = axes[1, 1]
+    conversation_counts = report_df['conversation_count']
+
+    # Create histogram
+    if total_users:
+        bins = range(1, int(conversation_counts.max()) + 2)
+        ax4.hist(conversation_counts, bins=bins, alpha=0.7, color='skyblue', edgecolor='black')
+
+    ax4.set_title('Conversation Count Distribution', fontweight='bold')
+    ax4.set_xlabel('Number of Conversations')
+    ax4.set_ylabel('Number of Users')
+    ax4.grid(True, alpha=0.3)
+
+    # Add statistics text
+    if total_users:
+        stats_text = f'Mean: {conversation_counts.mean():.1f}\nMedian: {conversation_counts.median():.1f}\nMax: {conversation_counts.max()}'
+        ax4.text(0.7, 0.7, stats_text, transform=ax4.transAxes,
+                 bbox=dict(boxstyle="round,pad=0.3", facecolor="white", alpha=0.8),
+                 fontweight='bold')
+
+    plt.tight_layout()
+    # Write to a temporary file first so readers never see a half-written PNG
+    temp_path = _unique_temp_path(chart_path, '.png')
+    try:
+        fig.savefig(temp_path, dpi=300, bbox_inches='tight')
+        os.replace(temp_path, chart_path)
+    finally:
+        plt.close(fig)
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+def render_chart(report_path, cutoff, force=False):
+    """Render the chart unless it is already current; returns True if it rendered"""
+    report_bytes = read_report(report_path)
+    version = chart_inputs_version(report_bytes, cutoff)
+    if not force and chart_is_current(version):
+        print(f"⏭️  {CHART_FILE} is up to date, skipping render")
+        return False
+
+    create_visualizations(pd.read_csv(io.BytesIO(report_bytes)), cutoff)
+    temp_path = _unique_temp_path(CHART_STAMP_FILE)
+    with open(temp_path, 'w') as f:
+        f.write(version)
+    os.replace(temp_path, CHART_STAMP_FILE)
+    print(f"✅ Visualization saved as: {CHART_FILE}")
+    return True
+
+def start_background_render(report_path, cutoff):
+    """Start the render as a detached process unless the chart is current; returns the process or None"""
+    if chart_is_current(chart_inputs_version(read_report(report_path), cutoff)):
+        print(f"⏭️  {CHART_FILE} is up to date, skipping render")
+        return None
+
+    # Output goes to a log file, so callers capturing our stdout do not wait for the render
+    with open(RENDER_LOG_FILE, 'a') as log:
+        process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), report_path, '--cutoff', str(cutoff)],
+            stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL,
+            start_new_session=True
+        )
+    print(f"🖼️  Rendering {CHART_FILE} in the background (pid {process.pid}, log: {RENDER_LOG_FILE})")
+    return process
+
+def main():
+    """Render the post-cutoff chart from a detailed report"""
+    parser = argparse.ArgumentParser(description='Render the post-cutoff analysis chart')
+    parser.add_argument('report', help='Detailed report CSV to chart')
+    parser.add_argument('--cutoff', required=True, help='Cutoff date shown in the chart title')
+    parser.add_argument('--force', action='store_true', help='Render even if the inputs are unchanged')
+    args = parser.parse_args()
+
+    try:
+        render_chart(args.report, args.cutoff, args.force)
+    except FileNotFoundError:
+        print(f"❌ File '{args.report}' not found!")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
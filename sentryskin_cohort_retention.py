@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+SentrySkin Cohort Retention
+Weekly cohort x week-offset retention matrix for SentrySkin users
+
+Users belong to the cohort of the week (Monday, UTC) of their first
+interaction. Cell (cohort, k) counts the cohort's users active in week k
+after it. The matrix comes from one np.bincount over (cohort, offset)
+indexes and is cached under the version of the extracted data.
+"""
+
+import numpy as np
+import pandas as pd
+
+from data_cache import data_version, load_cached, save_cached
+
+EXTRACTED_FILE = "sentryskin_extracted_fields.csv"
+RETENTION_FILE = "sentryskin_cohort_retention.csv"
+RETENTION_CACHE_FILE = "sentryskin_cohort_retention.pkl"
+
+def load_user_activity(path=EXTRACTED_FILE):
+    """Load (user_identifier, timestamp) pairs from the extracted data"""
+    df = pd.read_csv(path, usecols=['timestamp', 'chat_id', 'thread_id'],
+                     dtype={'chat_id': 'object', 'thread_id': 'object'})
+    users = df['chat_id'].fillna(df['thread_id'])
+    return pd.DataFrame({
+        'user_identifier': users.where(users != ''),
+        'timestamp': pd.to_datetime(df['timestamp'], utc=True, format='ISO8601', errors='coerce'),
+    })
+
+def build_retention_matrix(activity):
+    """Cohort x week-offset matrix of active users (index: cohort week start)"""
+    valid = (activity['user_identifier'].notna() & activity['timestamp'].notna()).to_numpy()
+    if not valid.any():
+        return pd.DataFrame(columns=['cohort_size'])
+
+    user_codes, _ = pd.factorize(activity['user_identifier'][valid])
+    days = activity['timestamp'][valid].dt.tz_convert(None).to_numpy().astype('datetime64[D]').astype(np.int64)
+    # 1970-01-01 was a Thursday, so shifting by 3 days puts week boundaries on Mondays
+    weeks = (days + 3) // 7
+    first_week = weeks.min()
+    weeks = weeks - first_week
+    n_weeks = int(weeks.max()) + 1
+
+    # One entry per (user, week) the user was active in, sorted by user then week
+    active = np.unique(user_codes * n_weeks + weeks)
+    active_users, active_weeks = active // n_weeks, active % n_weeks
+
+    # Cohort = first active week of each user (the first entry of each user's run)
+    user_runs = np.flatnonzero(np.diff(active_users, prepend=-1))
+    cohort = active_weeks[user_runs]
+    user_cohorts = np.repeat(cohort, np.diff(np.append(user_runs, len(active))))
+    offsets = active_weeks - user_cohorts
+
+    counts = np.bincount(user_cohorts * n_weeks + offsets, minlength=n_weeks * n_weeks).reshape(n_weeks, n_weeks)
+    cohort_starts = pd.to_datetime((np.arange(n_weeks) + first_week) * 7 - 3, unit='D')
+    matrix = pd.DataFrame(counts, index=pd.DatetimeIndex(cohort_starts, name='cohort_week'),
+                          columns=[f"week_{offset}" for offset in range(n_weeks)])
+    matrix = matrix[matrix['week_0'] > 0]
+    matrix.insert(0, 'cohort_size', matrix['week_0'])
+    return matrix
+
+def retention_rates(matrix):
+    """Share of each cohort active in each week offset (NaN where the week has not happened yet)"""
+    rates = matrix.drop(columns='cohort_size').div(matrix['cohort_size'], axis=0)
+    if rates.empty:
+        return rates
+    # Columns span the first cohort week through the last active week, which
+    # can be later than the last cohort (weeks where nobody new arrived)
+    last_week = matrix.index.min() + pd.Timedelta(weeks=rates.shape[1] - 1)
+    elapsed = ((last_week - matrix.index).days // 7).to_numpy()
+    offsets = np.arange(rates.shape[1])
+    return rates.where(offsets[None, :] <= elapsed[:, None])
+
+def cohort_retention(path=EXTRACTED_FILE, cache_path=RETENTION_CACHE_FILE):
+    """Retention matrix for the current extracted data, recomputed only when the data changes"""
+    version = data_version(path)
+    matrix = load_cached(cache_path, version)
+    if matrix is None:
+        matrix = build_retention_matrix(load_user_activity(path))
+        save_cached(cache_path, version, matrix)
+    return matrix
+
+def main():
+    """Build the cohort retention matrix"""
+    print("🎯 SentrySkin Cohort Retention")
+    print("=" * 50)
+
+    try:
+        matrix = cohort_retention()
+    except FileNotFoundError:
+        print(f"❌ File '{EXTRACTED_FILE}' not found!")
+        print("Please run extract_sentryskin_fields.py first to generate the data.")
+        return
+
+    output = matrix.copy()
+    output.index = output.index.strftime('%Y-%m-%d')
+    output.to_csv(RETENTION_FILE)
+
+    print(f"📊 Cohorts: {len(matrix)}, users: {int(matrix['cohort_size'].sum())}")
+    rates = retention_rates(matrix)
+    if 'week_1' in rates.columns:
+        print(f"📈 Average week-1 retention: {rates['week_1'].mean() * 100:.1f}%")
+    print(f"✅ Retention matrix saved to: {RETENTION_FILE}")
+
+if __name__ == "__main__":
+    main()
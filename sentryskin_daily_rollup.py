@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+SentrySkin Daily Rollup
+Daily activity cube keyed by (day, device, browser, operating_system, conversation_stage)
+
+Each row holds the executions and distinct users of one cell. Only days
+touched by executions not processed yet are recomputed (newer than the
+rollup's highest execution id, or late arrivals just below it, see
+execution_watermark), so a refresh rewrites a handful of rows. Distinct users are
+exact per row but not additive across days: summing `users` over several
+days counts user-days.
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from execution_watermark import unprocessed_mask, advance_watermark
+from user_agent_sets import classify_user_agent
+
+ROLLUP_FILE = "sentryskin_daily_rollup.csv"
+# Execution ids processed just below the watermark, kept in rollup.attrs['recent_ids']
+ROLLUP_IDS_FILE = "sentryskin_daily_rollup_ids.npz"
+EXTRACTED_FILE = "sentryskin_extracted_fields.csv"
+
+ROLLUP_KEYS = ['day', 'device', 'browser', 'operating_system', 'conversation_stage']
+ROLLUP_COLUMNS = ROLLUP_KEYS + ['executions', 'users', 'max_execution_id']
+
+# Label for records without a user agent or conversation stage
+UNKNOWN = 'Unknown'
+
+def load_extracted_data():
+    """Load the extracted columns the rollup needs"""
+    try:
+        return pd.read_csv(
+            EXTRACTED_FILE,
+            usecols=['execution_id', 'timestamp', 'user_agent', 'chat_id', 'thread_id', 'conversation_stage'],
+            dtype={'user_agent': 'object', 'chat_id': 'object', 'thread_id': 'object', 'conversation_stage': 'object'}
+        )
+    except FileNotFoundError:
+        print(f"❌ File '{EXTRACTED_FILE}' not found!")
+        print("Please run extract_sentryskin_fields.py first to generate the data.")
+        return None
+
+def load_rollup(path=ROLLUP_FILE, ids_path=ROLLUP_IDS_FILE):
+    """Load the rollup table (day as datetime64), or None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    rollup = pd.read_csv(path, keep_default_na=False)
+    rollup['day'] = pd.to_datetime(rollup['day'])
+    # Without the ids, every day in the watermark window is recomputed once (harmless)
+    if os.path.exists(ids_path):
+        with np.load(ids_path) as data:
+            rollup.attrs['recent_ids'] = data['recent_ids']
+    return rollup
+
+def _record_days(df):
+    """UTC day of each record (NaT for unparseable timestamps)"""
+    timestamps = pd.to_datetime(df['timestamp'], utc=True, format='ISO8601', errors='coerce')
+    return timestamps.dt.tz_convert(None).dt.normalize()
+
+def build_rollup(df):
+    """Aggregate records into rollup rows"""
+    days = _record_days(df)
+    records = df[days.notna()]
+    if records.empty:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+
+    # Classify each distinct user agent once
+    agent_codes, distinct_agents = pd.factorize(records['user_agent'].replace('', np.nan))
+    labels = np.array(
+        [classify_user_agent(user_agent) for user_agent in distinct_agents] + [(UNKNOWN,) * 3],
+        dtype=object
+    ).reshape(-1, 3)[agent_codes]
+
+    users = records['chat_id'].fillna(records['thread_id'])
+    cells = pd.DataFrame({
+        'day': days[days.notna()].to_numpy(),
+        'device': labels[:, 0],
+        'browser': labels[:, 1],
+        'operating_system': labels[:, 2],
+        'conversation_stage': records['conversation_stage'].replace('', np.nan).fillna(UNKNOWN).to_numpy(),
+        'user_identifier': users.where(users != '').to_numpy(),
+        'execution_id': pd.to_numeric(records['execution_id'], errors='coerce').to_numpy(),
+    })
+    rollup = cells.groupby(ROLLUP_KEYS, sort=True).agg(
+        executions=('execution_id', 'size'),
+        users=('user_identifier', 'nunique'),
+        max_execution_id=('execution_id', 'max'),
+    ).reset_index()
+    return rollup[ROLLUP_COLUMNS]
+
+def update_rollup(df, rollup=None):
+    """Recompute the rollup rows of days touched by executions not processed yet"""
+    execution_ids = pd.to_numeric(df['execution_id'], errors='coerce')
+    if execution_ids.isna().any():
+        print(f"📊 Building rollup from {len(df)} records")
+        return build_rollup(df)
+    execution_ids = execution_ids.to_numpy(dtype=np.int64)
+    if rollup is None or rollup.empty:
+        print(f"📊 Building rollup from {len(df)} records")
+        rollup = build_rollup(df)
+        rollup.attrs['recent_ids'] = advance_watermark(None, [], execution_ids)[1]
+        return rollup
+
+    watermark = int(rollup['max_execution_id'].max())
+    recent_ids = rollup.attrs.get('recent_ids', np.array([], dtype=np.int64))
+    new = unprocessed_mask(execution_ids, watermark, recent_ids)
+    recent_ids = advance_watermark(watermark, recent_ids, execution_ids[new])[1]
+    days = _record_days(df)
+    touched_days = days[new].dropna().unique()
+    print(f"🆕 New records since last run: {int(new.sum())} ({len(touched_days)} days to recompute)")
+    if len(touched_days) > 0:
+        recomputed = build_rollup(df[days.isin(touched_days)])
+        kept = rollup[~rollup['day'].isin(touched_days)]
+        rollup = pd.concat([kept, recomputed], ignore_index=True).sort_values(ROLLUP_KEYS, ignore_index=True)
+    rollup.attrs['recent_ids'] = recent_ids
+    return rollup
+
+def save_rollup(rollup, path=ROLLUP_FILE, ids_path=ROLLUP_IDS_FILE):
+    """Save the rollup table (and the recent execution ids, when known)"""
+    output = rollup.copy()
+    output['day'] = pd.to_datetime(output['day']).dt.strftime('%Y-%m-%d')
+    output.to_csv(path, index=False)
+    if 'recent_ids' in rollup.attrs:
+        np.savez(ids_path, recent_ids=rollup.attrs['recent_ids'])
+
+def filter_rollup(rollup, start=None, end=None):
+    """Rollup rows with day in [start, end] (inclusive, None = open)"""
+    selected = pd.Series(True, index=rollup.index)
+    if start is not None:
+        selected &= rollup['day'] >= pd.Timestamp(start).tz_localize(None).normalize()
+    if end is not None:
+        selected &= rollup['day'] <= pd.Timestamp(end).tz_localize(None).normalize()
+    return rollup[selected]
+
+def rollup_counts(rollup, dimension, measure='executions'):
+    """Total of a measure per value of one dimension, largest first"""
+    return rollup.groupby(dimension)[measure].sum().sort_values(ascending=False, kind='stable')
+
+def main():
+    """Update the daily rollup from the extracted data"""
+    parser = argparse.ArgumentParser(description='SentrySkin Daily Rollup')
+    parser.add_argument('--full-rebuild', action='store_true',
+                       help='Ignore the saved rollup and rebuild it from the full history')
+    args = parser.parse_args()
+
+    print("🎯 SentrySkin Daily Rollup")
+    print("=" * 50)
+
+    df = load_extracted_data()
+    if df is None:
+        return
+
+    rollup = update_rollup(df, None if args.full_rebuild else load_rollup())
+    save_rollup(rollup)
+
+    print(f"✅ Rollup saved to: {ROLLUP_FILE} ({len(rollup)} rows, "
+          f"{rollup['day'].nunique()} days, {int(rollup['executions'].sum())} executions)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+SentrySkin Latency Sketches
+Per-day quantile sketches of workflow execution time (finished_at - timestamp)
+
+Durations in milliseconds go into DDSketch-style logarithmic buckets: key k
+holds values in (GAMMA^(k-1), GAMMA^k] with GAMMA = (1 + ACCURACY) / (1 - ACCURACY),
+so any quantile read back is within ACCURACY (1%) relative error of a value
+at that rank. Each day is a fixed-size count array; days merge by addition,
+so p50/p95/p99 over any window come from summing that window's rows.
+
+Executions still running when fetched have no finished_at; they are not
+counted as processed, so they are added once they finish as long as they are
+still within the watermark window (see execution_watermark).
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from execution_watermark import unprocessed_mask, advance_watermark
+
+ACCURACY = 0.01
+GAMMA = (1 + ACCURACY) / (1 - ACCURACY)
+# Keys 0..N_KEYS-1 cover durations up to GAMMA^(N_KEYS-1) ms (about 9 days); longer ones are clamped
+N_KEYS = 1024
+
+SKETCHES_FILE = "sentryskin_latency_sketches.npz"
+EXECUTIONS_FILE = "sentryskin_user_agents.csv"
+
+def duration_keys(durations_ms):
+    """Bucket key of each duration (durations up to 1 ms share key 0)"""
+    durations = np.maximum(np.asarray(durations_ms, dtype=np.float64), 1.0)
+    keys = np.ceil(np.log(durations) / np.log(GAMMA) - 1e-9).astype(np.int64)
+    return np.clip(keys, 0, N_KEYS - 1)
+
+def key_values(keys):
+    """Representative duration (ms) of each key"""
+    return 2 * np.power(GAMMA, keys) / (GAMMA + 1)
+
+def execution_durations(df):
+    """UTC day and duration in ms of each execution with both timestamps"""
+    started = pd.to_datetime(df['timestamp'], utc=True, format='ISO8601', errors='coerce')
+    finished = pd.to_datetime(df['finished_at'], utc=True, format='ISO8601', errors='coerce')
+    durations = (finished - started).dt.total_seconds() * 1000
+    valid = (started.notna() & finished.notna() & (durations >= 0)).to_numpy()
+    days = started[valid].dt.tz_convert(None).to_numpy().astype('datetime64[D]')
+    return days, durations[valid].to_numpy()
+
+def empty_sketches():
+    """Sketch store with no days"""
+    return {
+        'days': np.array([], dtype='datetime64[D]'),
+        'counts': np.zeros((0, N_KEYS), dtype=np.int64),
+        'watermark': None,
+        'recent_ids': np.array([], dtype=np.int64),
+    }
+
+def load_latency_sketches(path=SKETCHES_FILE):
+    """Load the per-day latency sketches, or None if they do not exist"""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        if ('recent_ids' not in data.files or data['counts'].shape[1] != N_KEYS
+                or float(data['accuracy']) != ACCURACY):
+            print("⚠️ Latency sketch layout changed, rebuilding")
+            return None
+        return {
+            'days': data['days'].astype('datetime64[D]'),
+            'counts': data['counts'],
+            'watermark': int(data['watermark']) if data['watermark'] >= 0 else None,
+            'recent_ids': data['recent_ids'],
+        }
+
+def save_latency_sketches(sketches, path=SKETCHES_FILE):
+    """Save the per-day latency sketches"""
+    np.savez_compressed(
+        path,
+        accuracy=ACCURACY,
+        days=sketches['days'],
+        counts=sketches['counts'],
+        watermark=-1 if sketches['watermark'] is None else sketches['watermark'],
+        recent_ids=sketches['recent_ids']
+    )
+
+def add_executions(sketches, df):
+    """Add executions (timestamp, finished_at) to the per-day sketches"""
+    record_days, durations = execution_durations(df)
+    if len(durations) == 0:
+        return sketches
+
+    days = np.union1d(sketches['days'], record_days)
+    counts = np.zeros((len(days), N_KEYS), dtype=np.int64)
+    counts[np.searchsorted(days, sketches['days'])] = sketches['counts']
+
+    cells = np.searchsorted(days, record_days) * N_KEYS + duration_keys(durations)
+    counts += np.bincount(cells, minlength=counts.size).reshape(counts.shape)
+    return dict(sketches, days=days, counts=counts)
+
+def merged_counts(sketches, start=None, end=None):
+    """Sum of the day sketches in [start, end] (inclusive dates, None = open)"""
+    days = sketches['days']
+    selected = np.ones(len(days), dtype=bool)
+    if start is not None:
+        selected &= days >= np.datetime64(pd.Timestamp(start).date(), 'D')
+    if end is not None:
+        selected &= days <= np.datetime64(pd.Timestamp(end).date(), 'D')
+    return sketches['counts'][selected].sum(axis=0)
+
+def sketch_quantiles(counts, quantiles=(0.5, 0.95, 0.99)):
+    """Quantiles (ms) of one sketch; NaN when it is empty"""
+    total = counts.sum(axis=-1, keepdims=True)
+    cumulative = np.cumsum(counts, axis=-1)
+    result = []
+    for q in quantiles:
+        rank = np.floor(q * (total - 1))
+        keys = (cumulative <= rank).sum(axis=-1)
+        result.append(np.where(total[..., 0] > 0, key_values(keys), np.nan))
+    return np.stack(result, axis=-1)
+
+def latency_quantiles(sketches, start=None, end=None, quantiles=(0.5, 0.95, 0.99)):
+    """Latency quantiles in ms over a date window, as {quantile: ms}"""
+    values = sketch_quantiles(merged_counts(sketches, start, end), quantiles)
+    return dict(zip(quantiles, values.tolist()))
+
+def daily_latency_quantiles(sketches, quantiles=(0.5, 0.95, 0.99)):
+    """Latency quantiles per day (columns p50, p95, ...) plus execution counts"""
+    values = sketch_quantiles(sketches['counts'], quantiles)
+    daily = pd.DataFrame(values, columns=[f"p{q * 100:g}" for q in quantiles],
+                         index=pd.DatetimeIndex(sketches['days'], name='day'))
+    daily.insert(0, 'executions', sketches['counts'].sum(axis=1))
+    return daily
+
+def update_latency_sketches(df, full_rebuild=False):
+    """Add finished executions not processed yet and save the sketches"""
+    sketches = None if full_rebuild else load_latency_sketches()
+    if sketches is None:
+        sketches = empty_sketches()
+
+    execution_ids = pd.to_numeric(df['execution_id'], errors='coerce')
+    if execution_ids.isna().any():
+        print("⚠️ Non-numeric execution ids, rebuilding from full history")
+        sketches, new_records = empty_sketches(), df
+    else:
+        new = unprocessed_mask(execution_ids.to_numpy(dtype=np.int64),
+                               sketches['watermark'], sketches['recent_ids'])
+        new_records = df[new & df['finished_at'].notna().to_numpy()]
+    print(f"📊 Adding {len(new_records)} new executions to latency sketches")
+
+    sketches = add_executions(sketches, new_records)
+    if execution_ids.notna().all():
+        processed_ids = execution_ids.loc[new_records.index].to_numpy(dtype=np.int64)
+        sketches['watermark'], sketches['recent_ids'] = advance_watermark(
+            sketches['watermark'], sketches['recent_ids'], processed_ids)
+    save_latency_sketches(sketches)
+    print(f"✅ Latency sketches saved to: {SKETCHES_FILE} ({len(sketches['days'])} days)")
+    return sketches
+
+def main():
+    """Update the latency sketches from the fetched executions"""
+    parser = argparse.ArgumentParser(description='SentrySkin Latency Sketches')
+    parser.add_argument('--full-rebuild', action='store_true',
+                       help='Ignore saved sketches and rebuild from the full history')
+    args = parser.parse_args()
+
+    print("🎯 SentrySkin Latency Sketches")
+    print("=" * 50)
+
+    try:
+        df = pd.read_csv(EXECUTIONS_FILE, usecols=['execution_id', 'timestamp', 'finished_at'])
+    except FileNotFoundError:
+        print(f"❌ File '{EXECUTIONS_FILE}' not found!")
+        print("Please run fetch_sentryskin_data.py first to generate the data.")
+        return
+
+    sketches = update_latency_sketches(df, args.full_rebuild)
+    quantiles = latency_quantiles(sketches)
+    if sketches['counts'].sum():
+        print(f"\n⏱️ Execution time (all days, ±{ACCURACY * 100:g}%): "
+              + ", ".join(f"p{q * 100:g} {value / 1000:.2f}s" for q, value in quantiles.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+SentrySkin Node Profile
+Per-node latency histograms of the n8n workflow from the extracted node run timings
+
+Every node run's duration goes into the same logarithmic buckets as the
+latency sketches (1% relative accuracy), one np.bincount over
+(node, bucket) for all nodes at once. Quantiles per node are read back from
+the histograms.
+"""
+
+import numpy as np
+import pandas as pd
+
+from sentryskin_latency_sketches import N_KEYS, ACCURACY, GAMMA, duration_keys, sketch_quantiles
+
+NODE_TIMINGS_FILE = "sentryskin_node_timings.csv"
+NODE_PROFILE_FILE = "sentryskin_node_profile.csv"
+NODE_HISTOGRAMS_FILE = "sentryskin_node_histograms.csv"
+
+def load_node_timings(path=NODE_TIMINGS_FILE):
+    """Load the (execution_id, node, run_index, start_time, duration_ms) table"""
+    return pd.read_csv(path, dtype={'node': 'object'})
+
+def node_histograms(timings):
+    """(node names, per-node bucket counts array of shape (n_nodes, N_KEYS))"""
+    timings = timings[timings['duration_ms'].notna()]
+    node_codes, nodes = pd.factorize(timings['node'])
+    keys = duration_keys(timings['duration_ms'].to_numpy())
+    counts = np.bincount(node_codes * N_KEYS + keys, minlength=len(nodes) * N_KEYS)
+    return list(nodes), counts.reshape(len(nodes), N_KEYS)
+
+def build_node_profile(timings):
+    """One row per node with run counts, time share and p50/p95/p99, slowest (by p95) first"""
+    timings = timings[timings['duration_ms'].notna()]
+    nodes, histograms = node_histograms(timings)
+    if not nodes:
+        return pd.DataFrame(columns=['node', 'runs', 'executions', 'total_ms', 'share_of_time',
+                                     'mean_ms', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms'])
+
+    totals = timings.groupby('node', sort=False)['duration_ms'].agg(['size', 'sum', 'mean', 'max'])
+    totals = totals.reindex(nodes)
+    quantiles = sketch_quantiles(histograms)
+    profile = pd.DataFrame({
+        'node': nodes,
+        'runs': totals['size'].to_numpy(),
+        'executions': timings.groupby('node', sort=False)['execution_id'].nunique().reindex(nodes).to_numpy(),
+        'total_ms': totals['sum'].to_numpy(),
+        'share_of_time': totals['sum'].to_numpy() / totals['sum'].sum(),
+        'mean_ms': totals['mean'].to_numpy(),
+        'p50_ms': quantiles[:, 0],
+        'p95_ms': quantiles[:, 1],
+        'p99_ms': quantiles[:, 2],
+        'max_ms': totals['max'].to_numpy(),
+    })
+    return profile.sort_values('p95_ms', ascending=False, ignore_index=True)
+
+def histogram_table(nodes, histograms):
+    """Long-form histogram: node, bucket upper bound (ms) and run count for non-empty buckets"""
+    node_index, keys = np.nonzero(histograms)
+    return pd.DataFrame({
+        'node': np.asarray(nodes, dtype=object)[node_index],
+        'bucket_upper_ms': np.power(GAMMA, keys),
+        'runs': histograms[node_index, keys],
+    })
+
+def main():
+    """Build the per-node latency profile"""
+    print("🎯 SentrySkin Node Profile")
+    print("=" * 50)
+
+    try:
+        timings = load_node_timings()
+    except FileNotFoundError:
+        print(f"❌ File '{NODE_TIMINGS_FILE}' not found!")
+        print("Please run extract_sentryskin_fields.py first to generate the data.")
+        return
+
+    print(f"📊 Loaded {len(timings)} node runs")
+    profile = build_node_profile(timings)
+    profile.to_csv(NODE_PROFILE_FILE, index=False)
+    histogram_table(*node_histograms(timings)).to_csv(NODE_HISTOGRAMS_FILE, index=False)
+
+    print(f"\n🐢 Nodes by p95 execution time (±{ACCURACY * 100:g}%):")
+    for node in profile.itertuples():
+        print(f"  {node.node}: p50 {node.p50_ms:.0f}ms, p95 {node.p95_ms:.0f}ms, p99 {node.p99_ms:.0f}ms "
+              f"({node.share_of_time * 100:.1f}% of workflow time, {node.runs} runs)")
+
+    print(f"\n✅ Node profile saved to: {NODE_PROFILE_FILE}")
+    print(f"✅ Node histograms saved to: {NODE_HISTOGRAMS_FILE}")
+
+if __name__ == "__main__":
+    main()
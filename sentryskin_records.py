@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+SentrySkin Record Builder
+Column-wise accumulation of extracted execution records
+"""
+
+import json
+
+import pandas as pd
+
+# Typed timestamp columns are written back to CSV in the API's ISO 8601 UTC form
+CSV_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%S.%fZ'
+
+
+class RecordColumns:
+    """Collects records column by column instead of one dict per record.
+
+    Each column is a plain list, so a record costs one pointer per field
+    rather than a full dict with its own key table. ``to_dataframe`` hands
+    the lists straight to pandas without an intermediate list of dicts:
+    typed columns are converted in one vectorized call (timestamps parsed as
+    UTC, numbers coerced, unparseable values missing), the rest are inferred.
+    """
+
+    __slots__ = ('columns', 'dtypes', '_data', '_appenders')
+
+    def __init__(self, columns):
+        """``columns`` is a sequence of ``(name, dtype)``; a dtype of None lets pandas infer it"""
+        self.columns = tuple(name for name, _ in columns)
+        self.dtypes = dict(columns)
+        self._data = {name: [] for name in self.columns}
+        self._appenders = tuple(self._data[name].append for name in self.columns)
+
+    def append(self, *values):
+        """Append one record, given positionally in column order"""
+        if len(values) != len(self._appenders):
+            raise ValueError(f"Expected {len(self._appenders)} values ({', '.join(self.columns)}), got {len(values)}")
+        for append_value, value in zip(self._appenders, values):
+            append_value(value)
+
+    def __len__(self):
+        return len(self._data[self.columns[0]]) if self.columns else 0
+
+    def column(self, name):
+        """Return the raw list backing a column"""
+        return self._data[name]
+
+    def count_nonempty(self, name):
+        """Count records with a truthy value in the given column"""
+        return sum(1 for value in self._data[name] if value)
+
+    def records(self, limit=None):
+        """Yield records as dicts (only for display and JSON output)"""
+        total = len(self) if limit is None else min(limit, len(self))
+        for i in range(total):
+            yield {name: self._data[name][i] for name in self.columns}
+
+    def to_dataframe(self):
+        """Materialize the columns into a DataFrame"""
+        frame = {}
+        for name in self.columns:
+            dtype = self.dtypes[name]
+            values = self._data[name]
+            frame[name] = values if dtype is None else _typed_array(values, dtype)
+        return pd.DataFrame(frame, columns=list(self.columns))
+
+    def write_json(self, path):
+        """Write records as an indented JSON array, one record at a time"""
+        with open(path, 'w') as f:
+            if len(self) == 0:
+                f.write('[]')
+                return
+            f.write('[\n')
+            for i, record in enumerate(self.records()):
+                if i:
+                    f.write(',\n')
+                f.write('  ' + json.dumps(record, indent=2).replace('\n', '\n  '))
+            f.write('\n]')
+
+
+def _typed_array(values, dtype):
+    """Convert a column's raw values to dtype (a datetime64 dtype parses ISO 8601 as UTC)"""
+    if str(dtype).startswith('datetime64'):
+        return pd.to_datetime(pd.Series(values, dtype=object), utc=True, format='ISO8601', errors='coerce').array
+    return pd.array(pd.to_numeric(pd.Series(values, dtype=object), errors='coerce'), dtype=dtype)
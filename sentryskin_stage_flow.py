@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+SentrySkin Conversation Stage Flow
+Stage -> stage transitions within each thread, plus a progression/drop-off funnel
+
+Executions are ordered by (thread_id, timestamp) once; each execution's
+previous stage is the shifted stage array wherever the thread does not
+change. Every transition, including Start -> first stage and last stage ->
+End (drop-off), is counted with a single np.bincount into a sparse
+(from, to, count) table.
+"""
+
+import numpy as np
+import pandas as pd
+
+EXTRACTED_FILE = "sentryskin_extracted_fields.csv"
+TRANSITIONS_FILE = "sentryskin_stage_transitions.csv"
+FUNNEL_FILE = "sentryskin_stage_funnel.csv"
+
+START_STATE = 'Start'
+END_STATE = 'End'
+UNKNOWN_STAGE = 'unknown'
+
+def load_stage_records(path=EXTRACTED_FILE):
+    """Load the columns needed for the stage flow"""
+    return pd.read_csv(path, usecols=['execution_id', 'timestamp', 'thread_id', 'conversation_stage'],
+                       dtype={'thread_id': 'object', 'conversation_stage': 'object'})
+
+def _ordered_threads(df):
+    """Thread codes and stage codes sorted by (thread, timestamp), plus stage names"""
+    threads = df['thread_id'].where(df['thread_id'] != '')
+    timestamps = pd.to_datetime(df['timestamp'], utc=True, format='ISO8601', errors='coerce')
+    keep = (threads.notna() & timestamps.notna()).to_numpy()
+
+    thread_codes, _ = pd.factorize(threads[keep])
+    stages = df['conversation_stage'][keep].replace('', np.nan).fillna(UNKNOWN_STAGE)
+    stage_codes, stage_names = pd.factorize(stages)
+    epoch_ns = timestamps[keep].dt.tz_convert(None).dt.as_unit('ns').to_numpy().view(np.int64)
+
+    order = np.lexsort((epoch_ns, thread_codes))
+    return thread_codes[order], stage_codes[order], list(stage_names)
+
+def build_stage_flow(df):
+    """Return (transitions, funnel) DataFrames"""
+    thread_codes, stage_codes, stage_names = _ordered_threads(df)
+    n_stages = len(stage_names)
+    start, end = n_stages, n_stages + 1
+    n_states = n_stages + 2
+    state_names = np.array(stage_names + [START_STATE, END_STATE], dtype=object)
+
+    if len(thread_codes) == 0:
+        return (pd.DataFrame(columns=['from_stage', 'to_stage', 'transitions']),
+                pd.DataFrame(columns=['stage', 'threads_reached', 'threads_ended', 'drop_off_rate']))
+
+    first = np.ones(len(thread_codes), dtype=bool)
+    first[1:] = thread_codes[1:] != thread_codes[:-1]
+    last = np.append(first[1:], True)
+
+    # Previous state = shifted stage, or Start at the beginning of each thread
+    previous = np.empty_like(stage_codes)
+    previous[0] = start
+    previous[1:] = stage_codes[:-1]
+    previous[first] = start
+
+    sources = np.concatenate([previous, stage_codes[last]])
+    targets = np.concatenate([stage_codes, np.full(int(last.sum()), end)])
+    counts = np.bincount(sources * n_states + targets, minlength=n_states * n_states)
+
+    nonzero = np.flatnonzero(counts)
+    transitions = pd.DataFrame({
+        'from_stage': state_names[nonzero // n_states],
+        'to_stage': state_names[nonzero % n_states],
+        'transitions': counts[nonzero],
+    }).sort_values('transitions', ascending=False, kind='stable', ignore_index=True)
+
+    # Threads that ever reached each stage, and threads whose last stage it was
+    reached_pairs = np.unique(thread_codes.astype(np.int64) * n_stages + stage_codes)
+    reached = np.bincount(reached_pairs % n_stages, minlength=n_stages)
+    ended = np.bincount(stage_codes[last], minlength=n_stages)
+    funnel = pd.DataFrame({
+        'stage': stage_names,
+        'threads_reached': reached,
+        'threads_ended': ended,
+        'drop_off_rate': ended / np.maximum(reached, 1),
+    }).sort_values('threads_reached', ascending=False, kind='stable', ignore_index=True)
+    return transitions, funnel
+
+def save_stage_flow(transitions, funnel):
+    """Save the transition table and the funnel"""
+    transitions.to_csv(TRANSITIONS_FILE, index=False)
+    funnel.to_csv(FUNNEL_FILE, index=False)
+
+def main():
+    """Build stage transition counts and the stage funnel"""
+    print("🎯 SentrySkin Conversation Stage Flow")
+    print("=" * 50)
+
+    try:
+        df = load_stage_records()
+    except FileNotFoundError:
+        print(f"❌ File '{EXTRACTED_FILE}' not found!")
+        print("Please run extract_sentryskin_fields.py first to generate the data.")
+        return
+
+    transitions, funnel = build_stage_flow(df)
+    save_stage_flow(transitions, funnel)
+
+    threads = int(transitions.loc[transitions['from_stage'] == START_STATE, 'transitions'].sum())
+    print(f"📊 Threads: {threads}, distinct transitions: {len(transitions)}")
+
+    print("\n🔀 Top Stage Transitions:")
+    for row in transitions.head(10).itertuples():
+        print(f"  {row.from_stage} → {row.to_stage}: {row.transitions}")
+
+    print("\n📉 Stage Funnel:")
+    for row in funnel.itertuples():
+        print(f"  {row.stage}: reached by {row.threads_reached} threads, "
+              f"last stage for {row.threads_ended} ({row.drop_off_rate * 100:.1f}% drop-off)")
+
+    print(f"\n✅ Transitions saved to: {TRANSITIONS_FILE}")
+    print(f"✅ Funnel saved to: {FUNNEL_FILE}")
+
+if __name__ == "__main__":
+    main()
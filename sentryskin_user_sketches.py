@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+SentrySkin Daily User Sketches
+HyperLogLog sketches of user_identifier, one per UTC day
+
+Each day keeps a 2^PRECISION register array. Sketches merge by taking the
+register-wise maximum, so distinct users over any date range come from
+merging that range's days instead of a unique() over the raw records.
+
+Error bounds: the estimate has a relative standard error of
+1.04 / sqrt(2^PRECISION) (0.81% at the default precision 14), i.e. about
+68% of estimates fall within ±0.81% of the exact count and about 95% within
+±1.63%. Ranges below 2.5 * 2^PRECISION users (~41k) use the linear-counting
+correction, which is close to exact for small counts. Use --validate (or
+exact_distinct_users) to compare against the exact count.
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from execution_watermark import unprocessed_mask, advance_watermark
+
+PRECISION = 14
+SKETCHES_FILE = "sentryskin_daily_user_sketches.npz"
+EXTRACTED_FILE = "sentryskin_extracted_fields.csv"
+
+# 2^-rank for every possible register value
+_INVERSE_POWERS = np.ldexp(1.0, -np.arange(65))
+
+def relative_error(precision=PRECISION):
+    """Relative standard error of a HyperLogLog estimate"""
+    return 1.04 / np.sqrt(1 << precision)
+
+def user_identifiers(df):
+    """User identifier per record (chat_id, falling back to thread_id), as used by the user analysis"""
+    users = df['chat_id'].fillna(df['thread_id'])
+    return users.where(users != '')
+
+def hash_users(users):
+    """64-bit hash of each user identifier (stable across runs)"""
+    return pd.util.hash_array(np.asarray(users, dtype=object))
+
+def _leading_zeros(values):
+    """Count leading zero bits of each uint64 value (64 for zero)"""
+    values = values.copy()
+    zeros = np.zeros(values.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        top_clear = (values >> np.uint64(64 - shift)) == 0
+        zeros += top_clear * shift
+        values = np.where(top_clear, values << np.uint64(shift), values)
+    zeros += (values >> np.uint64(63)) == 0
+    return zeros
+
+def register_updates(hashes, precision=PRECISION):
+    """Register index and rank for each hash"""
+    hashes = np.asarray(hashes, dtype=np.uint64)
+    index = (hashes >> np.uint64(64 - precision)).astype(np.int64)
+    remainder = hashes << np.uint64(precision)
+    rank = np.minimum(_leading_zeros(remainder), 64 - precision) + 1
+    return index, rank.astype(np.uint8)
+
+def estimate_cardinality(registers):
+    """HyperLogLog estimate for one register array (or one per row of a 2-D array)"""
+    registers = np.asarray(registers)
+    m = registers.shape[-1]
+    alpha = 0.7213 / (1 + 1.079 / m)
+    raw = alpha * m * m / _INVERSE_POWERS[registers].sum(axis=-1)
+    empty = np.count_nonzero(registers == 0, axis=-1)
+    # Linear counting is more accurate while many registers are still empty
+    linear = m * np.log(m / np.maximum(empty, 1))
+    return np.where((raw <= 2.5 * m) & (empty > 0), linear, raw)
+
+def empty_sketches(precision=PRECISION):
+    """Sketch store with no days"""
+    return {
+        'precision': precision,
+        'days': np.array([], dtype='datetime64[D]'),
+        'registers': np.zeros((0, 1 << precision), dtype=np.uint8),
+        'watermark': None,
+        'recent_ids': np.array([], dtype=np.int64),
+    }
+
+def load_daily_sketches(path=SKETCHES_FILE):
+    """Load the per-day sketch store, or None if it does not exist"""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        if 'recent_ids' not in data.files:
+            print("⚠️ Daily sketch layout changed, rebuilding")
+            return None
+        return {
+            'precision': int(data['precision']),
+            'days': data['days'].astype('datetime64[D]'),
+            'registers': data['registers'],
+            'watermark': int(data['watermark']) if data['watermark'] >= 0 else None,
+            'recent_ids': data['recent_ids'],
+        }
+
+def save_daily_sketches(sketches, path=SKETCHES_FILE):
+    """Save the per-day sketch store"""
+    np.savez_compressed(
+        path,
+        precision=sketches['precision'],
+        days=sketches['days'],
+        registers=sketches['registers'],
+        watermark=-1 if sketches['watermark'] is None else sketches['watermark'],
+        recent_ids=sketches['recent_ids']
+    )
+
+def add_records(sketches, df):
+    """Add records (timestamp, chat_id, thread_id) to the per-day sketches"""
+    users = user_identifiers(df)
+    timestamps = pd.to_datetime(df['timestamp'], utc=True, format='ISO8601', errors='coerce')
+    keep = (users.notna() & timestamps.notna()).to_numpy()
+    if not keep.any():
+        return sketches
+
+    record_days = timestamps[keep].dt.tz_convert(None).to_numpy().astype('datetime64[D]')
+    days = np.union1d(sketches['days'], record_days)
+    registers = np.zeros((len(days), 1 << sketches['precision']), dtype=np.uint8)
+    registers[np.searchsorted(days, sketches['days'])] = sketches['registers']
+
+    index, rank = register_updates(hash_users(users[keep]), sketches['precision'])
+    np.maximum.at(registers, (np.searchsorted(days, record_days), index), rank)
+    return dict(sketches, days=days, registers=registers)
+
+def merged_registers(sketches, start=None, end=None):
+    """Merge the sketches of the days in [start, end] (inclusive, None = open)"""
+    days = sketches['days']
+    selected = np.ones(len(days), dtype=bool)
+    if start is not None:
+        selected &= days >= np.datetime64(pd.Timestamp(start).date(), 'D')
+    if end is not None:
+        selected &= days <= np.datetime64(pd.Timestamp(end).date(), 'D')
+    return sketches['registers'][selected].max(axis=0, initial=0)
+
+def distinct_users(sketches, start=None, end=None):
+    """Estimated distinct users between start and end dates (inclusive)"""
+    return int(round(float(estimate_cardinality(merged_registers(sketches, start, end)))))
+
+def daily_distinct_users(sketches):
+    """Estimated distinct users per day as a Series indexed by date"""
+    return pd.Series(
+        np.round(estimate_cardinality(sketches['registers'])).astype(np.int64),
+        index=pd.DatetimeIndex(sketches['days'], name='day')
+    )
+
+def exact_distinct_users(df, start=None, end=None):
+    """Exact distinct users between start and end dates (inclusive), for validation"""
+    users = user_identifiers(df)
+    days = pd.to_datetime(df['timestamp'], utc=True, format='ISO8601', errors='coerce').dt.tz_convert(None).dt.normalize()
+    selected = users.notna() & days.notna()
+    if start is not None:
+        selected &= days >= pd.Timestamp(start).normalize()
+    if end is not None:
+        selected &= days <= pd.Timestamp(end).normalize()
+    return int(users[selected].nunique())
+
+def update_daily_sketches(df, full_rebuild=False):
+    """Add executions not processed yet (see execution_watermark) and save the sketches"""
+    sketches = None if full_rebuild else load_daily_sketches()
+    if sketches is None or sketches['precision'] != PRECISION:
+        sketches = empty_sketches()
+
+    # Registers only ever take a maximum, so re-adding a record is harmless;
+    # the watermark just avoids rehashing the whole history every run
+    execution_ids = pd.to_numeric(df['execution_id'], errors='coerce')
+    new_records = df
+    if execution_ids.notna().all():
+        execution_ids = execution_ids.to_numpy(dtype=np.int64)
+        new = unprocessed_mask(execution_ids, sketches['watermark'], sketches['recent_ids'])
+        new_records = df[new]
+        sketches['watermark'], sketches['recent_ids'] = advance_watermark(
+            sketches['watermark'], sketches['recent_ids'], execution_ids[new])
+    print(f"📊 Adding {len(new_records)} new records to daily sketches")
+
+    sketches = add_records(sketches, new_records)
+    save_daily_sketches(sketches)
+    print(f"✅ Daily user sketches saved to: {SKETCHES_FILE} ({len(sketches['days'])} days)")
+    return sketches
+
+def validate_sketches(sketches, df):
+    """Print sketch estimates next to exact counts for a few windows"""
+    print("\n🔎 Sketch vs exact distinct users:")
+    if len(sketches['days']) == 0:
+        print("  No data")
+        return
+    last_day = pd.Timestamp(sketches['days'][-1])
+    windows = [(None, None), (last_day - pd.Timedelta(days=29), last_day),
+               (last_day - pd.Timedelta(days=6), last_day), (last_day, last_day)]
+    for start, end in windows:
+        estimate = distinct_users(sketches, start, end)
+        exact = exact_distinct_users(df, start, end)
+        error = (estimate - exact) / exact * 100 if exact else 0.0
+        label = 'all days' if start is None else f"{start.date()} to {end.date()}"
+        print(f"  {label}: estimate {estimate}, exact {exact} ({error:+.2f}%)")
+
+def main():
+    """Update the daily user sketches from the extracted data"""
+    parser = argparse.ArgumentParser(description='SentrySkin Daily User Sketches')
+    parser.add_argument('--full-rebuild', action='store_true',
+                       help='Ignore saved sketches and rebuild from the full history')
+    parser.add_argument('--validate', action='store_true',
+                       help='Compare sketch estimates with exact distinct counts')
+    args = parser.parse_args()
+
+    print("🎯 SentrySkin Daily User Sketches")
+    print("=" * 50)
+
+    try:
+        df = pd.read_csv(EXTRACTED_FILE, usecols=['execution_id', 'timestamp', 'chat_id', 'thread_id'],
+                         dtype={'chat_id': 'object', 'thread_id': 'object'})
+    except FileNotFoundError:
+        print(f"❌ File '{EXTRACTED_FILE}' not found!")
+        print("Please run extract_sentryskin_fields.py first to generate the data.")
+        return
+
+    sketches = update_daily_sketches(df, args.full_rebuild)
+    print(f"👥 Estimated distinct users (all days): {distinct_users(sketches)} "
+          f"(±{relative_error() * 100:.2f}% standard error)")
+
+    if args.validate:
+        validate_sketches(sketches, df)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+SentrySkin User Agent Sets
+Label tables and bitmask encoding for per-user device/browser/OS sets
+
+Each set is stored as a small integer where bit i means the i-th label of
+the matching table is present, so counts, multi-device checks and filters
+are plain NumPy bit operations instead of splitting comma-joined strings.
+"""
+
+import numpy as np
+import pandas as pd
+
+from multi_value_columns import from_masks, label_counts, parse_multi_values
+
+# Label tables (bit i of a mask = label i). Append only: existing bit positions must not move.
+DEVICE_LABELS = ['Mobile', 'Tablet', 'Desktop']
+BROWSER_LABELS = ['Chrome', 'Safari', 'Firefox', 'Edge', 'Other']
+OS_LABELS = ['Windows', 'macOS', 'iOS', 'Android', 'Linux', 'Other']
+
+# Text column -> (mask column, label table)
+SET_COLUMNS = {
+    'devices': ('device_mask', DEVICE_LABELS),
+    'browsers': ('browser_mask', BROWSER_LABELS),
+    'operating_systems': ('os_mask', OS_LABELS),
+}
+
+def classify_user_agent(user_agent):
+    """Classify a user agent string into (device, browser, operating system)"""
+    # Device detection
+    if 'Mobile' in user_agent or 'iPhone' in user_agent or 'Android' in user_agent:
+        device = 'Mobile'
+    elif 'iPad' in user_agent or 'Tablet' in user_agent:
+        device = 'Tablet'
+    else:
+        device = 'Desktop'
+
+    # Browser detection
+    if 'Chrome' in user_agent:
+        browser = 'Chrome'
+    elif 'Safari' in user_agent and 'Chrome' not in user_agent:
+        browser = 'Safari'
+    elif 'Firefox' in user_agent:
+        browser = 'Firefox'
+    elif 'Edge' in user_agent:
+        browser = 'Edge'
+    else:
+        browser = 'Other'
+
+    # OS detection
+    if 'Windows' in user_agent:
+        operating_system = 'Windows'
+    elif 'Mac OS X' in user_agent or 'macOS' in user_agent:
+        operating_system = 'macOS'
+    elif 'iPhone' in user_agent or 'iPad' in user_agent:
+        operating_system = 'iOS'
+    elif 'Android' in user_agent:
+        operating_system = 'Android'
+    elif 'Linux' in user_agent:
+        operating_system = 'Linux'
+    else:
+        operating_system = 'Other'
+
+    return device, browser, operating_system
+
+def classify_user_agent_bits(user_agent):
+    """Classify a user agent into single-bit (device, browser, OS) masks"""
+    device, browser, operating_system = classify_user_agent(user_agent)
+    return (
+        1 << DEVICE_LABELS.index(device),
+        1 << BROWSER_LABELS.index(browser),
+        1 << OS_LABELS.index(operating_system),
+    )
+
+def labels_to_mask(labels, table):
+    """Encode an iterable of labels as a mask (unknown labels are ignored)"""
+    mask = 0
+    for label in labels:
+        if label in table:
+            mask |= 1 << table.index(label)
+    return mask
+
+def mask_to_labels(mask, table):
+    """Decode a mask into its labels, in table order"""
+    return [label for bit, label in enumerate(table) if int(mask) >> bit & 1]
+
+def masks_to_strings(masks, table):
+    """Render masks as comma-joined label strings (one decode per distinct mask)"""
+    masks = pd.Series(masks)
+    lookup = {mask: ', '.join(mask_to_labels(mask, table)) for mask in masks.unique()}
+    return masks.map(lookup)
+
+def masks_from_strings(values, table):
+    """Encode comma-joined label strings as masks (one parse per distinct string)"""
+    values = pd.Series(values)
+    encoded = parse_multi_values(values, table=table)
+    masks = np.zeros(len(values), dtype=np.int64)
+    np.bitwise_or.at(masks, encoded['rows'], np.left_shift(1, encoded['codes']))
+    return pd.Series(masks, index=values.index)
+
+def ensure_mask_columns(df):
+    """Add mask columns derived from the text columns when a file predates them"""
+    for text_column, (mask_column, table) in SET_COLUMNS.items():
+        if mask_column not in df.columns and text_column in df.columns:
+            df[mask_column] = masks_from_strings(df[text_column], table)
+    return df
+
+def popcount(masks):
+    """Number of labels set in each mask"""
+    masks = np.asarray(masks, dtype=np.int64)
+    counts = np.zeros(masks.shape, dtype=np.int64)
+    for bit in range(int(masks.max()).bit_length() if masks.size else 0):
+        counts += (masks >> bit) & 1
+    return counts
+
+def mask_counts(masks, table):
+    """Count how many masks contain each label, most common first"""
+    return label_counts(from_masks(masks, table))
+
+def has_any(masks, labels, table):
+    """Boolean array: which masks contain at least one of the labels"""
+    return (np.asarray(masks, dtype=np.int64) & labels_to_mask(labels, table)) != 0
+
+def lowest_label(masks, table):
+    """First label (in table order) of each mask, None for empty masks"""
+    masks = np.asarray(masks, dtype=np.int64)
+    lowest_bit = masks & -masks
+    positions = np.where(lowest_bit > 0, np.log2(np.maximum(lowest_bit, 1)).astype(np.int64), -1)
+    labels = np.array(list(table) + [None], dtype=object)
+    return labels[positions]
+
+def group_bitwise_or(codes, masks, n_groups, table):
+    """OR together the masks of each group code (0..n_groups-1)"""
+    codes = np.asarray(codes)
+    masks = np.asarray(masks, dtype=np.int64)
+    combined = np.zeros(n_groups, dtype=np.int64)
+    for bit in range(len(table)):
+        present = np.bincount(codes[(masks >> bit) & 1 == 1], minlength=n_groups) > 0
+        combined |= present.astype(np.int64) << bit
+    return combined
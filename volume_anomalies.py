@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Volume Anomaly Detection
+Daily volume baselines per lead Register_Method and per SentrySkin device class
+
+Each series keeps an EWMA level, one additive offset per weekday and an
+EWMA of squared residuals in volume_anomaly_state.json. A refresh only
+feeds the days completed since the series' last_day, one O(1) update per
+day, and appends days whose count is more than Z_THRESHOLD standard
+deviations away from the baseline to volume_alerts.jsonl.
+
+Days are scored up to yesterday (UTC), so a source that stops sending
+data shows up as a run of zero-volume drops. While data is flowing, an
+export whose newest records are from yesterday may have been fetched
+mid-day, so that day waits for the next run.
+"""
+
+import argparse
+import json
+import math
+import os
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from sentryskin_daily_rollup import load_rollup
+
+STATE_FILE = "volume_anomaly_state.json"
+ALERTS_FILE = "volume_alerts.jsonl"
+LEADS_FILE = "leads_export.csv"
+STATE_VERSION = 1
+
+# Smoothing for the level, the weekday offsets and the residual variance
+LEVEL_ALPHA = 0.3
+SEASON_GAMMA = 0.25
+VARIANCE_ALPHA = 0.1
+
+# Days of history before a series can alert, and the alert thresholds
+MIN_OBSERVATIONS = 14
+Z_THRESHOLD = 3.0
+MIN_ABSOLUTE_CHANGE = 3
+
+def new_series(value):
+    """Baseline for a series whose first observed day had `value` events"""
+    return {
+        'last_day': None,
+        'level': float(value),
+        'season': [0.0] * 7,
+        'variance': float(max(value, 1)),
+        'observations': 0,
+    }
+
+def update_series(series, day, value):
+    """Score one day's count against the baseline, then fold it in; returns an alert dict or None"""
+    weekday = day.weekday()
+    expected = max(series['level'] + series['season'][weekday], 0.0)
+    residual = value - expected
+    # Counts are at least Poisson-noisy, so never trust a variance below the expected count
+    std = math.sqrt(max(series['variance'], expected, 1.0))
+    z_score = residual / std
+
+    alert = None
+    if (series['observations'] >= MIN_OBSERVATIONS and abs(z_score) >= Z_THRESHOLD
+            and abs(residual) >= MIN_ABSOLUTE_CHANGE):
+        alert = {
+            'day': day.isoformat(),
+            'observed': int(value),
+            'expected': round(expected, 1),
+            'z_score': round(z_score, 2),
+            'direction': 'spike' if residual > 0 else 'drop',
+        }
+
+    series['variance'] = (1 - VARIANCE_ALPHA) * series['variance'] + VARIANCE_ALPHA * residual * residual
+    series['level'] += LEVEL_ALPHA * (value - series['season'][weekday] - series['level'])
+    series['season'][weekday] += SEASON_GAMMA * (value - series['level'] - series['season'][weekday])
+    series['observations'] += 1
+    series['last_day'] = day.isoformat()
+    return alert
+
+def load_state(path=STATE_FILE):
+    """Load the saved baselines, or an empty state"""
+    try:
+        with open(path) as f:
+            state = json.load(f)
+        if state.get('version') == STATE_VERSION:
+            return state
+        print("⚠️ Volume baseline state version changed, starting fresh")
+    except FileNotFoundError:
+        pass
+    return {'version': STATE_VERSION, 'series': {}}
+
+def save_state(state, path=STATE_FILE):
+    """Save the baselines"""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(temp_path, path)
+
+def first_pending_day(state, prefix):
+    """Earliest day any series with this prefix still needs (None = all history)"""
+    last_days = [series['last_day'] for name, series in state['series'].items()
+                 if name.startswith(prefix) and series['last_day']]
+    if not last_days:
+        return None
+    return datetime.fromisoformat(min(last_days)).date() + timedelta(days=1)
+
+def lead_daily_counts(since=None, path=LEADS_FILE):
+    """Leads per (UTC day, Register_Method) from the leads export"""
+    leads = pd.read_csv(path, usecols=['Register_Method', 'Created_On'])
+    days = pd.to_datetime(leads['Created_On'], utc=True, format='ISO8601', errors='coerce').dt.date
+    leads = leads.assign(day=days)[days.notna()]
+    if since is not None:
+        leads = leads[leads['day'] >= since]
+    counts = leads.groupby(['day', leads['Register_Method'].fillna('Unknown')]).size()
+    return counts.rename_axis(['day', 'series'])
+
+def sentryskin_daily_counts(since=None):
+    """SentrySkin executions per (UTC day, device class) from the daily rollup"""
+    rollup = load_rollup()
+    if rollup is None:
+        raise FileNotFoundError("sentryskin_daily_rollup.csv")
+    rollup = rollup.assign(day=rollup['day'].dt.date)
+    if since is not None:
+        rollup = rollup[rollup['day'] >= since]
+    return rollup.groupby(['day', 'device'])['executions'].sum().rename_axis(['day', 'series'])
+
+def last_complete_day(daily_counts, today=None):
+    """Last day to score: yesterday (UTC), or the day before when yesterday's data may be partial"""
+    yesterday = (today or datetime.now(timezone.utc).date()) - timedelta(days=1)
+    if not daily_counts.empty and max(daily_counts.index.get_level_values('day')) == yesterday:
+        return yesterday - timedelta(days=1)
+    return yesterday
+
+def update_baselines(state, prefix, daily_counts, last_complete_day):
+    """Feed each series the days after its last_day up to last_complete_day; returns alerts"""
+    alerts = []
+    by_series = {name: counts.droplevel('series') for name, counts in daily_counts.groupby(level='series')}
+    names = set(by_series) | {name[len(prefix):] for name in state['series'] if name.startswith(prefix)}
+
+    for name in sorted(names):
+        key = prefix + name
+        counts = by_series.get(name, pd.Series(dtype='int64'))
+        series = state['series'].get(key)
+        if series is None:
+            if counts.empty or counts.index[0] > last_complete_day:
+                continue
+            series = state['series'][key] = new_series(counts.iloc[0])
+            day = counts.index[0]
+        else:
+            day = datetime.fromisoformat(series['last_day']).date() + timedelta(days=1)
+
+        while day <= last_complete_day:
+            alert = update_series(series, day, int(counts.get(day, 0)))
+            if alert is not None:
+                alerts.append(dict(alert, series=key))
+            day += timedelta(days=1)
+    return alerts
+
+def append_alerts(alerts, path=ALERTS_FILE):
+    """Append alerts to the JSONL alert log"""
+    detected_at = datetime.now(timezone.utc).isoformat(timespec='seconds')
+    with open(path, 'a') as f:
+        for alert in alerts:
+            f.write(json.dumps(dict(alert, detected_at=detected_at)) + '\n')
+
+def load_recent_alerts(days=7, path=ALERTS_FILE):
+    """Alerts for days within the last `days` days, newest first"""
+    if not os.path.exists(path):
+        return []
+    cutoff = (datetime.now(timezone.utc).date() - timedelta(days=days)).isoformat()
+    with open(path) as f:
+        alerts = [json.loads(line) for line in f if line.strip()]
+    recent = [alert for alert in alerts if alert['day'] >= cutoff]
+    return sorted(recent, key=lambda alert: (alert['day'], alert['series']), reverse=True)
+
+def format_alert(alert):
+    """One-line description of an alert"""
+    arrow = "📈" if alert['direction'] == 'spike' else "📉"
+    return (f"{arrow} {alert['series']} on {alert['day']}: {alert['observed']} "
+            f"(expected ~{alert['expected']}, z={alert['z_score']})")
+
+def main():
+    """Update volume baselines with the newly completed days and record alerts"""
+    parser = argparse.ArgumentParser(description='Volume Anomaly Detection')
+    parser.add_argument('--reset', action='store_true',
+                       help='Discard saved baselines and replay the full history')
+    args = parser.parse_args()
+
+    print("🎯 Volume Anomaly Detection")
+    print("=" * 50)
+
+    state = {'version': STATE_VERSION, 'series': {}} if args.reset else load_state()
+
+    alerts = []
+    sources = [('leads:', lead_daily_counts, "Creatio leads"),
+               ('sentryskin:', sentryskin_daily_counts, "SentrySkin executions")]
+    for prefix, daily_counts, name in sources:
+        try:
+            counts = daily_counts(first_pending_day(state, prefix))
+        except FileNotFoundError as e:
+            print(f"⚠️ {name} skipped, input not found: {e}")
+            continue
+        source_alerts = update_baselines(state, prefix, counts, last_complete_day(counts))
+        print(f"📊 {name}: {sum(key.startswith(prefix) for key in state['series'])} series, "
+              f"{len(source_alerts)} new alerts")
+        alerts.extend(source_alerts)
+
+    save_state(state)
+    if alerts:
+        append_alerts(alerts)
+        print(f"\n🚨 {len(alerts)} volume alerts written to {ALERTS_FILE}:")
+        for alert in alerts[-20:]:
+            print(f"  {format_alert(alert)}")
+    else:
+        print("\n✅ No volume anomalies detected")
+
+if __name__ == "__main__":
+    main()
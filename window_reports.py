@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+SentrySkin Window Reports
+Detailed user reports for any number of (start, end) windows from one in-memory user table
+
+The user table (sentryskin_user_device_analysis.csv rows, or the same
+frame straight from analyze_sentryskin_users) is parsed and formatted into
+the detailed-report layout once, ordered by conversation_count. Users are
+then ranked by last_interaction a single time; each window is one
+searchsorted cut on that ranking (last_interaction > start) plus an
+optional first_interaction <= end test, so extra windows cost a mask each
+rather than a re-read and re-format.
+"""
+
+import numpy as np
+import pandas as pd
+
+from user_agent_sets import ensure_mask_columns
+
+# Longer sample user agents are cut to this many characters plus '...'
+USER_AGENT_PREVIEW = 100
+
+def rolling_windows(days_list, now=None):
+    """(start, None) windows covering the last N days for each N, ending now"""
+    now = pd.Timestamp.now(tz='UTC') if now is None else pd.Timestamp(now)
+    return [(now - pd.Timedelta(days=days), None) for days in days_list]
+
+def _as_utc(value):
+    """Timestamp in UTC (naive values are taken as UTC), or None"""
+    if value is None:
+        return None
+    value = pd.Timestamp(value)
+    return value.tz_localize('UTC') if value.tzinfo is None else value.tz_convert('UTC')
+
+def _epoch_ns(timestamps, missing):
+    """int64 nanoseconds of UTC timestamps with NaT replaced by `missing`"""
+    values = timestamps.dt.tz_convert(None).dt.as_unit('ns').to_numpy()
+    return np.where(np.isnat(values), missing, values.view(np.int64))
+
+def _format_timestamps(timestamps):
+    """'%Y-%m-%d %H:%M:%S' in UTC, 'N/A' when missing"""
+    return timestamps.dt.strftime('%Y-%m-%d %H:%M:%S').fillna('N/A')
+
+def _preview_user_agents(user_agents):
+    """Sample user agents shortened like the detailed report always has"""
+    long_agents = user_agents.astype(str).str.len() > USER_AGENT_PREVIEW
+    return user_agents.where(~long_agents, user_agents.astype(str).str[:USER_AGENT_PREVIEW] + '...')
+
+def prepare_user_table(users):
+    """Report rows for every user, most conversations first, with parsed interaction times"""
+    users = ensure_mask_columns(users)
+    first = pd.to_datetime(users['first_interaction'], utc=True, errors='coerce')
+    last = pd.to_datetime(users['last_interaction'], utc=True, errors='coerce')
+
+    report = pd.DataFrame({
+        'user_id': users['user_id'],
+        'conversation_count': users['conversation_count'],
+        'first_interaction': _format_timestamps(first),
+        'last_interaction': _format_timestamps(last),
+        'devices': users['devices'],
+        'browsers': users['browsers'],
+        'operating_systems': users['operating_systems'],
+        'sample_user_agent': _preview_user_agents(users['sample_user_agent']),
+        'device_mask': users['device_mask'],
+        'browser_mask': users['browser_mask'],
+        'os_mask': users['os_mask'],
+    })
+    order = np.argsort(-users['conversation_count'].to_numpy(), kind='stable')
+    return {
+        'report': report.iloc[order].reset_index(drop=True),
+        # Missing first_interaction never excludes a user; missing last_interaction always does
+        'first_ns': _epoch_ns(first, np.iinfo(np.int64).min)[order],
+        'last_ns': _epoch_ns(last, np.iinfo(np.int64).min)[order],
+    }
+
+def window_reports(users, windows):
+    """One detailed report per (start, end) window, in the order given
+
+    A user is in a window when last_interaction > start and
+    first_interaction <= end; None leaves that side open.
+    """
+    table = prepare_user_table(users)
+    report, first_ns, last_ns = table['report'], table['first_ns'], table['last_ns']
+
+    by_last = np.argsort(last_ns, kind='stable')
+    last_rank = np.empty(len(by_last), dtype=np.int64)
+    last_rank[by_last] = np.arange(len(by_last))
+    sorted_last = last_ns[by_last]
+
+    reports = []
+    for start, end in windows:
+        start, end = _as_utc(start), _as_utc(end)
+        if start is None:
+            selected = last_ns != np.iinfo(np.int64).min
+        else:
+            selected = last_rank >= np.searchsorted(sorted_last, start.as_unit('ns').value, side='right')
+        if end is not None:
+            selected &= first_ns <= end.as_unit('ns').value
+        reports.append(report[selected].reset_index(drop=True))
+    return reports
+
+def rolling_report_file(days):
+    """Report filename for the rolling last-N-days window"""
+    return f"sentryskin_last_{days}d_detailed_report.csv"